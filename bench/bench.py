@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+
+# Benchmarks DoxyC++ on a synthetic corpus written by generate.py, or on any directory of Doxygen
+# XML files. Every run happens in a fresh process, which times the phases of a build separately
+# and reports the peak memory after each of them. Results can be saved and compared to those of
+# another commit, and the HTML output can be checked against a golden digest file to show that
+# a change does not alter any page. Versions of doxycpp.py without a Project class build the
+# documentation when imported; they are run as a script and only timed as a whole.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import argparse, ast, hashlib, importlib.util, json, os, subprocess, sys, tempfile, time
+import generate
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# The phases of a build, in order
+phases = [ "ingestion", "hierarchy", "names", "planning", "rendering", "writing" ]
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+# Returns the peak resident memory of this process in KiB, or None if unknown
+def peak_memory():
+    if resource == None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+# Returns the top-level statements of a doxycpp.py, without running it
+def parse_script(doxycpp_file):
+    with open(doxycpp_file, "rb") as file:
+        return ast.parse(file.read(), doxycpp_file).body
+
+
+# Returns whether a doxycpp.py has a Project class, i.e. can be imported without building the
+# documentation
+#   statements: The result of parse_script()
+def has_project(statements):
+    return any(isinstance(statement, ast.ClassDef) and statement.name == "Project"
+               for statement in statements)
+
+
+# Returns the value of a top-level assignment "name = <literal>" in a doxycpp.py, or None if
+# there is none
+def script_constant(statements, name):
+    for statement in statements:
+        if isinstance(statement, ast.Assign) and any(isinstance(target, ast.Name) 
+                and target.id == name for target in statement.targets):
+            return statement.value
+    return None
+
+
+# Maps Project configuration values to the command line options of a doxycpp.py, which is
+# necessary for versions that build the documentation when imported and have no Project class
+#   statements: The result of parse_script()
+#   options: The Project configuration
+# Returns the list of command line arguments
+def script_arguments(statements, options):
+    names = dict()
+    value_options = script_constant(statements, "value_options")
+    flag_options = script_constant(statements, "flag_options")
+    if isinstance(value_options, ast.Dict):
+        for key, value in zip(value_options.keys, value_options.values):
+            names[ast.literal_eval(value.elts[0])] = (ast.literal_eval(key), True)
+    if isinstance(flag_options, ast.Dict):
+        for key, value in zip(flag_options.keys, flag_options.values):
+            names[ast.literal_eval(value)] = (ast.literal_eval(key), False)
+    arguments = []
+    for name, value in sorted(options.items()):
+        if name not in names:
+            raise ValueError("this version of doxycpp.py has no option for " + name)
+        option, takes_value = names[name]
+        if takes_value: arguments += [ option, str(value) ]
+        elif value: arguments.append(option)
+    return arguments
+
+
+# Builds the documentation once by running a doxycpp.py that has no Project class. Its phases
+# cannot be told apart, so only the total time and peak memory are known.
+#   doxycpp_file: The doxycpp.py to benchmark
+#   xml_dir: The directory to read .xml files from
+#   output_dir: The directory to write to
+#   arguments: The command line arguments, see script_arguments()
+# Returns a dictionary with the number of pages, and the time in seconds and peak memory of the
+# whole build
+def run_script(doxycpp_file, xml_dir, output_dir, arguments):
+    start = time.perf_counter()
+    # Older versions read .xml files from the current directory
+    subprocess.run([ sys.executable, os.path.abspath(doxycpp_file) ] + arguments
+                   + [ os.path.abspath(output_dir) ], check=True, cwd=xml_dir,
+                   stdout=subprocess.DEVNULL)
+    total = time.perf_counter() - start
+    memory = None
+    if resource != None:
+        memory = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        if sys.platform == "darwin": memory //= 1024
+    pages = len([ name for name in os.listdir(output_dir) if name.endswith(".html") ])
+    return { "pages": pages, "times": { "total": total }, "memory": { "total": memory } }
+
+
+# Builds the documentation once, timing every phase. Rendering and writing pages are timed
+# separately, so pages are written by this process and not by worker processes.
+#   doxycpp_file: The doxycpp.py to benchmark
+#   xml_dir: The directory to read .xml files from
+#   output_dir: The directory to write to
+#   options: The Project configuration
+# Returns a dictionary with the number of pages, and the time in seconds and peak memory after
+# each phase
+def run_once(doxycpp_file, xml_dir, output_dir, options):
+    statements = parse_script(doxycpp_file)
+    if not has_project(statements):
+        return run_script(doxycpp_file, xml_dir, output_dir,
+                          script_arguments(statements, options))
+
+    spec = importlib.util.spec_from_file_location("doxycpp", doxycpp_file)
+    doxycpp = importlib.util.module_from_spec(spec)
+    # Worker processes of the "jobs" option look up functions by their module name
+    sys.modules["doxycpp"] = doxycpp
+    spec.loader.exec_module(doxycpp)
+
+    times = dict((phase, 0.0) for phase in phases)
+    memory = dict()
+
+    # Name generation is part of Project.resolve(), time it by wrapping the methods involved
+    def timed(function):
+        def wrapper(*args):
+            start = time.perf_counter()
+            result = function(*args)
+            times["names"] += time.perf_counter() - start
+            return result
+        return wrapper
+
+    project = doxycpp.Project(xml_dir, **options)
+    for name in [ "generate_names", "generate_urls" ]:
+        if hasattr(project, name): setattr(project, name, timed(getattr(project, name)))
+
+    start = time.perf_counter()
+    project.load()
+    times["ingestion"] = time.perf_counter() - start
+    memory["ingestion"] = peak_memory()
+
+    start = time.perf_counter()
+    project.resolve()
+    times["hierarchy"] = time.perf_counter() - start - times["names"]
+    memory["hierarchy"] = memory["names"] = peak_memory()
+
+    start = time.perf_counter()
+    project.plan()
+    times["planning"] = time.perf_counter() - start
+    memory["planning"] = peak_memory()
+
+    start = time.perf_counter()
+    # Older versions of write_assets() take a second argument
+    if hasattr(project, "write_assets") and project.write_assets.__code__.co_argcount == 3:
+        project.write_assets(output_dir, False)
+    elif hasattr(project, "write_assets"): 
+        project.write_assets(output_dir)
+    times["writing"] += time.perf_counter() - start
+    for page in project.pages:
+        start = time.perf_counter()
+        html = project.render(page)
+        times["rendering"] += time.perf_counter() - start
+        start = time.perf_counter()
+        with open(output_dir + "/" + page.file_name, "wb") as output_file:
+            output_file.write(html)
+        times["writing"] += time.perf_counter() - start
+    memory["rendering"] = memory["writing"] = peak_memory()
+    if hasattr(project, "close"): project.close()
+
+    return { "pages": len(project.pages), "times": times, "memory": memory }
+
+
+# Returns a dictionary mapping the name of every file in output_dir to the MD5 hash of its
+# contents
+def output_digests(output_dir):
+    digests = dict()
+    for file_name in sorted(os.listdir(output_dir)):
+        with open(os.path.join(output_dir, file_name), "rb") as file:
+            digests[file_name] = hashlib.md5(file.read()).hexdigest()
+    return digests
+
+
+# Returns the short ID of the commit the doxycpp.py is part of, or None if it is not in a git
+# repository
+def git_commit(doxycpp_file):
+    try:
+        output = subprocess.run([ "git", "rev-parse", "--short", "HEAD" ], check=True,
+                                cwd=os.path.dirname(os.path.abspath(doxycpp_file)),
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return output.stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Parses "name=value" arguments of --set into a Project configuration
+def parse_options(assignments):
+    options = dict()
+    for assignment in assignments:
+        name, _, value = assignment.partition("=")
+        try:
+            options[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            options[name] = value
+    return options
+
+
+def format_time(seconds):
+    return "{:9.3f} s".format(seconds) if seconds != None else "          -"
+
+
+def format_memory(kib):
+    return "{:9.1f} MiB".format(kib / 1024) if kib != None else "          -"
+
+
+# Prints the results as a table, next to the results of a baseline if given
+def print_results(results, baseline):
+    print("doxycpp: {}  commit: {}  pages: {}  runs: {}".format(results["doxycpp"],
+          results["commit"], results["pages"], results["runs"]))
+    if baseline != None:
+        print("baseline: {}  commit: {}  pages: {}  runs: {}".format(baseline["doxycpp"],
+              baseline["commit"], baseline["pages"], baseline["runs"]))
+        if baseline["corpus"] != results["corpus"] or baseline["options"] != results["options"]:
+            print("warning: the baseline was measured on a different corpus or configuration")
+    print()
+    print("{:12}{:>13}{:>15}".format("phase", "time", "peak memory"), end="")
+    print("{:>13}{:>9}".format("baseline", "ratio") if baseline != None else "")
+    for phase in phases + [ "total" ]:
+        new = results["times"].get(phase)
+        old = baseline["times"].get(phase) if baseline != None else None
+        if new == None and old == None: continue
+        print("{:12}{:>13}{:>15}".format(phase, format_time(new),
+              format_memory(results["memory"].get(phase))), end="")
+        if baseline != None:
+            print("{:>13}{:>9}".format(format_time(old), "{:.2f}x".format(new / old)
+                  if new != None and old != None and old > 0 else "-"))
+        else:
+            print()
+
+
+# Compares output digests against a golden digest file
+# Returns whether they are equal
+def check_golden(digests, golden):
+    differing = sorted(name for name in digests if golden["files"].get(name) != digests[name])
+    missing = sorted(name for name in golden["files"] if name not in digests)
+    for name in differing[0:20]:
+        print("golden: {} {}".format("differs" if name in golden["files"] else "is new", name))
+    for name in missing[0:20]:
+        print("golden: missing {}".format(name))
+    if len(differing) + len(missing) > 0:
+        print("golden: {} of {} files differ, {} missing".format(len(differing), len(digests),
+                                                                  len(missing)))
+        return False
+    print("golden: all {} files are identical".format(len(digests)))
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks DoxyC++ on a synthetic corpus")
+    parser.add_argument("--xml", metavar="DIR",
+                        help="read .xml files from DIR instead of generating a corpus")
+    corpus_group = parser.add_argument_group("corpus parameters, see generate.py")
+    generate.add_arguments(corpus_group)
+    parser.add_argument("--doxycpp", metavar="FILE",
+                        default=os.path.join(os.path.dirname(bench_dir), "doxycpp.py"),
+                        help="the doxycpp.py to benchmark, e.g. from another commit")
+    parser.add_argument("--set", metavar="NAME=VALUE", action="append", default=[],
+                        help="set a Project configuration value, e.g. shared_nav=True")
+    parser.add_argument("--repeat", metavar="N", type=int, default=3,
+                        help="build N times and report the fastest time of every phase")
+    parser.add_argument("--output", metavar="FILE", help="save the results as JSON to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare to results saved before")
+    parser.add_argument("--save-golden", metavar="FILE",
+                        help="save digests of all output files to FILE")
+    parser.add_argument("--check-golden", metavar="FILE",
+                        help="check that all output files match the digests in FILE")
+    parser.add_argument("--run-once", nargs=2, metavar=("XML_DIR", "OUTPUT_DIR"),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    options = parse_options(args.set)
+
+    # Every run happens in a new process, so no caches are shared between runs and the peak
+    # memory is that of a single build
+    if args.run_once != None:
+        json.dump(run_once(args.doxycpp, args.run_once[0], args.run_once[1], options),
+                  sys.stdout)
+        return
+
+    statements = parse_script(args.doxycpp)
+    if not has_project(statements):
+        try:
+            script_arguments(statements, options)
+        except ValueError as e:
+            parser.error(str(e))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.xml != None:
+            xml_dir = args.xml
+            corpus = os.path.abspath(args.xml)
+        else:
+            xml_dir = os.path.join(temp_dir, "xml")
+            corpus = dict((name, getattr(args, name)) for name in generate.defaults)
+            generate.generate(xml_dir, **corpus)
+
+        runs = []
+        digests = None
+        for run in range(max(1, args.repeat)):
+            output_dir = os.path.join(temp_dir, "html{}".format(run))
+            os.mkdir(output_dir)
+            command = [ sys.executable, os.path.abspath(__file__), "--doxycpp", args.doxycpp,
+                        "--run-once", xml_dir, output_dir ]
+            for assignment in args.set: command += [ "--set", assignment ]
+            output = subprocess.run(command, check=True, stdout=subprocess.PIPE)
+            runs.append(json.loads(output.stdout.decode()))
+            if digests == None: digests = output_digests(output_dir)
+
+    # Versions without a Project class are only timed as a whole
+    measured = [ phase for phase in phases if phase in runs[0]["times"] ]
+    times = dict((phase, min(run["times"][phase] for run in runs)) for phase in measured)
+    memory = dict((phase, runs[0]["memory"][phase]) for phase in measured)
+    if len(measured) > 0:
+        times["total"] = sum(times.values())
+        memory["total"] = memory["writing"]
+    else:
+        times["total"] = min(run["times"]["total"] for run in runs)
+        memory["total"] = runs[0]["memory"]["total"]
+    results = { "doxycpp": os.path.abspath(args.doxycpp), "commit": git_commit(args.doxycpp),
+                "python": sys.version.split()[0], "corpus": corpus, "options": options,
+                "runs": len(runs), "pages": runs[0]["pages"], "times": times, "memory": memory }
+
+    baseline = None
+    if args.compare != None:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)
+    print_results(results, baseline)
+    if args.output != None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4, sort_keys=True)
+
+    golden = { "corpus": corpus, "options": options, "files": digests }
+    if args.save_golden != None:
+        with open(args.save_golden, "w") as file:
+            json.dump(golden, file, indent=4, sort_keys=True)
+    if args.check_golden != None:
+        with open(args.check_golden, "r") as file:
+            expected = json.load(file)
+        if expected["corpus"] != corpus:
+            print("golden: the digests were saved for a different corpus")
+            sys.exit(1)
+        # Runs are compared even if their configuration differs, e.g. to show that "jobs" or
+        # "stream" do not change the output. Only options that may change it are pointed out.
+        runtime_config = script_constant(statements, "runtime_config")
+        runtime_config = ast.literal_eval(runtime_config) if runtime_config != None else set()
+        differing = sorted(name for name in set(expected["options"]) | set(options)
+                           if expected["options"].get(name) != options.get(name) 
+                           and name not in runtime_config)
+        if len(differing) > 0:
+            print("golden: warning: the digests were saved with different values of {}".format(
+                  ", ".join(differing)))
+        if not check_golden(digests, expected):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
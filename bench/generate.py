@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+
+# Writes a synthetic Doxygen XML corpus for benchmarking DoxyC++. The corpus is fully determined
+# by its parameters, so the same parameters always produce the same files.
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import argparse, os, random
+import xml.etree.ElementTree as ElementTree
+from xml.sax.saxutils import escape
+
+
+# The default corpus parameters, see Corpus
+defaults = { "namespaces": 3, "classes": 4, "overloads": 3, "specializations": 2, "depth": 2,
+             "words": 20, "seed": 1 }
+
+header = "<?xml version='1.0' encoding='UTF-8' standalone='no'?>\n<doxygen version=\"1.8.6\">\n"
+footer = "</doxygen>\n"
+
+words = [ "frobnicates", "the", "value", "of", "a", "container", "returns", "bar", "baz",
+          "&lt;x&gt;" ]
+
+
+class Corpus:
+    #   output_dir: The directory to write .xml files to
+    #   namespaces: The number of top-level namespaces. The first two get a nested "detail"
+    #               namespace each.
+    #   classes: The number of classes and free function overload sets per namespace
+    #   overloads: The number of overloads per function
+    #   specializations: The number of explicit specializations of every other class
+    #   depth: The length of the inheritance chains between the classes of a namespace
+    #   words: The number of words in each detailed description
+    #   seed: The random seed
+    def __init__(self, output_dir, namespaces, classes, overloads, specializations, depth,
+                 words, seed):
+        self.output_dir = output_dir
+        self.namespaces = namespaces
+        self.classes = classes
+        self.overloads = overloads
+        self.specializations = specializations
+        self.depth = depth
+        self.words = words
+        self.random = random.Random(seed)
+
+        # (doxygen_id, full name) of all classes, which descriptions may refer to
+        self.refs = []
+        # (doxygen_id, path, class doxygen_id) of all header files
+        self.files = []
+        # Doxygen IDs of all namespace members, which are listed by a file as well
+        self.file_members = []
+
+
+    def write_file(self, doxygen_id, xml):
+        with open(os.path.join(self.output_dir, doxygen_id + ".xml"), "w") as file:
+            file.write(header + xml + footer)
+
+
+    def member_id(self, parent_id):
+        return "{}_1a{:032x}".format(parent_id, self.random.getrandbits(128))
+
+
+    # Returns the XML of a paragraph with "count" words, some of which are links to classes
+    def para(self, count):
+        text = []
+        for i in range(count):
+            if len(self.refs) > 0 and self.random.random() < 0.05:
+                doxygen_id, name = self.random.choice(self.refs)
+                text.append('<ref refid="{}" kindref="compound">{}</ref>'.format(doxygen_id,
+                                                                                  escape(name)))
+            else:
+                text.append(self.random.choice(words))
+        return " ".join(text)
+
+
+    # Returns the XML of a description
+    #   tag: The element name, e.g. "briefdescription"
+    #   count: The number of words. Empty descriptions are written for 0.
+    #   params: The names of function parameters. If not empty, the description also contains a
+    #           parameter list, return value, a code listing and inline markup.
+    def description(self, tag, count, params=()):
+        xml = "<" + tag + ">"
+        if count > 0:
+            xml += "<para>" + self.para(count) + " </para>"
+        if count > 0 and len(params) > 0:
+            xml += '<para><parameterlist kind="param">'
+            for param in params:
+                xml += ('<parameteritem><parameternamelist><parametername>{}</parametername>'
+                        '</parameternamelist><parameterdescription><para>{} </para>'
+                        '</parameterdescription></parameteritem>').format(param, self.para(4))
+            xml += ('</parameterlist><simplesect kind="return"><para>Something. </para>'
+                    '</simplesect></para><para><programlisting><codeline><highlight '
+                    'class="keyword">int</highlight><sp/>x;</codeline><codeline><highlight '
+                    'class="normal">foo();</highlight></codeline></programlisting></para>'
+                    '<para><computeroutput>a &lt; b</computeroutput> <bold>bold</bold> '
+                    '<italic>it</italic><linebreak/>x</para>')
+        return xml + "</" + tag + ">"
+
+
+    def write(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        namespace_names = [ "ns{}".format(i) for i in range(self.namespaces) ]
+        namespace_names += [ name + "::detail" for name in namespace_names[0:2] ]
+        namespace_ids = []
+        for name in namespace_names:
+            namespace_ids.append((self.write_namespace(name), name))
+        self.write_files(namespace_ids)
+        self.write_index()
+
+
+    # Writes a namespace with its classes, specializations, functions, typedefs, variables and an
+    # enum
+    # Returns the namespace's Doxygen ID
+    def write_namespace(self, name):
+        namespace_id = "namespace" + name.replace("::", "_1_1")
+        classes = []
+        for c in range(self.classes):
+            class_name = "{}::class{}".format(name, c)
+            classes.append(("class" + class_name.replace("::", "_1_1"), class_name))
+        self.refs.extend(classes)
+
+        xml = '  <compounddef id="{}" kind="namespace">\n    <compoundname>{}</compoundname>\n' \
+            .format(namespace_id, name)
+        for class_id, class_name in classes:
+            xml += '    <innerclass refid="{}" prot="public">{}</innerclass>\n'.format(class_id,
+                                                                                    class_name)
+        # Explicit specializations are inner classes of the namespace as well
+        inherited = []
+        for index, (class_id, class_name) in enumerate(classes):
+            base = classes[index - 1] if index % (self.depth + 1) != 0 else None
+            inherited = self.write_class(class_id, class_name, index, base, inherited)
+            for s in range(self.specializations if index % 2 == 0 else 0):
+                specialization_id, specialization_name = self.write_specialization(class_name, s)
+                xml += '    <innerclass refid="{}" prot="public">{}</innerclass>\n'.format(
+                    specialization_id, escape(specialization_name))
+
+        xml += '    <sectiondef kind="func">\n'
+        for f in range(self.classes):
+            for o in range(self.overloads):
+                member_id = self.member_id(namespace_id)
+                self.file_members.append(member_id)
+                if o % 2 == 1:
+                    return_type = '<ref refid="{}" kindref="compound">{}</ref> &amp;'.format(
+                        *self.random.choice(classes))
+                else:
+                    return_type = "int"
+                xml += ('      <memberdef kind="function" id="{}" prot="public" static="no" '
+                        'const="no" explicit="no" inline="{}" virt="non-virtual">\n'
+                        '        <type>{}</type>\n'
+                        '        <definition>int {}::func{}</definition>\n'
+                        '        <argsstring>(int a{}, std::vector&lt; int &gt; b)</argsstring>\n'
+                        '        <name>func{}</name>\n        {}\n        {}\n'
+                        '        <inbodydescription></inbodydescription>\n'
+                        '        <location file="h{}.h" line="{}"/>\n      </memberdef>\n').format(
+                    member_id, "yes" if o > 0 else "no", return_type, name, f, o, f,
+                    self.description("briefdescription", 6),
+                    self.description("detaileddescription", self.words, [ "a" + str(o), "b" ]),
+                    f, o)
+
+        xml += '    </sectiondef>\n    <sectiondef kind="typedef">\n'
+        for t in range(2):
+            member_id = self.member_id(namespace_id)
+            self.file_members.append(member_id)
+            xml += ('      <memberdef kind="typedef" id="{}" prot="public" static="no">\n'
+                    '        <type>std::map&lt; int, <ref refid="{}" kindref="compound">x</ref> '
+                    '&gt;</type>\n'
+                    '        <definition>typedef int {}::type{}</definition>\n'
+                    '        <argsstring></argsstring>\n        <name>type{}</name>\n        {}\n'
+                    '        <detaileddescription></detaileddescription>\n'
+                    '      </memberdef>\n').format(member_id, classes[0][0], name, t, t,
+                                                   self.description("briefdescription", 5))
+            member_id = self.member_id(namespace_id)
+            self.file_members.append(member_id)
+            xml += ('      <memberdef kind="variable" id="{}" prot="public" static="no" '
+                    'mutable="no">\n'
+                    '        <type>const std::array&lt; int, 3 &gt;</type>\n'
+                    '        <definition>const int {}::var{}</definition>\n'
+                    '        <argsstring></argsstring>\n        <name>var{}</name>\n'
+                    '        <initializer>= {{ 1, 2, 3 }}</initializer>\n        {}\n'
+                    '        <detaileddescription></detaileddescription>\n'
+                    '      </memberdef>\n').format(member_id, name, t, t,
+                                                   self.description("briefdescription", 5))
+
+        member_id = self.member_id(namespace_id)
+        self.file_members.append(member_id)
+        xml += ('      <memberdef kind="enum" id="{0}" prot="public" static="no">\n'
+                '        <name>color</name>\n'
+                '        <enumvalue id="{0}_1a1" prot="public"><name>red</name><initializer>= 1'
+                '</initializer>{1}<detaileddescription></detaileddescription></enumvalue>\n'
+                '        <enumvalue id="{0}_1a2" prot="public"><name>green</name>'
+                '<briefdescription></briefdescription><detaileddescription>'
+                '</detaileddescription></enumvalue>\n'
+                '        {2}\n        <detaileddescription></detaileddescription>\n'
+                '      </memberdef>\n').format(member_id, self.description("briefdescription", 3),
+                                               self.description("briefdescription", 3))
+        xml += '    </sectiondef>\n    {}\n    {}\n  </compounddef>\n'.format(
+            self.description("briefdescription", 8),
+            self.description("detaileddescription", self.words))
+        self.write_file(namespace_id, xml)
+        return namespace_id
+
+
+    # Writes a class template (for even indices) or class, and its header file
+    #   index: The index of the class in its namespace
+    #   base: (doxygen_id, full name) of the base class, or None
+    #   inherited: (doxygen_id, name, scope) of all members of the base class
+    # Returns (doxygen_id, name, scope) of all members of the class
+    def write_class(self, class_id, class_name, index, base, inherited):
+        short_name = class_name.split("::")[-1]
+        namespace_name = class_name[0:class_name.rfind("::")]
+        file_id = "h{}_{}_8h".format(namespace_name.replace("::", "_"), index)
+        self.files.append((file_id, "{}/{}.h".format(namespace_name.replace("::", "/"),
+                                                      short_name), class_id))
+
+        xml = ('  <compounddef id="{}" kind="class" prot="public">\n'
+               '    <compoundname>{}</compoundname>\n').format(class_id, class_name)
+        if base != None:
+            xml += ('    <basecompoundref refid="{}" prot="public" virt="non-virtual">{}'
+                    '</basecompoundref>\n').format(*base)
+        xml += '    <includes refid="{}" local="no">{}.h</includes>\n'.format(file_id, short_name)
+        if index % 2 == 0:
+            xml += ('    <templateparamlist><param><type>typename</type><declname>T</declname>'
+                    '<defname>T</defname></param><param><type>int</type><declname>N</declname>'
+                    '</param></templateparamlist>\n')
+
+        members = []
+        xml += '    <sectiondef kind="public-func">\n'
+        names = [ short_name, "~" + short_name, "get", "get", "set" ]
+        names += [ "op{}".format(o) for o in range(self.overloads) ]
+        for name in names:
+            member_id = self.member_id(class_id)
+            members.append((member_id, name, class_name))
+            xml += ('      <memberdef kind="function" id="{}" prot="public" static="no" '
+                    'const="no" explicit="{}" inline="no" virt="non-virtual">\n'
+                    '        <type>{}</type>\n        <definition>{}::{}</definition>\n'
+                    '        <argsstring>()</argsstring>\n        <name>{}</name>\n'
+                    '        {}\n        {}\n      </memberdef>\n').format(
+                member_id, "yes" if name == short_name else "no",
+                "" if short_name in name else "int", class_name, escape(name), escape(name),
+                self.description("briefdescription", 5),
+                self.description("detaileddescription", self.words // 2))
+
+        xml += '    </sectiondef>\n    <sectiondef kind="protected-attrib">\n'
+        for m in range(2):
+            member_id = self.member_id(class_id)
+            members.append((member_id, "m" + str(m), class_name))
+            xml += ('      <memberdef kind="variable" id="{}" prot="protected" static="{}" '
+                    'mutable="no">\n'
+                    '        <type>int</type>\n        <definition>int {}::m{}</definition>\n'
+                    '        <argsstring></argsstring>\n        <name>m{}</name>\n        {}\n'
+                    '      </memberdef>\n').format(member_id, "yes" if m > 0 else "no",
+                                                   class_name, m, m,
+                                                   self.description("briefdescription", 3))
+
+        xml += '    </sectiondef>\n    <sectiondef kind="public-type">\n'
+        member_id = self.member_id(class_id)
+        members.append((member_id, "value_type", class_name))
+        xml += ('      <memberdef kind="typedef" id="{}" prot="public" static="no">\n'
+                '        <type>T</type>\n        <definition>typedef T {}::value_type</definition>\n'
+                '        <argsstring></argsstring>\n        <name>value_type</name>\n        {}\n'
+                '      </memberdef>\n').format(member_id, class_name,
+                                               self.description("briefdescription", 3))
+        xml += '    </sectiondef>\n    {}\n    {}\n    <listofallmembers>\n'.format(
+            self.description("briefdescription", 8),
+            self.description("detaileddescription", self.words))
+
+        if base != None: members += inherited
+        for member_id, name, scope in members:
+            xml += ('      <member refid="{}" prot="public" virt="non-virtual"><scope>{}</scope>'
+                    '<name>{}</name></member>\n').format(member_id, scope, escape(name))
+        xml += '    </listofallmembers>\n  </compounddef>\n'
+        self.write_file(class_id, xml)
+        return members
+
+
+    # Writes an explicit specialization "class_name< number >"
+    # Returns its Doxygen ID and name
+    def write_specialization(self, class_name, number):
+        name = "{}< {} >".format(class_name, number)
+        specialization_id = "class{}_3_01{}_01_4".format(class_name.replace("::", "_1_1"), number)
+        member_id = self.member_id(specialization_id)
+        xml = ('  <compounddef id="{}" kind="class" prot="public">\n'
+               '    <compoundname>{}</compoundname>\n    <templateparamlist></templateparamlist>\n'
+               '    <sectiondef kind="public-func">\n'
+               '      <memberdef kind="function" id="{}" prot="public" static="yes" const="no" '
+               'explicit="no" inline="no" virt="non-virtual">\n'
+               '        <type>void</type>\n        <definition>void {}::special</definition>\n'
+               '        <argsstring>()</argsstring>\n        <name>special</name>\n        {}\n'
+               '      </memberdef>\n    </sectiondef>\n    {}\n'
+               '    <listofallmembers><member refid="{}" prot="public"><name>special</name>'
+               '</member></listofallmembers>\n  </compounddef>\n').format(
+            specialization_id, escape(name), member_id, escape(name),
+            self.description("briefdescription", 4), self.description("briefdescription", 4),
+            member_id)
+        self.write_file(specialization_id, xml)
+        return specialization_id, name
+
+
+    # Writes the header files, a file with #defines listing all namespaces, a directory, a group
+    # and a page
+    #   namespace_ids: (doxygen_id, name) of all namespaces
+    def write_files(self, namespace_ids):
+        for file_id, path, class_id in self.files:
+            self.write_file(file_id, ('  <compounddef id="{}" kind="file">\n'
+                                      '    <compoundname>{}</compoundname>\n'
+                                      '    <innerclass refid="{}" prot="public">x</innerclass>\n'
+                                      '    {}\n  </compounddef>\n').format(
+                file_id, path.split("/")[-1], class_id, self.description("briefdescription", 3)))
+
+        xml = '  <compounddef id="all_8h" kind="file">\n    <compoundname>all.h</compoundname>\n'
+        for namespace_id, name in namespace_ids:
+            xml += '    <innernamespace refid="{}">{}</innernamespace>\n'.format(namespace_id,
+                                                                                 name)
+        xml += '    <sectiondef kind="define">\n'
+        for d in range(3):
+            xml += ('      <memberdef kind="define" id="{}" prot="public" static="no">\n'
+                    '        <name>MACRO{}</name>\n'
+                    '        <param><defname>x</defname></param>\n'
+                    '        <param><defname>y</defname></param>\n'
+                    '        <initializer>((x) + (y))</initializer>\n        {}\n'
+                    '        <detaileddescription></detaileddescription>\n'
+                    '      </memberdef>\n').format(self.member_id("all_8h"), d,
+                                                   self.description("briefdescription", 4))
+        xml += ('      <memberdef kind="function" id="{}" prot="public" static="no" const="no" '
+                'explicit="no" inline="no" virt="non-virtual">\n'
+                '        <type>void</type>\n        <definition>void scopeless</definition>\n'
+                '        <argsstring>()</argsstring>\n        <name>scopeless</name>\n        {}\n'
+                '      </memberdef>\n').format(self.member_id("all_8h"),
+                                               self.description("briefdescription", 4))
+        # Files list the namespace members they declare, too
+        xml += '    </sectiondef>\n    <sectiondef kind="func">\n'
+        for member_id in self.file_members[0 : len(self.file_members) // 2]:
+            xml += ('      <memberdef kind="function" id="{}" prot="public" static="no">'
+                    '<type>int</type><definition>dup</definition><argsstring>()</argsstring>'
+                    '<name>dup</name></memberdef>\n').format(member_id)
+        xml += '    </sectiondef>\n  </compounddef>\n'
+        self.write_file("all_8h", xml)
+
+        xml = ('  <compounddef id="dir_0001" kind="dir">\n'
+               '    <compoundname>/src/include</compoundname>\n')
+        for file_id, path, class_id in self.files + [ ("all_8h", "all.h", None) ]:
+            xml += '    <innerfile refid="{}">{}</innerfile>\n'.format(file_id, path)
+        self.write_file("dir_0001", xml + '  </compounddef>\n')
+
+        xml = ('  <compounddef id="group__core" kind="group">\n'
+               '    <compoundname>core</compoundname>\n    <title>core module</title>\n')
+        for class_id, name in self.refs[0:3]:
+            xml += '    <innerclass refid="{}" prot="public">{}</innerclass>\n'.format(class_id,
+                                                                                    name)
+        xml += '    {}\n  </compounddef>\n'.format(self.description("detaileddescription",
+                                                                    self.words))
+        self.write_file("group__core", xml)
+
+        self.write_file("intro", ('  <compounddef id="intro" kind="page">\n'
+                                  '    <compoundname>intro</compoundname>\n'
+                                  '    <title>introduction</title>\n    {}\n'
+                                  '  </compounddef>\n').format(
+            self.description("detaileddescription", self.words)))
+
+
+    # Writes index.xml listing all compounds written before and their members, like Doxygen
+    def write_index(self):
+        xml = '<?xml version="1.0"?>\n<doxygenindex version="1.8.6">\n'
+        for file_name in sorted(os.listdir(self.output_dir)):
+            if file_name == "index.xml" or not file_name.endswith(".xml"): continue
+            root = ElementTree.parse(os.path.join(self.output_dir, file_name)).getroot()
+            for compound in root.iter("compounddef"):
+                xml += '  <compound refid="{}" kind="{}"><name>{}</name>\n'.format(
+                    compound.get("id"), compound.get("kind"), 
+                    escape(compound.findtext("compoundname")))
+                for member in compound.iter("memberdef"):
+                    xml += '    <member refid="{}" kind="{}"><name>{}</name></member>\n'.format(
+                        member.get("id"), member.get("kind"), escape(member.findtext("name")))
+                    for value in member.iter("enumvalue"):
+                        xml += ('    <member refid="{}" kind="enumvalue"><name>{}</name>'
+                                '</member>\n').format(value.get("id"), 
+                                                       escape(value.findtext("name")))
+                xml += '  </compound>\n'
+        with open(os.path.join(self.output_dir, "index.xml"), "w") as file:
+            file.write(xml + '</doxygenindex>\n')
+
+
+# Writes a corpus, see Corpus for the parameters
+def generate(output_dir, **parameters):
+    options = dict(defaults)
+    options.update(parameters)
+    Corpus(output_dir, **options).write()
+
+
+# Adds the corpus parameters to an argparse.ArgumentParser
+def add_arguments(parser):
+    for name, value in defaults.items():
+        parser.add_argument("--" + name, type=int, default=value, metavar="N",
+                            help="default: {}".format(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Writes a synthetic Doxygen XML corpus")
+    parser.add_argument("output_dir", help="the directory to write .xml files to")
+    add_arguments(parser)
+    args = parser.parse_args()
+    generate(args.output_dir, **dict((name, getattr(args, name)) for name in defaults))
+
+
+if __name__ == "__main__":
+    main()
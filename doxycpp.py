@@ -16,11 +16,39 @@
 
 
     
-import hashlib, copy, sys, locale, os
+import hashlib, copy, sys, locale, os, multiprocessing, pickle, json, time, re, contextlib
+import tracemalloc, cProfile, gzip, concurrent.futures, collections, io, zipfile, tarfile
+import tempfile
 from lxml import etree
 
+try:
+    import resource
+except ImportError:
+    resource = None
 
-config = { "show_protected": True, "show_private": False }
+# Optional, for the "brotli" option
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Optional, for the "store" option
+try:
+    import sqlite3
+except ImportError:
+    sqlite3 = None
+
+
+# The default configuration of a Project
+config = { "show_protected": True, "show_private": False, "jobs": 1, "stream": False, 
+           "cache_dir": None, "cache_size": 256, "incremental": False, "watch": False, 
+           "shared_nav": False, "search": False, "profile": None, 
+           "profile_allocations": False, "cprofile": None, "minify": False, "gzip": False, 
+           "brotli": False, "static_dir": None, "html_writer": "lxml", "scope": None, 
+           "link_map": None, "shard": None, "external": [], 
+           "store": None, "store_cache": 1024 }
+
+version = "1.0.3"
 
 
 
@@ -43,29 +71,23 @@ def localize(spec):
     return locale[spec] if spec in locale else spec
 
 
-if len(sys.argv) > 1 and sys.argv[1] == "--version":
-    print("DoxyC++ Doxygen XML to HTML postprocessor version 1.0.3\n"
-        + "(C) 2014, Fabian Knorr <https://github.com/fknorr/doxycpp>\n\n"
-        + "DoxyC++ is free software: you can redistribute it and/or modify it under\n"
-        + "the terms of the GNU General Public License as published by the Free Software\n"
-        + "Foundation, either version 3 of the License, or (at your option) any later\n"
-        + "version.", file=sys.stderr)
-    sys.exit(1)
 
-if len(sys.argv) < 2 or (len(sys.argv) > 1 and sys.argv[1] == "--help"):
-    print("Syntax: " + sys.argv[0] + " <output directory>\n"
-        + "        " + sys.argv[0] + " --help     Display this help\n"
-        + "        " + sys.argv[0] + " --version  Display version information\n\n"
-        + "DoxyC++ will read XML files from the current directory.", file=sys.stderr)
-    sys.exit(1)
-
-
-output_dir = sys.argv[1]
+# The member sets of all Declarations without members. Declarations allocate sets of their own
+# when the first member is added, see Declaration.add_member().
+no_members = frozenset()
 
 
 # A Declaration, extracted from XML. This is paritally resolved information and still contains
 # some XML tags.
+# There can be hundreds of thousands of Declarations, so they do not have a __dict__.
 class Declaration:
+    __slots__ = ("parent", "doxygen_id", "visibility", "is_static", "kind", "name", "full_name",
+                 "brief_description", "members", "all_members", "target_url", 
+                 "target_url_anchor", "definition", "include_files", "is_inline", "is_virtual",
+                 "template_params", "initializer", "data_type", "enum_values", "inherits_from",
+                 "inline_doc", "detailed_description", "inbody_description", "is_collection", 
+                 "page_title", "parameters", "is_explicit")
+
     def __init__(self, _doxygen_id):
         # The containing Declaration instance
         self.parent = None
@@ -79,7 +101,8 @@ class Declaration:
         # Whether the declaration is static within "parent"
         self.is_static = False
         
-        # The kind of declaration, e.g. "typedef", "struct", or "function"
+        # The kind of declaration, e.g. "typedef", "struct", or "function". Like "visibility", this
+        # is an interned string.
         self.kind = "none"
         
         # The (short) name of the declaration inside its scope, may initially
@@ -92,11 +115,11 @@ class Declaration:
         # The @brief-description
         self.brief_description = None
 
-        # Doxygen IDs of all direct (non-inherited) member
-        self.members = set()
+        # Doxygen IDs of all direct (non-inherited) member, "no_members" if there are none
+        self.members = no_members
 
-        # Doxygen IDs of all direct and inherited members
-        self.all_members = set()
+        # Doxygen IDs of all direct and inherited members, "no_members" if there are none
+        self.all_members = no_members
 
         # The declaration's relative URL, that is either a file name like "namespace-sde-b191.html"
         # or a file name with an anchor for an inlined definition
@@ -140,6 +163,9 @@ class Declaration:
         # The XML <detaileddescription> of this declaration
         self.detailed_description = None
 
+        # The XML <inbodydescription> of this declaration
+        self.inbody_description = None
+
         # Whether the node is just an arbitrary collections of objects and thus does
         # not participate in the scope hierarchy (e.g. file member listings)
         self.is_collection = False
@@ -147,38 +173,96 @@ class Declaration:
         # The page title if this is a special page
         self.page_title = None
 
-        # The XML <argstring> tag of the declared function (if any)
+        # The text of the XML <argsstring> tag of the declared function, or the parameter list of a
+        # preprocessor macro (if any)
         self.parameters = None
 
         # Whether the declaration (e.g. a constructor) was declared "explicit
         self.is_explicit = False
 
-
-# Maps weird Doxygen IDs (like "classfn_1_1definition__array_4") to Declaration instances
-declarations = dict()
-
-
-
-# Reads a <compounddef> or <memberdef> tag, updating "declarations"
+    # lxml elements cannot be pickled, so they are serialized into XmlFragments when a
+    # Declaration is sent to another process and parsed again when it is received.
+    def __getstate__(self):
+        state = dict()
+        for key in Declaration.__slots__:
+            value = getattr(self, key)
+            if etree.iselement(value):
+                value = XmlFragment(etree.tostring(value, with_tail=False))
+            elif isinstance(value, list):
+                value = [XmlFragment(etree.tostring(e, with_tail=False)) if etree.iselement(e) \
+                         else e for e in value]
+            state[key] = value
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            if isinstance(value, XmlFragment):
+                value = etree.fromstring(value)
+            elif isinstance(value, list):
+                value = [etree.fromstring(e) if isinstance(e, XmlFragment) else e for e in value]
+            # Empty member sets are shared again
+            elif isinstance(value, frozenset):
+                value = no_members
+            elif key == "kind" or key == "visibility":
+                value = sys.intern(value) if value != None else None
+            setattr(self, key, value)
+
+    # Returns a copy that can be resolved without modifying this Declaration. XML elements are
+    # shared, since they are never modified.
+    def unresolved_copy(self):
+        decl = Declaration.__new__(Declaration)
+        for key in Declaration.__slots__:
+            setattr(decl, key, getattr(self, key))
+        if self.members is not no_members: decl.members = set(self.members)
+        if self.all_members is not no_members: decl.all_members = set(self.all_members)
+        return decl
+
+    # Adds a member, allocating the member sets on first use
+    #   doxygen_id: The Doxygen ID of the member
+    #   direct: Whether this is a direct member, or only an inherited one
+    def add_member(self, doxygen_id, direct=True):
+        if self.all_members is no_members: self.all_members = set()
+        self.all_members.add(doxygen_id)
+        if direct:
+            if self.members is no_members: self.members = set()
+            self.members.add(doxygen_id)
+
+    # Adds all members of another Declaration with the same Doxygen ID, read from another file
+    def merge_members(self, other):
+        if other.members is not no_members:
+            if self.members is no_members: self.members = set()
+            self.members |= other.members
+        if other.all_members is not no_members:
+            if self.all_members is no_members: self.all_members = set()
+            self.all_members |= other.all_members
+
+
+# The serialized form of an XML element inside a pickled Declaration
+class XmlFragment(bytes):
+    pass
+
+
+# Reads a <compounddef> or <memberdef> tag, updating "decls"
 #   xml_node: The XML node to read from
 #   parent_decl: The Declaration object containing this declaratinon, or None.
 #   kind: The kind of declaration, corresponding to Declaration.kind
-def read_xml_memberdef(xml_node, parent_decl, kind):
+#   decls: The dictionary to add the Declaration to, usually Project.declarations
+def read_xml_memberdef(xml_node, parent_decl, kind, decls):
     doxygen_id = xml_node.get("id")
     
     # Add itself to parent
     if parent_decl != None: 
-        parent_decl.all_members.add(doxygen_id)
-        parent_decl.members.add(doxygen_id)
+        parent_decl.add_member(doxygen_id)
 
     # The doxygen_id might already have been visited (who knows?)
-    if not doxygen_id in declarations:  
+    if not doxygen_id in decls:  
         member = Declaration(doxygen_id)     
-        declarations[doxygen_id] = member
-        member.kind = kind 
+        decls[doxygen_id] = member
+        member.kind = sys.intern(kind)
         member.inline_doc = (kind == "typedef" or kind == "variable" or kind == "define")
         member.is_collection = (kind == "group" or kind == "page" or kind == "file")
-        member.visibility = xml_node.get("prot")
+        if xml_node.get("prot") != None: member.visibility = sys.intern(xml_node.get("prot"))
+        else: member.visibility = None
         member.is_static = xml_node.get("static") == "yes"
         member.is_virtual = xml_node.get("virtual") == "yes"
         member.is_inline = xml_node.get("inline") == "yes"
@@ -188,9 +272,9 @@ def read_xml_memberdef(xml_node, parent_decl, kind):
             if e.tag == "type": member.data_type = e
             elif e.tag == "title": member.page_title = e.text
             elif e.tag == "definition": member.definition = e
-            elif e.tag == "argsstring": member.parameters = e
+            elif e.tag == "argsstring": member.parameters = e.text if e.text != None else ""
             elif e.tag == "name" or e.tag == "compoundname": member.name = e.text
-            elif e.tag == "inbodydescription": member.ibdescr = e
+            elif e.tag == "inbodydescription": member.inbody_description = e
             elif e.tag == "briefdescription": member.brief_description = e
             elif e.tag == "initializer": member.initializer = e
             elif e.tag == "includes": member.include_files.append(e)
@@ -203,180 +287,830 @@ def read_xml_memberdef(xml_node, parent_decl, kind):
             elif e.tag == "param":
                 for f in e.iterchildren(tag=etree.Element):
                     if kind == "define" and f.tag == "defname":
-                        if member.parameters != None: member.parameters.text += ", "
-                        else: 
-                            member.parameters = etree.Element("argsstring")
-                            member.parameters.text = "("
-                        member.parameters.text += f.text
+                        if member.parameters != None: member.parameters += ", "
+                        else: member.parameters = "("
+                        member.parameters += f.text
         if kind == "define" and member.parameters != None:
-            member.parameters.text += ")"    
+            member.parameters += ")"    
         return member
         
-    else: return declarations[doxygen_id]
-
-
-
-# Parse all .xml files in the current directory, updating "declarations"
-for file_name in os.listdir():
-    if len(file_name) > 3 and file_name[-4:] == ".xml" and os.path.isfile(file_name):
+    else: return decls[doxygen_id]
+
+
+
+# Parses a single .xml file, adding all contained declarations to "decls"
+#   file_name: The file to read
+#   decls: The dictionary to add Declarations to
+def read_xml_file(file_name, decls):
+    try:
+        parser = etree.XMLParser(recover=True)
+        with open(file_name, 'rb') as file:
+            parser.feed(file.read())
+            xtree = parser.close()
+    except etree.XMLSyntaxError as e:
+        print('Skipping file {}: {}'.format(file_name, e), file=sys.stderr)
+        return
+
+    # <compounddef>s contain <memberdef>s and <innerclass>es, which hold the main information
+    compounds = xtree.xpath("/doxygen/compounddef")
+    for xml_node in compounds: 
+        delcaration = read_xml_memberdef(xml_node, None, xml_node.get("kind"), decls)
+        for child in xml_node.iterchildren(tag=etree.Element):
+            if child.tag == "innerclass" or child.tag == "innerfile" or child.tag == "innerdir":
+                delcaration.add_member(child.get("refid"))
+            elif child.tag == "sectiondef": 
+                for f in child.iterchildren(tag="memberdef"):
+                    read_xml_memberdef(f, delcaration, f.get("kind"), decls)
+            elif child.tag == "listofallmembers" and not delcaration.is_collection:
+                for f in child.iterchildren(tag="member"):
+                    delcaration.add_member(f.get("refid"), False)
+
+
+# Replaces all XML elements referenced by a Declaration with copies that do not belong to
+# the document they were read from, so that the document can be freed.
+def detach_xml(decl):
+    for key in Declaration.__slots__:
+        value = getattr(decl, key)
+        if etree.iselement(value):
+            setattr(decl, key, copy.deepcopy(value))
+        elif isinstance(value, list):
+            setattr(decl, key, [copy.deepcopy(e) if etree.iselement(e) else e for e in value])
+
+
+# Parses a single .xml file incrementally, adding all contained declarations to "decls".
+# Produces the same Declarations as read_xml_file, but each <memberdef> and <compounddef> is
+# converted as soon as it has been read and then removed from the document, keeping only
+# detached copies of the XML needed later on.
+#   file_name: The file to read
+#   decls: The dictionary to add Declarations to
+def stream_xml_file(file_name, decls):
+    # The <compounddef> is only complete after its <memberdef>s, so they are read into
+    # a dictionary of their own first
+    pending = dict()
+    try:
+        for event, xml_node in etree.iterparse(file_name, events=("end",), 
+                tag=("memberdef", "compounddef"), recover=True):
+            parent = xml_node.getparent()
+            if parent == None: continue
+            if xml_node.tag == "memberdef":
+                compound = parent.getparent()
+                if parent.tag != "sectiondef" or compound == None or compound.tag != "compounddef" \
+                        or compound.getparent() == None \
+                        or compound.getparent().getparent() != None: 
+                    continue
+                doxygen_id = xml_node.get("id")
+                if doxygen_id not in pending and doxygen_id not in decls:
+                    detach_xml(read_xml_memberdef(xml_node, None, xml_node.get("kind"), pending))
+                else: pending.setdefault(doxygen_id, None)
+
+            elif parent.getparent() == None and parent.tag == "doxygen":
+                is_new = xml_node.get("id") not in decls
+                delcaration = read_xml_memberdef(xml_node, None, xml_node.get("kind"), decls)
+                if is_new: detach_xml(delcaration)
+                for child in xml_node.iterchildren(tag=etree.Element):
+                    if child.tag == "innerclass" or child.tag == "innerfile" \
+                            or child.tag == "innerdir":
+                        delcaration.add_member(child.get("refid"))
+                    elif child.tag == "listofallmembers" and not delcaration.is_collection:
+                        for f in child.iterchildren(tag="member"):
+                            delcaration.add_member(f.get("refid"), False)
+                for doxygen_id, member in pending.items():
+                    delcaration.add_member(doxygen_id)
+                    if member != None and doxygen_id not in decls: 
+                        decls[doxygen_id] = member
+                pending = dict()
+            else: continue
+
+            # Drop everything read so far
+            xml_node.clear()
+            while xml_node.getprevious() != None:
+                del parent[0]
+    except etree.XMLSyntaxError as e:
+        print('Skipping file {}: {}'.format(file_name, e), file=sys.stderr)
+
+
+
+# Parses a single .xml file, either at once or incrementally
+#   file_name: The file to read
+#   decls: The dictionary to add Declarations to
+#   stream: Whether to use stream_xml_file
+def read_xml(file_name, decls, stream):
+    if stream: stream_xml_file(file_name, decls)
+    else: read_xml_file(file_name, decls)
+
+# Reads Doxygen's index.xml, which lists every compound and its members
+#   file_name: The file to read
+# Returns a list of (doxygen_id, kind, name, members) tuples, one per compound, where "members" is
+# a list of (doxygen_id, kind, name) tuples. The list is empty if the file cannot be read.
+def read_xml_index(file_name):
+    try:
+        root = etree.parse(file_name, etree.XMLParser(recover=True)).getroot()
+    except (OSError, etree.XMLSyntaxError) as e:
+        print('Skipping file {}: {}'.format(file_name, e), file=sys.stderr)
+        return []
+    compounds = []
+    for compound in (root.iterchildren(tag="compound") if root != None else ()):
+        members = [ (member.get("refid"), member.get("kind"), member.findtext("name"))
+                    for member in compound.iterchildren(tag="member") ]
+        compounds.append((compound.get("refid"), compound.get("kind"), 
+                          compound.findtext("name"), members))
+    return compounds
+
+
+# Returns the scope a qualified name like "a::b<c::d>" is declared in, i.e. "a", or None
+def enclosing_scope(name):
+    level = 0; end = None
+    for i, c in enumerate(name):
+        if c == '<': level += 1
+        elif c == '>': level -= 1
+        elif c == ':' and level == 0 and name[i+1:i+2] == ':': end = i
+    return name[0:end] if end != None else None
+
+
+# Returns a scope name given with the "scope" option or taken from a link map without a trailing
+# "::" or "/"
+def scope_name(scope):
+    if scope.endswith("::"): return scope[0:-2]
+    if scope.endswith("/") and len(scope) > 1: return scope[0:-1]
+    return scope
+
+
+# Parses a shard given on the command line like "2/4", i.e. the second of four shards
+# Returns the shard number and the number of shards
+def shard_spec(value):
+    number, count = value.split("/")
+    number, count = int(number), int(count)
+    if number < 1 or number > count: raise ValueError("Invalid shard '{}'".format(value))
+    return (number, count)
+
+
+# Parses an external link given on the command line like "FILE=URL", see read_external_links()
+# Returns a list with the file name and base URL
+def external_spec(value):
+    file_name, separator, base_url = value.partition("=")
+    if separator == "": raise ValueError("Missing base URL for '{}'".format(value))
+    return [ (file_name, base_url) ]
+
+
+# Tag file member kinds that DoxyC++ names differently
+tag_file_kinds = { "enumeration": "enum" }
+
+
+# Reads a Doxygen tag file, as written with GENERATE_TAGFILE, which lists the compounds and
+# members of another project and the HTML files documenting them. Their Doxygen IDs are the file
+# names without extension, with "_1" and the anchor appended for members, as in <ref> tags.
+#   file_name: The file to read
+#   base_url: The URL the file names are relative to
+# Returns a dictionary mapping Doxygen IDs to [target_url, full_name, kind] link targets
+def read_tag_file(file_name, base_url):
+    links = dict()
+    root = etree.parse(file_name, etree.XMLParser(recover=True)).getroot()
+    for compound in (root.iterchildren(tag="compound") if root != None else ()):
+        name = compound.findtext("name")
+        if name == None or compound.findtext("filename") == None: continue
+        kind = compound.get("kind")
+        prefix = "" if kind in ("file", "group", "page", "dir") else name + "::"
+        targets = [ (compound.findtext("filename"), None, name, kind) ]
+        for member in compound.iterchildren(tag="member"):
+            member_kind = tag_file_kinds.get(member.get("kind"), member.get("kind"))
+            targets.append((member.findtext("anchorfile"), member.findtext("anchor"), 
+                            prefix + (member.findtext("name") or ""), member_kind))
+            # Newer tag files list the values of enums
+            for value in member.iterchildren(tag="enumvalue"):
+                targets.append((value.get("file"), value.get("anchor"), prefix + (value.text or ""),
+                                "enumvalue"))
+
+        for target_file, anchor, full_name, target_kind in targets:
+            if target_file == None: continue
+            # Newer Doxygen versions omit the extension
+            if os.path.splitext(target_file)[1] == "": target_file += ".html"
+            doxygen_id = os.path.splitext(target_file)[0]
+            target_url = base_url + target_file
+            if anchor: 
+                doxygen_id += "_1" + anchor
+                target_url += "#" + anchor
+            links.setdefault(doxygen_id, [ target_url, full_name, target_kind ])
+    return links
+
+
+# Reads the link targets of another project from a Doxygen tag file, see read_tag_file(), or
+# from a link map written by Project.export_links()
+#   file_name: The file to read
+#   base_url: The URL of the other project's documentation
+# Returns a dictionary mapping Doxygen IDs to [target_url, full_name, kind] link targets
+def read_external_links(file_name, base_url):
+    if base_url != "" and not base_url.endswith("/"): base_url += "/"
+    with open(file_name, 'rb') as file:
+        is_link_map = file.read(64).lstrip().startswith(b"{")
+    if not is_link_map: return read_tag_file(file_name, base_url)
+    with open(file_name, 'r') as file:
+        links = json.load(file)["links"]
+    return dict((doxygen_id, [ base_url + target_url, full_name, kind ]) 
+                for doxygen_id, (target_url, full_name, kind) in links.items())
+
+
+# Adds a Declaration for every compound and member listed in index.xml that is missing from
+# "decls". These stubs only know their kind, name and members, which is enough to place them in
+# the hierarchy and to link to them, but not to document them.
+#   compounds: The result of read_xml_index(), in the order their files would be read in
+#   decls: The dictionary to add Declarations to
+def add_index_stubs(compounds, decls):
+    stubs = dict()
+    for doxygen_id, kind, name, members in compounds:
+        if doxygen_id in decls: continue
+        xml_node = etree.Element("compounddef", id=doxygen_id)
+        etree.SubElement(xml_node, "compoundname").text = name
+        stubs[doxygen_id] = read_xml_memberdef(xml_node, None, kind, decls)
+        for member_id, member_kind, member_name in members:
+            # Enumeration values are part of their enum
+            if member_kind == "enumvalue": continue
+            xml_node = etree.Element("memberdef", id=member_id)
+            etree.SubElement(xml_node, "name").text = member_name
+            read_xml_memberdef(xml_node, stubs[doxygen_id], member_kind, decls)
+
+    # Classes are members of the scope they are declared in, as with <innerclass>
+    scopes = dict((name, doxygen_id) for doxygen_id, kind, name, members in compounds 
+                  if kind in scope_file_prefixes)
+    for doxygen_id, kind, name, members in compounds:
+        if kind not in scope_file_prefixes or kind == "namespace": continue
+        scope_id = scopes.get(enclosing_scope(name))
+        if scope_id in stubs: stubs[scope_id].add_member(doxygen_id)
+
+
+# Options that change the Declarations read from .xml files, and thus invalidate the declaration
+# cache. None currently does: "stream" yields the same Declarations as reading files at once, and
+# all other options only affect the pages written.
+parse_config = set()
+
+# Options that change neither the declarations read nor the pages written
+runtime_config = { "jobs", "stream", "cache_dir", "cache_size", "incremental", "watch", "profile",
+                   "profile_allocations", "cprofile", "gzip", "brotli", "static_dir", "scope",
+                   "link_map", "shard", "external", "store", "store_cache" }
+
+# A hash of this script, so that caches and manifests are invalidated whenever DoxyC++ changes
+with open(os.path.abspath(__file__), 'rb') as file:
+    source_digest = hashlib.md5(file.read()).hexdigest()
+
+
+# Returns the content hash of a file as stored in cache entries
+def file_hash(file_name):
+    with open(file_name, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+# An on-disk cache of the declarations read from each XML file
+class DeclarationCache:
+    def __init__(self, cache_dir, cache_size, key):
+        # The directory holding all cache entries
+        self.cache_dir = cache_dir
+
+        # The maximum size of all entries, in megabytes
+        self.cache_size = cache_size
+
+        # Entries are only valid for the DoxyC++ version, source and parsing options they were
+        # created with, as summarized by this key, see Project.parse_key
+        self.key = key
+
+        # The names of all cache entries used in this run, these are never evicted
+        self.used = set()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Returns the file name of the cache entry for an XML file, which is derived from its path
+    def entry_name(self, file_name):
+        return os.path.join(self.cache_dir, 
+            hashlib.md5(bytearray(os.path.abspath(file_name), 'utf-8')).hexdigest() + ".pickle")
+
+    # Looks up the declarations of an XML file in the cache.
+    # A cache entry starts with a pickled header dict describing the XML file it was created from,
+    # followed by the pickled declarations dict. An entry is used if the file still has the same
+    # size and mtime or, failing that, the same content hash. In the latter case, the entry is
+    # updated with the new mtime, so that the file need not be hashed again next time.
+    # Returns None if there is no valid entry
+    def load(self, file_name):
+        entry_name = self.entry_name(file_name)
+        try:
+            with open(entry_name, 'rb') as entry:
+                header = pickle.load(entry)
+                if header["key"] != self.key or header["path"] != os.path.abspath(file_name):
+                    return None
+                stat = os.stat(file_name)
+                if stat.st_size != header["size"]: 
+                    return None
+                touched = stat.st_mtime_ns != header["mtime"]
+                if touched and file_hash(file_name) != header["hash"]:
+                    return None
+                data = entry.read()
+                decls = pickle.loads(data)
+        # A damaged entry is treated like a missing one
+        except Exception:
+            return None
+        if touched: 
+            self.write_entry(file_name, dict(header, mtime=stat.st_mtime_ns), data)
+        else:
+            # Mark the entry as recently used
+            os.utime(entry_name)
+        self.used.add(entry_name)
+        return decls
+
+    # Stores the declarations read from an XML file in the cache
+    def store(self, file_name, decls):
+        stat = os.stat(file_name)
+        header = { "key": self.key, "path": os.path.abspath(file_name), "size": stat.st_size, 
+                   "mtime": stat.st_mtime_ns, "hash": file_hash(file_name) }
+        try:
+            data = pickle.dumps(decls, pickle.HIGHEST_PROTOCOL)
+        except pickle.PicklingError as e:
+            print('Cannot write cache entry for {}: {}'.format(file_name, e), file=sys.stderr)
+            return
+        self.write_entry(file_name, header, data)
+        self.used.add(self.entry_name(file_name))
+
+    # Writes the cache entry of an XML file
+    #   file_name: The XML file
+    #   header: The header dict, see load()
+    #   data: The pickled declarations dict
+    def write_entry(self, file_name, header, data):
+        entry_name = self.entry_name(file_name)
+        # Write to a temporary file first, so concurrent readers never see a partial entry
+        temp_name = entry_name + ".%d.tmp" % os.getpid()
         try:
-            parser = etree.XMLParser(recover=True)
+            with open(temp_name, 'wb') as entry:
+                pickle.dump(header, entry, pickle.HIGHEST_PROTOCOL)
+                entry.write(data)
+            os.replace(temp_name, entry_name)
+        except OSError as e:
+            print('Cannot write cache entry for {}: {}'.format(file_name, e), file=sys.stderr)
+            if os.path.exists(temp_name): os.remove(temp_name)
+
+    # Removes entries that are invalid or whose XML file no longer exists, then evicts the least
+    # recently used entries until the cache fits into "cache_size" megabytes.
+    def prune(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_name = os.path.join(self.cache_dir, name)
+            if not name.endswith(".pickle") or not os.path.isfile(entry_name): continue
+            if entry_name not in self.used:
+                try:
+                    with open(entry_name, 'rb') as entry:
+                        header = pickle.load(entry)
+                    stale = header["key"] != self.key or not os.path.isfile(header["path"])
+                except Exception:
+                    stale = True
+                if stale:
+                    os.remove(entry_name)
+                    continue
+            stat = os.stat(entry_name)
+            entries.append((entry_name not in self.used, stat.st_mtime, stat.st_size, entry_name))
+
+        # Entries used in this run are sorted last and only evicted if they alone exceed the limit
+        entries.sort(key=lambda x: (not x[0], x[1]))
+        total_size = sum(e[2] for e in entries)
+        for unused, mtime, size, entry_name in entries:
+            if total_size <= self.cache_size * 1024 * 1024: break
+            os.remove(entry_name)
+            total_size -= size
+
+# The fields of a Declaration that are only needed to render pages, which a DeclarationStore
+# keeps out of memory
+stored_fields = ("brief_description", "detailed_description", "inbody_description", "data_type",
+                 "initializer", "template_params", "enum_values")
+
+
+# A Declaration whose "stored_fields" are read from a DeclarationStore, see
+# DeclarationStore.add(). Every store uses a subclass of its own, which sets "store".
+class StoredDeclaration(Declaration):
+    __slots__ = ()
+
+    # The DeclarationStore holding the fields
+    store = None
+
+    brief_description = property(lambda self: self.store.fields(self.doxygen_id)[0])
+    detailed_description = property(lambda self: self.store.fields(self.doxygen_id)[1])
+    inbody_description = property(lambda self: self.store.fields(self.doxygen_id)[2])
+    data_type = property(lambda self: self.store.fields(self.doxygen_id)[3])
+    initializer = property(lambda self: self.store.fields(self.doxygen_id)[4])
+    template_params = property(lambda self: self.store.fields(self.doxygen_id)[5])
+    enum_values = property(lambda self: self.store.fields(self.doxygen_id)[6])
+
+
+# Keeps the XML fragments of Declarations that are only needed to render pages in an SQLite
+# database instead of in memory, for the "store" option. Fragments are parsed again when a page
+# uses them, and the most recently used ones are kept in memory. The hierarchy, names and other
+# fields stay in memory, since resolve() and plan() visit every Declaration. The database is
+# scratch data, it is created with a unique name and removed by close().
+class DeclarationStore:
+    #   dir_name: The directory to create the database file in
+    #   cache_size: The number of Declarations whose fragments are kept in memory
+    def __init__(self, dir_name, cache_size):
+        os.makedirs(dir_name, exist_ok=True)
+        handle, self.file_name = tempfile.mkstemp(".sqlite", "doxycpp-store-", dir_name)
+        os.close(handle)
+        self.cache_size = cache_size
+
+        # Maps Doxygen IDs to the fields of recently used Declarations, see fields(), least
+        # recently used first
+        self.cache = collections.OrderedDict()
+
+        # The class of the Declarations added to this store
+        self.declaration_class = type("StoredDeclaration", (StoredDeclaration,), 
+                                      { "__slots__": (), "store": self })
+
+        # The connection and the process it was opened by, see connection()
+        self.database = None
+        self.pid = None
+
+        database = self.connection()
+        # The database only lives as long as the build, so it need not survive a crash
+        database.execute("PRAGMA journal_mode = OFF")
+        database.execute("PRAGMA synchronous = OFF")
+        database.execute("CREATE TABLE declarations (doxygen_id TEXT PRIMARY KEY, kind TEXT, "
+                         "name TEXT, fields BLOB)")
+
+    # Returns the connection to the database. Forked worker processes must not use the connection
+    # of their parent, so they open one of their own.
+    def connection(self):
+        if self.pid != os.getpid():
+            self.database = sqlite3.connect(self.file_name)
+            self.pid = os.getpid()
+        return self.database
+
+    # Moves the "stored_fields" of Declarations into the store. The Declarations become instances
+    # of "declaration_class", and the XML they keep is detached from the document it was read from.
+    #   decls: The Declarations to add, which must not be in the store yet
+    def add(self, decls):
+        rows = []
+        for decl in decls:
+            fields = []
+            for key in stored_fields:
+                value = getattr(decl, key)
+                if etree.iselement(value): value = etree.tostring(value, with_tail=False)
+                elif isinstance(value, list): 
+                    value = [ etree.tostring(e, with_tail=False) for e in value ]
+                fields.append(value)
+                setattr(decl, key, None)
+            detach_xml(decl)
+            decl.__class__ = self.declaration_class
+            rows.append((decl.doxygen_id, decl.kind, decl.name, 
+                         pickle.dumps(fields, pickle.HIGHEST_PROTOCOL)))
+        self.connection().executemany("INSERT INTO declarations VALUES (?, ?, ?, ?)", rows)
+
+    # Makes all Declarations added so far visible to worker processes forked afterwards
+    def commit(self):
+        self.connection().commit()
+
+    # Closes the database and removes its file. The store cannot be used afterwards.
+    def close(self):
+        if self.database != None: self.database.close()
+        self.database = None
+        self.pid = None
+        if os.path.exists(self.file_name): os.remove(self.file_name)
+
+    # Returns the "stored_fields" of a Declaration in the store as a list, in order
+    def fields(self, doxygen_id):
+        fields = self.cache.get(doxygen_id)
+        if fields != None:
+            self.cache.move_to_end(doxygen_id)
+            return fields
+        row = self.connection().execute("SELECT fields FROM declarations WHERE doxygen_id = ?", 
+                                        (doxygen_id,)).fetchone()
+        fields = []
+        for value in pickle.loads(row[0]):
+            if isinstance(value, bytes): value = etree.fromstring(value)
+            elif isinstance(value, list): value = [ etree.fromstring(e) for e in value ]
+            fields.append(value)
+        self.cache[doxygen_id] = fields
+        if len(self.cache) > self.cache_size: self.cache.popitem(last=False)
+        return fields
+
+
+# A context manager doing nothing, used in place of Profile.phase() and Profile.timer() without
+# the "profile" option
+@contextlib.contextmanager
+def no_profile():
+    yield
+
+
+# Records where the time of a build goes, for the "profile" option
+class Profile:
+    def __init__(self):
+        # Maps phase names to their accumulated wall time in seconds ("time"), the peak resident
+        # memory of the process in KiB when they ended ("peak_rss") and, if allocations are
+        # traced, the highest amount of memory allocated during any of their runs in bytes
+        # ("peak_allocated"). Phases do not overlap.
+        self.phases = dict()
+
+        # Maps names to the accumulated wall time in seconds of parts of a phase, see timer()
+        self.timers = dict()
+
+        # Maps names to counts, e.g. of files parsed
+        self.counters = dict()
+
+        # Maps the file name of every page written to its size in bytes and render time in seconds
+        self.pages = dict()
+
+        # The cProfile.Profile covering the rendering phase with the "cprofile" option, or None
+        self.profiler = None
+
+    # Context manager timing a phase and tracking its memory high-water marks. Allocations are
+    # only traced if tracemalloc has been started. Before Python 3.9, the peak cannot be reset,
+    # so the peak allocated during a phase includes that of the phases before it.
+    @contextlib.contextmanager
+    def phase(self, name):
+        tracing = tracemalloc.is_tracing()
+        if tracing and hasattr(tracemalloc, "reset_peak"): tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = self.phases.setdefault(name, { "time": 0, "peak_rss": None })
+            record["time"] += time.perf_counter() - start
+            if resource != None: 
+                peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                record["peak_rss"] = peak_rss // 1024 if sys.platform == "darwin" else peak_rss
+            if tracing:
+                record["peak_allocated"] = max(record.get("peak_allocated", 0), 
+                                               tracemalloc.get_traced_memory()[1])
+
+    # Context manager timing a part of a phase
+    @contextlib.contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[name] = self.timers.get(name, 0) + time.perf_counter() - start
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Records a page that has been rendered. Pages are only counted as written by
+    # Project.write_page() and Project.write_archive() if their file changed.
+    #   file_name: The page's file name
+    #   size: The size of the page in bytes
+    #   render_time: The time it took to render the page in seconds
+    def add_page(self, file_name, size, render_time):
+        self.pages[file_name] = (size, render_time)
+        self.timers["rendering"] = self.timers.get("rendering", 0) + render_time
+        self.count("pages_rendered")
+        self.count("page_bytes_rendered", size)
+
+    # Adds the timers, counters and pages recorded by a worker process
+    def merge(self, other):
+        for name, value in other.timers.items(): 
+            self.timers[name] = self.timers.get(name, 0) + value
+        for name, value in other.counters.items(): self.count(name, value)
+        self.pages.update(other.pages)
+
+    # Returns the report as a dictionary to be stored as JSON
+    #   config: The configuration of the Project
+    #   page_count: The number of pages to list as the largest and slowest pages
+    def report(self, config, page_count=20):
+        def page_list(key):
+            return [ { "file": file_name, "bytes": size, "render_time": render_time }
+                for file_name, (size, render_time) in sorted(self.pages.items(), key=key)[0:page_count] ]
+
+        return { "version": version, "config": config, "phases": self.phases, 
+                 "timers": self.timers, "counters": self.counters, 
+                 "largest_pages": page_list(lambda x: (-x[1][0], x[0])), 
+                 "slowest_pages": page_list(lambda x: (-x[1][1], x[0])) }
+
+
+# The Project whose work is distributed to worker processes. Workers are forked from the main
+# process and thus inherit the Project with all its declarations and pages.
+worker_project = None
+
+
+# Worker process entry point: Reads a single .xml file of "worker_project"
+# Returns the result of Project.read_file() and a Profile of reading the file with the "profile"
+# option
+def read_xml_file_isolated(file_name):
+    if worker_project.profile != None: worker_project.profile = Profile()
+    return worker_project.read_file(file_name), worker_project.profile
+
+
+# Worker process entry point: Renders and writes a page of "worker_project"
+#   task: A tuple of the page's index in Project.pages and the output directory
+# Returns the index, the result of Project.write_page() and a Profile of writing the page with
+# the "profile" option
+def write_page_isolated(task):
+    index, output_dir = task
+    # The compression threads of the main process do not exist in workers
+    worker_project.compressor = None
+    if worker_project.profile != None: worker_project.profile = Profile()
+    links, changed = worker_project.write_page(worker_project.pages[index], output_dir)
+    return index, links, changed, worker_project.profile
+
+
+# Worker process entry point: Renders a page of "worker_project"
+#   index: The page's index in Project.pages
+# Returns the index, the HTML and a Profile of rendering the page with the "profile" option
+def render_page_isolated(index):
+    if worker_project.profile != None: worker_project.profile = Profile()
+    html = worker_project.render_profiled(worker_project.pages[index])
+    return index, html, worker_project.profile
+
+
+# Returns a process pool for "project", whose workers inherit it as "worker_project"
+def worker_pool(project):
+    global worker_project
+    worker_project = project
+    return multiprocessing.get_context("fork").Pool(project.config["jobs"])
+
+# The prefixes of the names of .xml files Doxygen writes for namespaces and classes
+scope_file_prefixes = ("namespace", "class", "struct", "union", "interface")
+
+
+# Sort key for Declarations documented on the same page: By name, then by definition and
+# parameters, so that overloads are listed in the same order on every run
+def decl_order(decl):
+    definition = decl.definition.text if decl.definition != None else None
+    return (decl.name, definition or "", decl.parameters, decl.doxygen_id)
+
+
+# Writes a file unless it already exists with the same contents, so that unchanged files keep
+# their modification time
+#   file_name: The file to write
+#   contents: The file contents as bytes
+# Returns whether the file was written
+def write_if_changed(file_name, contents):
+    try:
+        if os.path.getsize(file_name) == len(contents):
             with open(file_name, 'rb') as file:
-                parser.feed(file.read())
-                xtree = parser.close()
-        except etree.XMLSyntaxError as e:
-            print('Skipping file {}: {}'.format(file_name, e), file=sys.stderr)
-            continue
-
-        # <compounddef>s contain <memberdef>s and <innerclass>es, which hold the main information
-        compounds = xtree.xpath("/doxygen/compounddef")
-        for xml_node in compounds: 
-            delcaration = read_xml_memberdef(xml_node, None, xml_node.get("kind"))
-            for child in xml_node.iterchildren(tag=etree.Element):
-                if child.tag == "innerclass" or child.tag == "innerfile" or child.tag == "innerdir":
-                    delcaration.members.add(child.get("refid"))
-                    delcaration.all_members.add(child.get("refid"))
-                elif child.tag == "sectiondef": 
-                    for f in child.iterchildren(tag="memberdef"):
-                        read_xml_memberdef(f, delcaration, f.get("kind"))
-                elif child.tag == "listofallmembers" and not delcaration.is_collection:
-                    for f in child.iterchildren(tag="member"):
-                        delcaration.all_members.add(f.get("refid"))
-
+                if file.read() == contents: return False
+    except OSError:
+        pass
+    with open(file_name, 'wb') as file:
+        file.write(contents)
+    return True
+
+
+# Compresses file contents with gzip. The result does not record a modification time, so
+# compressing the same contents always yields the same file.
+#   contents: The file contents as bytes
+# Returns the compressed contents
+def gzip_compress(contents):
+    buffer = io.BytesIO()
+    # gzip.compress() only accepts "mtime" from Python 3.8 on
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=9, mtime=0) as gzip_file:
+        gzip_file.write(contents)
+    return buffer.getvalue()
+
+
+# The compressed variants of output files written next to them: The file name extension, the
+# "config" key enabling them and a function compressing file contents
+compressions = [ (".gz", "gzip", gzip_compress),
+                 (".br", "brotli", lambda contents: brotli.compress(contents)) ]
+
+
+# The file name extensions of output files that get compressed variants. Images and other files
+# that are compressed already would not get any smaller.
+compressible_extensions = (".html", ".css", ".js", ".json", ".svg")
+
+
+# Compresses a file's contents and writes the compressed file
+#   file_name: The compressed file to write
+#   compress: The function to compress with, see "compressions"
+#   contents: The contents of the uncompressed file
+def write_compressed(file_name, compress, contents):
+    with open(file_name, 'wb') as file:
+        file.write(compress(contents))
+
+
+# The archive formats write() supports: The file name extension, and "zip" or the tarfile mode to
+# write them with
+archive_formats = [ (".zip", "zip"), (".tar", "w"), (".tar.gz", "w:gz"), (".tgz", "w:gz"),
+                    (".tar.bz2", "w:bz2"), (".tar.xz", "w:xz") ]
+
+
+# Returns the format of an archive from "archive_formats", or None if file_name is not an archive
+def archive_format(file_name):
+    for extension, mode in archive_formats:
+        if file_name.endswith(extension): return mode
+    return None
+
+
+# The number of compressed files Project.write_archive() compresses ahead of adding them
+archive_compression_window = 32
+
+
+# Writes files into a zip or tar archive, to be used as a context manager. Members of zip archives
+# are compressed unless they are compressed files themselves. All members get the same timestamp,
+# so that archives of the same files are identical. The archive is written to a temporary file
+# which replaces "file_name" once it is complete.
+class Archive:
+    #   file_name: The archive to write, its format is determined by archive_format()
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.temp_name = file_name + ".tmp"
+        self.mode = archive_format(file_name)
+        self.file = None
+        self.gzip_file = None
+        if self.mode == "zip":
+            self.archive = zipfile.ZipFile(self.temp_name, "w", zipfile.ZIP_DEFLATED)
+        elif self.mode == "w:gz":
+            # tarfile would store the current time and file name in the gzip header
+            self.file = open(self.temp_name, "wb")
+            self.gzip_file = gzip.GzipFile("", "wb", 9, self.file, mtime=0)
+            self.archive = tarfile.open(fileobj=self.gzip_file, mode="w")
+        else:
+            self.archive = tarfile.open(self.temp_name, self.mode)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.archive.close()
+        if self.gzip_file != None: self.gzip_file.close()
+        if self.file != None: self.file.close()
+        if exc_type == None: os.replace(self.temp_name, self.file_name)
+        else: os.remove(self.temp_name)
+
+    # Adds a file to the archive
+    #   name: The path of the file inside the archive
+    #   contents: The file contents as bytes
+    def add(self, name, contents):
+        if self.mode == "zip":
+            info = zipfile.ZipInfo(name, (1980, 1, 1, 0, 0, 0))
+            info.external_attr = 0o644 << 16
+            if any(name.endswith(extension) for extension, key, compress in compressions):
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            self.archive.writestr(info, contents)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(contents)
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(contents))
+
+
+# Merges the declarations read from a single file by a worker process into "declarations".
+# This yields the same result as reading the file directly: Declarations already known from an
+# earlier file are kept, but still receive the members listed in this file.
+def merge_declarations(declarations, file_decls):
+    for doxygen_id, decl in file_decls.items():
+        if doxygen_id in declarations:
+            declarations[doxygen_id].merge_members(decl)
+        else:
+            declarations[doxygen_id] = decl
 
 
-# Takes an arbitrary string, removes all non-alnum and non-_ characters, concatenating it 
-# with -, and adding a hash to avoid collisions
-def urlify_string(string):
-    result = ""
-    # Collapse multiple non-[0-9a-zA-Z_]-characters into a single "-"
-    last_was_special_char = False
-    for char in string:
-        if (((char >= '0' and char <= '9') or (char >= 'a' and char <= 'z')
-                or (char >= 'A' and char <= 'Z') or char == '_')): 
-            result += char.lower()
-            last_was_special_char = False
-        elif not last_was_special_char:
-            result += '-'
-            if char == '~': result += "not-"
-            last_was_special_char = True
-    # Ensure there's a "-" before the hash
-    if not last_was_special_char: result += '-'
-    result += hashlib.md5(bytearray(string, 'utf-8')).hexdigest()[0:4]
-    return result[:220]
-
-
-
-# Recursively traverses the "declarations" dictionary and updates the "parent" field of
-# each declaration to point to the containing node
-def build_hierarchy(parent_decl):
-    if not parent_decl.is_collection: 
-        for doxygen_id in parent_decl.members:
-            if doxygen_id in declarations:
-                member = declarations[doxygen_id]
-                # One node will usually be visited multiple times, only update "parent" once
-                if member.parent == None:
-                    member.parent = parent_decl
-                    build_hierarchy(declarations[doxygen_id])
-                    # Member functions are usually available by including their classes header
-                    if declarations[doxygen_id].include_files == []:
-                        declarations[doxygen_id].include_files = parent_decl.include_files
-
-
-# Maps fully scoped namespace names to their Declaration object.
-# Needed to resolve nested namespace hierarchies, as they don't contain each other as members
-namespaces = {}
-
-# Stupidly try to build a hierarchy for every declaration (not as recursive as possible)
-for doxygen_id, decl in declarations.items():
-    # Add parents where a hierarchy exists in the XML
-    build_hierarchy(decl)
-    # Namespaces don't contain each other, remember their full names to resolve them later
-    if decl.kind == "namespace":
-        namespaces[decl.name] = doxygen_id
-
-
-
-# Dummy node for the "Index" page
-root = Declaration("root")
-root.kind = "root"
-root.name = ""
-
-# Assign all orphaned nodes to "root" so they will appear on the index page.
-# This applies for all global namespace members and preprocessor #defines.
-for doxygen_id, decl in declarations.items(): 
-    if decl.parent == None:
-        new_parent = root
-        # Resolve nested namespaces by their scoped name
-        if decl.kind == "namespace" and "::" in decl.name:
-            try:
-                container = namespaces[decl.name[0:decl.name.rfind("::")]]
-                if container and container in declarations:
-                    new_parent = declarations[container]
-            except KeyError:
-                pass
-        decl.parent = new_parent
-        new_parent.all_members.add(doxygen_id)
-
-
-
-# Recursively postprocesses all "name" and "full_name" fields of every declaration.
-# In the XML, some names include scope while others don't (I guess nobody checked the XML output
-# for consistency). This function ensures "name" is scope-less while adding full scope prefixes
-# to full_name based on the members/parent hierarchy built above.
-def generate_names(decl):
-    # Rename anonymous enums
-    if len(decl.name) > 0 and decl.name[0] == '@':
-        decl.name = "(anonymous)"
-
-    if "::" in decl.name:
-        # Find the last, not template-parameter-enclosed occurrence of "::"
-        start = 0; level = 0; i=0
-        for c in decl.name:
-            if c == '<': level += 1
-            elif c == '>': level -= 1
-            elif c == ':' and level == 0: start = i+1
-            i += 1
-        decl.name = decl.name[start:]
-
-    # Directory names should end in "/"
-    if decl.kind == "dir": decl.name += "/"
-
-    # Add scope prefixes for identifiers
-    if decl.parent != None and decl.kind != "file" and decl.parent.full_name != "": 
-        decl.full_name = decl.parent.full_name + "::" + decl.name
-    # And simply concatenate directory names as they already end in "/"
-    elif decl.parent != None: 
-        decl.full_name = decl.parent.full_name + decl.name
-
-    # Creates the canonical URL (without .html) for a declaration
-    def make_page_url(decl):
-        if decl.full_name != "":
-            return decl.kind + "-" + urlify_string(decl.full_name)
-        else:
-            return "index"
+# Runs of characters that are replaced by a single "-" in URLs
+url_special_chars = re.compile("[^0-9a-zA-Z_]+")
 
-    # Non-inline (i.e. integrated in their parent's page) declarations have an own url,
-    # inline docs are identified by an <a>nchor inside their parent
-    if not decl.inline_doc:
-        decl.target_url = make_page_url(decl) + ".html"
-    elif decl.parent.target_url != None: 
-        decl.target_url_anchor = make_page_url(decl)
-        decl.target_url = decl.parent.target_url + "#" + decl.target_url_anchor
+# Results of urlify_string(), which is called for the same names over and over again
+urlify_cache = dict()
 
-    # Proceed recursively for all members
-    if not decl.is_collection:
-        for doxygen_id in decl.all_members:
-            if doxygen_id in declarations:
-                generate_names(declarations[doxygen_id])
 
+# Takes an arbitrary string, removes all non-alnum and non-_ characters, concatenating it 
+# with -, and adding a hash to avoid collisions
+#   string: The string to convert
+#   hash_length: The number of hex digits of the hash to add
+def urlify_string(string, hash_length=4):
+    key = (string, hash_length)
+    if key not in urlify_cache:
+        # Collapse multiple non-[0-9a-zA-Z_]-characters into a single "-"
+        result = url_special_chars.sub(lambda m: "-not-" if m.group()[0] == "~" else "-", 
+                                       string).lower()
+        # Ensure there's a "-" before the hash
+        if not result.endswith("-"): result += '-'
+        # Long names are cut off, but never their hash
+        urlify_cache[key] = result[:220 - hash_length] \
+            + hashlib.md5(bytearray(string, 'utf-8')).hexdigest()[0:hash_length]
+    return urlify_cache[key]
+
+
+# Creates the canonical URLs (without .html) for declarations. Distinct names may be converted to
+# the same URL by urlify_string(), so these receive longer hashes until all URLs are unique.
+# This only depends on the set of names, so URLs stay the same between runs.
+#   names: A set of (kind, full_name) tuples
+# Returns a dict mapping each tuple to its URL
+def unique_urls(names):
+    hash_lengths = dict.fromkeys(names, 4)
+    # Ranks appended to the URLs of names whose complete hashes collide
+    ranks = dict()
+    while True:
+        urls = dict()
+        by_url = dict()
+        for name in names:
+            kind, full_name = name
+            urls[name] = kind + "-" + urlify_string(full_name, hash_lengths[name])
+            if name in ranks: urls[name] += "-" + str(ranks[name])
+            by_url.setdefault(urls[name], []).append(name)
+
+        collisions = [ group for group in by_url.values() if len(group) > 1 ]
+        if len(collisions) == 0: return urls
+        for group in collisions:
+            # Complete hashes can only be told apart by rank. Every name but the first gets a
+            # higher rank, so the group is resolved after at most one pass per member.
+            if all(hash_lengths[name] == 32 for name in group):
+                for name in sorted(group)[1:]: ranks[name] = ranks.get(name, 1) + 1
+                continue
+            for name in group:
+                hash_lengths[name] = min(32, hash_lengths[name] + 4)
 
-# Recursively generate name and full_name fields
-generate_names(root)
-root.page_title = localize("index")
-root.target_url = "index.html"
 
-        
 # Replaces template parameters in a string with '< ... >' for brief declarations and type names
 # of variables
 def collapse_templates(string, template_depth):
@@ -396,258 +1130,157 @@ def collapse_templates(string, template_depth):
         else: result += char
     return result, template_depth
 
-    
-def to_html_abbrev(tree, dest, nolinks=False):
-    depth = 0
-    dest.text, depth = collapse_templates(tree.text, depth)
-    length = len(dest.text) if dest.text != None else 0
-    for e in tree.iterchildren(tag="ref"):
-        a = etree.SubElement(dest, "a" if not nolinks else "span")
-        if e.get("refid") in declarations and not nolinks: 
-            a.set("href", declarations[e.get("refid")].target_url)
-        a.text, depth = collapse_templates(e.text, depth)
-        a.tail, depth = collapse_templates(e.tail, depth)
-        if a.text != None: length += len(a.text) 
-        if a.tail != None: length += len(a.tail)
-    return length
-    
-
-def to_html(tree, dest, nolinks=False):
-    length = [0]
-    def addlen(s): 
-        if s != None: length[0] += len(s)
-    
-    if dest.text == None: dest.text = ""
-    if tree.text != None:
-        dest.text += tree.text
-        addlen(dest.text)
-    for e in tree.iterchildren(tag=etree.Element):
-        if e.tag == "ref":
-            if not nolinks:
-                a = etree.SubElement(dest, "a")
-                if e.get("refid") and e.get("refid") in declarations and declarations[e.get("refid")].target_url != None:
-                    a.set("href", declarations[e.get("refid")].target_url)
-            else:
-                a = etree.SubElement(dest, "span")
-            a.text = e.text; addlen(e.text)
-            a.tail = e.tail; addlen(e.tail)
-        elif e.tag == "para":
-            p = etree.SubElement(dest, "p")
-            length[0] += to_html(e, p, nolinks)
-            p.tail = e.tail
-        elif e.tag == "linebreak":
-            etree.SubElement(dest, "br").tail = e.tail
-        elif e.tag == "simplesect":
-            h4 = etree.SubElement(dest, "h4")
-            if e.get("kind") != None and e.get("kind") == "return":
-                h4.text = "Returns:"; addlen(h4.text)
-            elif e.get("kind") != None and e.get("kind") == "see":
-                h4.text = "See also:"; addlen(h4.text)
-            else:
-                xp = e.xpath("title")
-                if len(xp) > 0:
-                    h4.text = xp[0].text; addlen(h4.text)
-            div = etree.SubElement(dest, "div")
-            div.set("class", "par")
-            length[0] += to_html(e, div)
-        elif e.tag == "programlisting":
-            code = etree.SubElement(dest, "div")
-            code.set("class", "listing")
-            first = True
-            for line in e.iterchildren(tag="codeline"):
-                if not first: etree.SubElement(code, "br")
-                else: first = False
-                #p = etree.SubElement(code, "span")
-                length[0] += to_html(line, code)
-        elif e.tag == "computeroutput":
-            code = etree.SubElement(dest, "span")
-            code.set("class", "tt")
-            to_html(e, code)
-            code.tail = e.tail
-        elif e.tag == "highlight":
-            span = etree.SubElement(dest, "span")
-            span.set("class", "hl-" + e.get("class"))
-            length[0] += to_html(e, span)          
-            span.tail = e.tail
-        elif e.tag == "sp": 
-            span = etree.SubElement(dest, "span")
-            span.text = "\xa0"; length[0] += 1
-            span.tail = e.tail
-        elif e.tag == "bold":
-            span = etree.SubElement(dest, "strong")
-            to_html(e, span)
-            span.tail = e.tail
-        elif e.tag == "italic":
-            span = etree.SubElement(dest, "em")
-            to_html(e, span)
-            span.tail = e.tail
-        elif e.tag == "table":
-            table = etree.SubElement(dest, "table")
-            table.set("class", "paramlist")
-            for row in e.iterchildren(tag="row"):
-                tr = etree.SubElement(table, "tr")
-                first = True
-                for col in row.iterchildren(tag="entry"):
-                    td = etree.SubElement(tr, "thead" if col.get("thead") == "yes" else "td")
-                    td.set("class", "paramname" if first else "paramdescr")
-                    length[0] += to_html(col, td)
-                    if first: first = False      
-            table.tail = e.tail
-        elif e.tag == "parameterlist":
-            h4 = etree.SubElement(dest, "h4")
-            if e.get("kind") == "exception": h4.text = "Exceptions:"
-            elif e.get("kind") == "templateparam": h4.text = "Template parameters:"
-            else: h4.text = "Parameters:"
-            addlen(h4.text)
-            div = etree.SubElement(dest, "div")
-            div.set("class", "par")
-            table = etree.SubElement(div, "table")
-            table.set("class", "paramlist")
-            for item in e.iterchildren(tag="parameteritem"):
-                tr = etree.SubElement(table, "tr")
-                td_name = etree.SubElement(tr, "td")
-                td_name.set("class", "paramname")
-                td_descr = etree.SubElement(tr, "td")
-                td_descr.set("class", "paramdescr")
-                xp = item.xpath("parameternamelist/parametername")
-                if len(xp) > 0: length[0] += to_html(xp[0], td_name)
-                xp = item.xpath("parameterdescription")
-                if len(xp) > 0: length[0] += to_html(xp[0], td_descr)
-        elif e.tag == "variablelist":
-            table = etree.SubElement(dest, "ul")
-            table.set("class", "varlist")
-            li = None
-            for item in e.iterchildren(tag=etree.Element):
-                if item.tag == "varlistentry":
-                    li = etree.SubElement(table, "li")
-                    for term in item.iterchildren(tag="term"):
-                        p = etree.SubElement(li, "p")
-                        p.set("class", "head")
-                        to_html(term, p)
-                elif item.tag == "listitem" and li != None:
-                    to_html(item, etree.SubElement(li, "p"))            
-            
-    return length[0]
-
-    
-def any_decl(decl, dest):
-    dest.set("class", "decl")
-    if decl.template_params != None:
-        span = etree.SubElement(dest, "span")
-        span.set("class", "template")
-        span.text = "template <"
-        comma = False
-        for param in decl.template_params.iterchildren(tag=etree.Element):
-            types = param.xpath("type")
-            if len(types) > 0: 
-                if comma: span2.tail = ", "
-                else: comma = True; span.text += " "
-                span2 = etree.SubElement(span, "span")
-                to_html(types[0], span2)
-                span2.tail = types[0].tail
-            names = param.xpath("declname")
-            if len(names) > 0:
-                span.tail = " "
-                span2 = etree.SubElement(span, "span")
-                span2.text = names[0].text
-                span2.tail = names[0].tail
-        etree.SubElement(span, "span").text = ">"
-        etree.SubElement(dest, "br")
-    
-    
-def func_var_decl(decl, dest, nolinks=False, abbrev=False):
-    any_decl(decl, dest)
-    span = etree.SubElement(dest, "span")
-    span.set("class", "specs")
-    span.text = ""
-    if decl.is_explicit: span.text += "explicit "
-    if decl.is_static: span.text += "static "
-    if decl.is_virtual: span.text += "virtual "
-    length = len(span.text)
-    span = etree.SubElement(dest, "span")
-    span.set("class", "type")
-    if decl.kind != "define":
-        if decl.data_type is not None:
-            if not abbrev: length += to_html(decl.data_type, span, nolinks)
-            else: length += to_html_abbrev(decl.data_type, span, nolinks)
-    else:
-        span.text = "#define"
-        length += 7
-    span.tail = " "
-    if length > 20: etree.SubElement(dest, "br")
-    span = etree.SubElement(dest, "span")
-    span.set("class", "name")
-    span.text = decl.name
-    if decl.parameters != None: 
-        span = etree.SubElement(dest, "span")
-        span.set("class", "arglist")
-        if not abbrev: to_html(decl.parameters, span, nolinks)
-        else: to_html_abbrev(decl.parameters, span, nolinks)
-    if decl.initializer != None and not abbrev:
-        span = etree.SubElement(dest, "span")
-        span.set("class", "init")
-        span.text = " "
-        to_html(decl.initializer, span, nolinks)
-    
-
-def typedef_decl(decl, dest):
-    any_decl(decl, dest)    
-    span = etree.SubElement(dest, "span")
-    span.set("class", "specs")
-    span.text = "using "
-    span = etree.SubElement(dest, "span")
-    span.set("class", "name")
-    span.text = decl.name
-    span = etree.Element("span")
-    span.set("class", "type")
-    length = to_html(decl.data_type, span)
-    if length + len(decl.name) > 30:
-        etree.SubElement(dest, "br")
-    etree.SubElement(dest, "span").text = " = "
-    dest.append(span)
-    
-    
-def define_decl(decl, dest):
-    func_var_decl(decl,dest)
-    
 
-def base_names(derived):
-    names = set([derived.name])
-    for base in derived.inherits_from:
-        doxygen_id = base.get("refid")
-        if doxygen_id in declarations: 
-            names = names.union(base_names(declarations[doxygen_id]))
-    return names
-    
-    
-def struct_decl(decl, dest):
-    any_decl(decl, dest)    
-    span = etree.SubElement(dest, "span")
-    span.set("class", "specs")
-    span.text = localize(decl.kind) + " "
-    span = etree.SubElement(dest, "span")
-    span.set("class", "name")
-    span.text = decl.name    
-
-    comma = False
-    for base in decl.inherits_from:
-        etree.SubElement(dest, "br")
-        span = etree.SubElement(dest, "span")
-        span.text = "\xa0\xa0\xa0\xa0" + (", " if comma else ": ")
-        if not comma: comma = True
-        span.text += base.get("prot") + " "
-        if base.get("virt") == "virtual": span.text += "virtual "
-        if base.get("refid") in declarations:
-            etree.SubElement(dest, "a", href = declarations[base.get("refid")].target_url).text = base.text
-        else: etree.SubElement(dest, "span").text = base.text
-        
-                    
-# Wraps a navigation and page content XHTML into a html file, writing it
+# A page to be written, as determined by Project.plan()
+class Page:
+    def __init__(self):
+        # The Declarations documented on this page, e.g. all overloads of a function
+        self.decls = []
+
+        # Template specializations, which are listed on this page but get pages of their own
+        self.specializations = []
+
+        # The page title
+        self.page_title = ""
+
+        # The file name, relative to output_dir
+        self.file_name = ""
+
+        # The breadcrumb links to the parent pages as [text, href, tail] lists
+        self.parent_links = []
+
+        # The navigation sidebar as a tuple of the (text, href) of the "up" link, or None, and
+        # a list of (heading, [(text, href)]) sections. global_nav is always appended.
+        self.nav = (None, [])
+
+        # A hash of "nav", shared by all pages with the same navigation
+        self.nav_digest = ""
+
+        # For each Declaration in "decls", a list of member sections as (heading, groups) tuples.
+        # "groups" is a list of (group_name, members, href, link_text) tuples, one per table row.
+        self.sections = []
+
+
+
+# Returns the name of the file holding the navigation of a page with the "shared_nav" option.
+# Pages with the same navigation have the same nav_digest and thus share the file.
+def nav_file_name(page):
+    return "nav-" + (page.nav_digest if page.nav_digest != "" else "index") + ".js"
+
+
+# The script building the navigation sidebar from the files written with the "shared_nav"
+# option, the counterpart of Renderer.render_nav(). Each navigation file calls doxycppNav()
+# with a Page.nav, the global navigation HTML is appended to nav.js as "doxycppGlobalNav".
+nav_script = """function doxycppNav(nav) {
+    var root = document.getElementById("nav");
+    function add(parent, tag, text) {
+        var e = document.createElement(tag);
+        if (text !== undefined && text !== null) e.textContent = text;
+        parent.appendChild(e);
+        return e;
+    }
+    if (nav[0] !== null) {
+        var up = add(add(root, "h2"), "a", nav[0][0]);
+        up.className = "nav-up";
+        up.setAttribute("href", nav[0][1]);
+    }
+    for (var i = 0; i < nav[1].length; ++i) {
+        var div = add(root, "div");
+        add(div, "h3", nav[1][i][0]);
+        var ul = add(div, "ul");
+        var items = nav[1][i][1];
+        for (var j = 0; j < items.length; ++j) {
+            add(add(ul, "li"), "a", items[j][0]).setAttribute("href", items[j][1]);
+        }
+    }
+    root.insertAdjacentHTML("beforeend", doxycppGlobalNav);
+}
+"""
+
+
+# Returns the key of the search index shard an entry or query belongs to: the first two characters
+# of its lower-case name, where all characters other than [a-z0-9] are replaced by "_".
+# search_script contains the same function.
+def search_shard_key(name):
+    return "".join(c if ('a' <= c <= 'z') or ('0' <= c <= '9') else "_" for c in name[:2])
+
+
+# The script behind the search box. It loads the search index shard for the first two characters
+# of the query on demand. Each shard is a script calling doxycppSearchShard() with a list of
+# [key, name, kind, url] entries sorted by key, which is the lower-case name to match the query
+# against. Names of a single character, like "T", have shards of their own, which queries of a
+# single character load. Queries containing "::" are matched against the full name instead.
+search_script = """var doxycppSearchShards = {};
+
+function doxycppSearchShardKey(name) {
+    return name.substr(0, 2).replace(/[^a-z0-9]/g, "_");
+}
+
+function doxycppSearchShard(key, entries) {
+    doxycppSearchShards[key] = entries;
+    doxycppSearch();
+}
+
+function doxycppSearch() {
+    var query = document.getElementById("search-input").value.toLowerCase().trim();
+    var results = document.getElementById("search-results");
+    while (results.firstChild) results.removeChild(results.firstChild);
+    var scope = query.lastIndexOf("::");
+    var name = scope >= 0 ? query.substr(scope + 2) : query;
+    if (name.length == 0) return;
+
+    var key = doxycppSearchShardKey(name);
+    var entries = doxycppSearchShards[key];
+    if (entries === undefined) {
+        if (doxycppSearchShards[key + " pending"] === undefined) {
+            doxycppSearchShards[key + " pending"] = true;
+            var script = document.createElement("script");
+            script.src = "search-" + key + ".js";
+            document.head.appendChild(script);
+        }
+        return;
+    }
+
+    // Binary search for the first entry starting with "name"
+    var lo = 0, hi = entries.length;
+    while (lo < hi) {
+        var mid = (lo + hi) >> 1;
+        if (entries[mid][0] < name) lo = mid + 1; else hi = mid;
+    }
+    var count = 0;
+    for (var i = lo; i < entries.length && count < 50; ++i) {
+        var e = entries[i];
+        if (e[0].substr(0, name.length) != name) break;
+        if (scope >= 0 && e[1].toLowerCase().indexOf(query) < 0) continue;
+        var li = document.createElement("li");
+        var a = document.createElement("a");
+        a.textContent = e[1];
+        a.setAttribute("href", e[3]);
+        li.appendChild(a);
+        var kind = document.createElement("span");
+        kind.className = "search-kind";
+        kind.textContent = " " + e[2];
+        li.appendChild(kind);
+        results.appendChild(li);
+        ++count;
+    }
+}
+"""
+
+
+# Runs of whitespace that render as a single space, see html_document()
+html_whitespace = re.compile("[ \t\n\r\f]{2,}|[\t\n\r\f]")
+
+
+# Wraps a navigation and page content XHTML into a html file
 #   page_title: What should appear in the <title> tag
 #   navigation_html: A XHTML node for the navigation sidebar (left hand side)
 #   content_html: A XHTML node for the page content (right hand side)
-#   file_name: The file to write to.
-def write_html(page_title, navigation_html, content_html, file_name): 
+#   search: Whether to add a search box above the navigation, see search_script
+#   minify: Whether to write the HTML without line breaks and to collapse runs of whitespace in
+#           text. No output element preserves whitespace, so this does not change the rendering.
+# Returns the file contents
+def html_document(page_title, navigation_html, content_html, search=False, minify=False): 
     html = etree.Element("html", nsmap = { None: "http://www.w3.org/1999/xhtml"} )
     # <html>
     
@@ -665,202 +1298,1705 @@ def write_html(page_title, navigation_html, content_html, file_name):
     # <body>
     outer_tr = etree.SubElement(etree.SubElement(body, "table"), "tr", id="outer")
     # <table><tr>
-    etree.SubElement(outer_tr, "td", id="navigation_html-td").append(navigation_html)
+    navigation_td = etree.SubElement(outer_tr, "td", id="navigation_html-td")
+    if search:
+        div = etree.SubElement(navigation_td, "div", id="search")
+        etree.SubElement(div, "input", type="text", id="search-input", placeholder="Search",
+                         oninput="doxycppSearch()")
+        etree.SubElement(div, "ul", id="search-results")
+        etree.SubElement(div, "script", src="search.js").text = ""
+    navigation_td.append(navigation_html)
     etree.SubElement(outer_tr, "td", id="content-td").append(content_html)
     # </table></tr>
     # </body>
     # </html>
     
-    output_file = open(file_name, "wb")
-    output_file.write(etree.tostring(html, pretty_print=True, encoding='UTF-8', 
-                           method = "html", doctype='<!DOCTYPE html>'))
-    output_file.close()
+    if minify:
+        for e in html.iter():
+            if e.text != None: e.text = html_whitespace.sub(" ", e.text)
+            if e.tail != None: e.tail = html_whitespace.sub(" ", e.tail)
+    
+    return etree.tostring(html, pretty_print=not minify, encoding='UTF-8', 
+                          method = "html", doctype='<!DOCTYPE html>')
+
+
+# Escapes text for HTML, returns "" for None
+def html_text(text):
+    if text == None: return ""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# Escapes an attribute value for HTML
+def html_attribute(value):
+    return html_text(value).replace('"', "&quot;")
+
+
+# Wraps a navigation and page content HTML string into a html file like html_document(), but
+# without indentation
+#   page_title: What should appear in the <title> tag
+#   navigation_html: The HTML of the navigation sidebar (left hand side)
+#   content_html: The HTML of the page content (right hand side)
+#   search: Whether to add a search box above the navigation, see search_script
+#   minify: Whether to collapse runs of whitespace in text, see html_document()
+# Returns the file contents
+def html_document_string(page_title, navigation_html, content_html, search=False, minify=False):
+    html = ('<html xmlns="http://www.w3.org/1999/xhtml"><head><page_title>' 
+        + html_text(page_title) + '</page_title>'
+        + '<meta http-equiv="Content-Type" content="text/html, charset=utf-8">'
+        + '<link rel="stylesheet" href="style.css">'
+        + '<link rel="stylesheet" media="print" href="print.css"></head>'
+        + '<body><table><tr id="outer"><td id="navigation_html-td">')
+    if search:
+        html += ('<div id="search"><input type="text" id="search-input" placeholder="Search" '
+            + 'oninput="doxycppSearch()"><ul id="search-results"></ul>'
+            + '<script src="search.js"></script></div>')
+    html += (navigation_html + '</td><td id="content-td">' + content_html 
+        + '</td></tr></table></body></html>')
+    
+    # Tags contain no runs of whitespace, so this only collapses whitespace in text
+    if minify: html = html_whitespace.sub(" ", html)
     
+    return bytes('<!DOCTYPE html>\n' + html, 'utf-8')
+
+# Renders Pages of a Project to HTML
+class Renderer:
+    def __init__(self, project):
+        # The Project whose declarations are rendered
+        self.project = project
+
+        # The link targets looked up while rendering the current page. Maps Doxygen IDs to the
+        # [target_url, full_name] they resolved to, or None if the ID is unknown.
+        self.page_links = dict()
+
+        # Maps (tree, nolinks, abbrev) to the XHTML rendered for a Doxygen XML fragment, or to
+        # False if it was used once, see fragment_html(). Valid until reset().
+        self.fragments = dict()
+
+    # Forgets everything rendered so far, needed whenever the Project is planned again
+    def reset(self):
+        self.fragments.clear()
+
+    # Looks up the Declaration a link refers to and records it in "page_links"
+    #   doxygen_id: The Doxygen ID of the link target, may be None
+    # Returns None if the ID is unknown
+    def link_target(self, doxygen_id):
+        if doxygen_id == None: return None
+        self.page_links[doxygen_id] = self.project.link_info(doxygen_id)
+        return self.project.link_declaration(doxygen_id)
+
     
+    # Converts a Doxygen XML fragment like to_html() or, with "abbrev", like to_html_abbrev().
+    # Descriptions and types can appear on several pages, so a fragment used a second time is
+    # kept in "fragments" together with the links it looked up, and copied into "dest" from then
+    # on. Most fragments are only used once, those are converted directly.
+    # Returns the same length as to_html() or to_html_abbrev()
+    def fragment_html(self, tree, dest, nolinks=False, abbrev=False):
+        key = (tree, nolinks, abbrev)
+        fragment = self.fragments.get(key)
+        if fragment == None:
+            self.fragments[key] = False
+            if abbrev: return self.to_html_abbrev(tree, dest, nolinks)
+            else: return self.to_html(tree, dest, nolinks)
+        if fragment == False:
+            page_links = self.page_links
+            self.page_links = dict()
+            container = etree.Element("div")
+            if abbrev: length = self.to_html_abbrev(tree, container, nolinks)
+            else: length = self.to_html(tree, container, nolinks)
+            fragment = (container, length, list(self.page_links))
+            self.fragments[key] = fragment
+            self.page_links = page_links
+
+        container, length, link_ids = fragment
+        for doxygen_id in link_ids: self.link_target(doxygen_id)
+        if abbrev:
+            dest.text = container.text
+        else:
+            # to_html() appends to the text of "dest" and counts all of it
+            if dest.text != None and tree.text != None: length += len(dest.text)
+            dest.text = (dest.text or "") + container.text
+        for e in container: dest.append(copy.deepcopy(e))
+        return length
+
+
+    def to_html_abbrev(self, tree, dest, nolinks=False):
+        depth = 0
+        dest.text, depth = collapse_templates(tree.text, depth)
+        length = len(dest.text) if dest.text != None else 0
+        for e in tree.iterchildren(tag="ref"):
+            a = etree.SubElement(dest, "a" if not nolinks else "span")
+            target = self.link_target(e.get("refid")) if not nolinks else None
+            if target != None: 
+                a.set("href", target.target_url)
+            a.text, depth = collapse_templates(e.text, depth)
+            a.tail, depth = collapse_templates(e.tail, depth)
+            if a.text != None: length += len(a.text) 
+            if a.tail != None: length += len(a.tail)
+        return length
     
-global_nav = []
-global_nav_dict = dict()
-for glob in root.all_members:
-    if glob in declarations: 
-        mb = declarations[glob]
-        if not mb.kind in global_nav_dict: global_nav_dict[mb.kind] = []
-        global_nav_dict[mb.kind].append(mb)
-
-def add_nav_section(name, kinds):
-    ul = None
-    for kind in kinds:
-        if kind in global_nav_dict:
-            if ul == None:
-                h3 = etree.Element("h3")
-                h3.text = localize(name).title()
-                global_nav.append(h3)
-                ul = etree.Element("ul")
-                global_nav.append(ul)
-            for e in sorted(global_nav_dict[kind], key=lambda x: x.name):
-                etree.SubElement(etree.SubElement(ul, "li"), "a", href = e.target_url).text = \
-                    e.page_title if e.page_title != None else e.name
+
+    def to_html(self, tree, dest, nolinks=False):
+        length = [0]
+        def addlen(s): 
+            if s != None: length[0] += len(s)
     
-add_nav_section("groups", [ "group" ])
-add_nav_section("special pages", [ "page" ])
-add_nav_section("headers", [ "dir", "file" ])
-
-   
-def tree(decls, nav=None, parent="", parent_links=etree.Element("span")):  
-    decls.sort(key=lambda e: hash(e.definition))
-    decls.sort(key=lambda e: e.name)
-      
-    # For specialized class templates, do not inline specializations; 
-    # rather add child_links to the specialization pages
-    if len(decls) > 1 and (decls[0].kind == "class" or decls[0].kind == "struct"):
-        specializations = copy.copy(decls)
-        min_decl = None
-        for decl in specializations:
-            if min_decl == None or len(decl.name) < len(min_decl.name):
-                min_decl = decl
-        specializations.remove(min_decl)
-        decls = [ min_decl ]
-    else: specializations = []
-    full_name = decls[0].full_name
-    page_title = decls[0].page_title.title() if decls[0].page_title != None else decls[0].name
+        if dest.text == None: dest.text = ""
+        if tree.text != None:
+            dest.text += tree.text
+            addlen(dest.text)
+        for e in tree.iterchildren(tag=etree.Element):
+            if e.tag == "ref":
+                if not nolinks:
+                    a = etree.SubElement(dest, "a")
+                    target = self.link_target(e.get("refid"))
+                    if target != None and target.target_url != None:
+                        a.set("href", target.target_url)
+                else:
+                    a = etree.SubElement(dest, "span")
+                a.text = e.text; addlen(e.text)
+                a.tail = e.tail; addlen(e.tail)
+            elif e.tag == "para":
+                p = etree.SubElement(dest, "p")
+                length[0] += self.to_html(e, p, nolinks)
+                p.tail = e.tail
+            elif e.tag == "linebreak":
+                etree.SubElement(dest, "br").tail = e.tail
+            elif e.tag == "simplesect":
+                h4 = etree.SubElement(dest, "h4")
+                if e.get("kind") != None and e.get("kind") == "return":
+                    h4.text = "Returns:"; addlen(h4.text)
+                elif e.get("kind") != None and e.get("kind") == "see":
+                    h4.text = "See also:"; addlen(h4.text)
+                else:
+                    xp = e.xpath("title")
+                    if len(xp) > 0:
+                        h4.text = xp[0].text; addlen(h4.text)
+                div = etree.SubElement(dest, "div")
+                div.set("class", "par")
+                length[0] += self.to_html(e, div)
+            elif e.tag == "programlisting":
+                code = etree.SubElement(dest, "div")
+                code.set("class", "listing")
+                first = True
+                for line in e.iterchildren(tag="codeline"):
+                    if not first: etree.SubElement(code, "br")
+                    else: first = False
+                    #p = etree.SubElement(code, "span")
+                    length[0] += self.to_html(line, code)
+            elif e.tag == "computeroutput":
+                code = etree.SubElement(dest, "span")
+                code.set("class", "tt")
+                self.to_html(e, code)
+                code.tail = e.tail
+            elif e.tag == "highlight":
+                span = etree.SubElement(dest, "span")
+                span.set("class", "hl-" + e.get("class"))
+                length[0] += self.to_html(e, span)          
+                span.tail = e.tail
+            elif e.tag == "sp": 
+                span = etree.SubElement(dest, "span")
+                span.text = "\xa0"; length[0] += 1
+                span.tail = e.tail
+            elif e.tag == "bold":
+                span = etree.SubElement(dest, "strong")
+                self.to_html(e, span)
+                span.tail = e.tail
+            elif e.tag == "italic":
+                span = etree.SubElement(dest, "em")
+                self.to_html(e, span)
+                span.tail = e.tail
+            elif e.tag == "table":
+                table = etree.SubElement(dest, "table")
+                table.set("class", "paramlist")
+                for row in e.iterchildren(tag="row"):
+                    tr = etree.SubElement(table, "tr")
+                    first = True
+                    for col in row.iterchildren(tag="entry"):
+                        td = etree.SubElement(tr, "thead" if col.get("thead") == "yes" else "td")
+                        td.set("class", "paramname" if first else "paramdescr")
+                        length[0] += self.to_html(col, td)
+                        if first: first = False      
+                table.tail = e.tail
+            elif e.tag == "parameterlist":
+                h4 = etree.SubElement(dest, "h4")
+                if e.get("kind") == "exception": h4.text = "Exceptions:"
+                elif e.get("kind") == "templateparam": h4.text = "Template parameters:"
+                else: h4.text = "Parameters:"
+                addlen(h4.text)
+                div = etree.SubElement(dest, "div")
+                div.set("class", "par")
+                table = etree.SubElement(div, "table")
+                table.set("class", "paramlist")
+                for item in e.iterchildren(tag="parameteritem"):
+                    tr = etree.SubElement(table, "tr")
+                    td_name = etree.SubElement(tr, "td")
+                    td_name.set("class", "paramname")
+                    td_descr = etree.SubElement(tr, "td")
+                    td_descr.set("class", "paramdescr")
+                    xp = item.xpath("parameternamelist/parametername")
+                    if len(xp) > 0: length[0] += self.to_html(xp[0], td_name)
+                    xp = item.xpath("parameterdescription")
+                    if len(xp) > 0: length[0] += self.to_html(xp[0], td_descr)
+            elif e.tag == "variablelist":
+                table = etree.SubElement(dest, "ul")
+                table.set("class", "varlist")
+                li = None
+                for item in e.iterchildren(tag=etree.Element):
+                    if item.tag == "varlistentry":
+                        li = etree.SubElement(table, "li")
+                        for term in item.iterchildren(tag="term"):
+                            p = etree.SubElement(li, "p")
+                            p.set("class", "head")
+                            self.to_html(term, p)
+                    elif item.tag == "listitem" and li != None:
+                        self.to_html(item, etree.SubElement(li, "p"))            
             
-    caption = etree.Element("h2")    
-    links = copy.deepcopy(parent_links)
-    if len(links) > 0 and decls[0].kind != "file" and decls[0].kind != "dir":        
-        links[len(links)-1].tail = "::"
-    child_links = copy.deepcopy(links)
-    if full_name != "":
-        etree.SubElement(child_links, "a", href=decls[0].target_url).text = decls[0].name
-    etree.SubElement(links, "span").text = page_title
-    links.set("class", "page-caption")
-    links.tail = " "
-    caption.append(links)
+        return length[0]
+
+    
+    def any_decl(self, decl, dest):
+        dest.set("class", "decl")
+        if decl.template_params != None:
+            span = etree.SubElement(dest, "span")
+            span.set("class", "template")
+            span.text = "template <"
+            comma = False
+            for param in decl.template_params.iterchildren(tag=etree.Element):
+                types = param.xpath("type")
+                if len(types) > 0: 
+                    if comma: span2.tail = ", "
+                    else: comma = True; span.text += " "
+                    span2 = etree.SubElement(span, "span")
+                    self.fragment_html(types[0], span2)
+                    span2.tail = types[0].tail
+                names = param.xpath("declname")
+                if len(names) > 0:
+                    span.tail = " "
+                    span2 = etree.SubElement(span, "span")
+                    span2.text = names[0].text
+                    span2.tail = names[0].tail
+            etree.SubElement(span, "span").text = ">"
+            etree.SubElement(dest, "br")
     
-    if decls[0].kind != "root" and decls[0].kind != "page":
-        caption_type = etree.SubElement(caption, "span")
-        caption_type.set("class", "page-type")
-        caption_type.text = "(" + localize(decls[0].kind) + ")"
-        
-    if decls[0].kind == "root":
-        nav = etree.Element("div", id="nav")
-        etree.SubElement(nav, "div", id="nav-overlay")
-        nav_head = etree.Element("h2")
-        nav_head_up = etree.SubElement(nav_head, "span")
-        nav_head_up.set("class", "nav-up")
-        nav_head_up.text = "Navigation"
-        for e in global_nav: nav.append(copy.deepcopy(e))
-       
-    child_nav = etree.Element("div", id="nav")
-    etree.SubElement(child_nav, "div", id="nav-overlay")
-    child_nav_head = etree.SubElement(child_nav, "h2")
-    child_nav_up = etree.SubElement(child_nav_head, "a")
-    child_nav_up.text = page_title
-    child_nav_up.set("class", "nav-up")
-    child_nav_up.set("href", decls[0].target_url)
     
-    def add_nav_item(ul, name, href):
-        etree.SubElement(etree.SubElement(ul, "li"), "a", href=href).text = name
+    def func_var_decl(self, decl, dest, nolinks=False, abbrev=False):
+        self.any_decl(decl, dest)
+        span = etree.SubElement(dest, "span")
+        span.set("class", "specs")
+        span.text = ""
+        if decl.is_explicit: span.text += "explicit "
+        if decl.is_static: span.text += "static "
+        if decl.is_virtual: span.text += "virtual "
+        length = len(span.text)
+        span = etree.SubElement(dest, "span")
+        span.set("class", "type")
+        if decl.kind != "define":
+            if decl.data_type is not None:
+                if not abbrev: length += self.fragment_html(decl.data_type, span, nolinks)
+                else: length += self.fragment_html(decl.data_type, span, nolinks, abbrev=True)
+        else:
+            span.text = "#define"
+            length += 7
+        span.tail = " "
+        if length > 20: etree.SubElement(dest, "br")
+        span = etree.SubElement(dest, "span")
+        span.set("class", "name")
+        span.text = decl.name
+        if decl.parameters != None: 
+            span = etree.SubElement(dest, "span")
+            span.set("class", "arglist")
+            if not abbrev: span.text = decl.parameters
+            else: span.text = collapse_templates(decl.parameters, 0)[0]
+        if decl.initializer != None and not abbrev:
+            span = etree.SubElement(dest, "span")
+            span.set("class", "init")
+            span.text = " "
+            self.fragment_html(decl.initializer, span, nolinks)
+    
+
+    def typedef_decl(self, decl, dest):
+        self.any_decl(decl, dest)    
+        span = etree.SubElement(dest, "span")
+        span.set("class", "specs")
+        span.text = "using "
+        span = etree.SubElement(dest, "span")
+        span.set("class", "name")
+        span.text = decl.name
+        span = etree.Element("span")
+        span.set("class", "type")
+        length = self.fragment_html(decl.data_type, span)
+        if length + len(decl.name) > 30:
+            etree.SubElement(dest, "br")
+        etree.SubElement(dest, "span").text = " = "
+        dest.append(span)
+    
+    
+    def define_decl(self, decl, dest):
+        self.func_var_decl(decl,dest)
+    
+
+    def struct_decl(self, decl, dest):
+        self.any_decl(decl, dest)    
+        span = etree.SubElement(dest, "span")
+        span.set("class", "specs")
+        span.text = localize(decl.kind) + " "
+        span = etree.SubElement(dest, "span")
+        span.set("class", "name")
+        span.text = decl.name    
+
+        comma = False
+        for base in decl.inherits_from:
+            etree.SubElement(dest, "br")
+            span = etree.SubElement(dest, "span")
+            span.text = "\xa0\xa0\xa0\xa0" + (", " if comma else ": ")
+            if not comma: comma = True
+            span.text += base.get("prot") + " "
+            if base.get("virt") == "virtual": span.text += "virtual "
+            target = self.link_target(base.get("refid"))
+            if target != None:
+                etree.SubElement(dest, "a", href = target.target_url).text = base.text
+            else: etree.SubElement(dest, "span").text = base.text
         
-    page = etree.Element("div", id="content")
-    page.append(caption)
-    overview = etree.SubElement(page, "div", id="overview")
+                    
+    # Builds the navigation sidebar XHTML for a page
+    #   nav: The navigation, see Page.nav
+    def render_nav(self, nav):
+        up_link, sections = nav
+        nav_html = etree.Element("div", id="nav")
+        etree.SubElement(nav_html, "div", id="nav-overlay")
+        if up_link != None:
+            nav_up = etree.SubElement(etree.SubElement(nav_html, "h2"), "a")
+            nav_up.text = up_link[0]
+            nav_up.set("class", "nav-up")
+            nav_up.set("href", up_link[1])
+        for heading, items in sections:
+            nav_div = etree.SubElement(nav_html, "div")
+            etree.SubElement(nav_div, "h3").text = heading
+            nav_ul = etree.SubElement(nav_div, "ul")
+            for text, href in items:
+                etree.SubElement(etree.SubElement(nav_ul, "li"), "a", href=href).text = text
+        for e in self.project.global_nav: nav_html.append(copy.deepcopy(e))
+        return nav_html
+
+
+    # Builds the navigation sidebar XHTML for a page with the "shared_nav" option. It only
+    # references the scripts generated by Project.nav_files(), which build the navigation.
+    #   page: The Page to build the navigation for
+    def render_shared_nav(self, page):
+        nav_html = etree.Element("div", id="nav")
+        etree.SubElement(nav_html, "div", id="nav-overlay")
+        etree.SubElement(nav_html, "script", src="nav.js").text = ""
+        etree.SubElement(nav_html, "script", src=nav_file_name(page)).text = ""
+        return nav_html
+
+
+    # Renders a page, recording the links looked up in "page_links"
+    #   page: The Page to render
+    # Returns the HTML file contents
+    def render_page(self, page):  
+        self.page_links.clear()
+        decls = page.decls
+        specializations = page.specializations
+        page_title = page.page_title
+            
+        caption = etree.Element("h2")    
+        links = etree.Element("span")
+        for text, href, tail in page.parent_links:
+            a = etree.SubElement(links, "a", href=href)
+            a.text = text
+            a.tail = tail
+        if len(links) > 0 and decls[0].kind != "file" and decls[0].kind != "dir":        
+            links[len(links)-1].tail = "::"
+        etree.SubElement(links, "span").text = page_title
+        links.set("class", "page-caption")
+        links.tail = " "
+        caption.append(links)
+    
+        if decls[0].kind != "root" and decls[0].kind != "page":
+            caption_type = etree.SubElement(caption, "span")
+            caption_type.set("class", "page-type")
+            caption_type.text = "(" + localize(decls[0].kind) + ")"
         
+        content = etree.Element("div", id="content")
+        content.append(caption)
+        overview = etree.SubElement(content, "div", id="overview")
         
-    # Includes for any of the definitions in "decl"
-    include_dict = dict()
-    for decl in decls:
-        if decl.kind != "file":
-            for inc in decl.include_files:
-                include_dict[inc.get("refid")] = inc
+        # Includes for any of the definitions in "decl"
+        include_dict = dict()
+        for decl in decls:
+            if decl.kind != "file":
+                for inc in decl.include_files:
+                    include_dict[inc.get("refid")] = inc
             
-    if len(include_dict) > 0:
-        include_div = etree.SubElement(overview, "p")
-        include_div.set("class", "include")
+        if len(include_dict) > 0:
+            include_div = etree.SubElement(overview, "p")
+            include_div.set("class", "include")
                             
-        first = True
-        for inc in sorted(include_dict.values(), key = lambda x: x.text):     
-            if not first: etree.SubElement(include_div, "br")
-            else: first = False
-            include_span = etree.SubElement(include_div, "span")    
-            include_span.text = '#include <'
-            a = etree.SubElement(include_span, "a")
-            if inc.get("refid") in declarations:
-                include_file = declarations[inc.get("refid")]
-                a.set("href", include_file.target_url)
-                a.text = include_file.full_name
-            else:
-                a.text = inc.text
-            a.tail = ">"
+            first = True
+            for inc in sorted(include_dict.values(), key = lambda x: x.text):     
+                if not first: etree.SubElement(include_div, "br")
+                else: first = False
+                include_span = etree.SubElement(include_div, "span")    
+                include_span.text = '#include <'
+                a = etree.SubElement(include_span, "a")
+                include_file = self.link_target(inc.get("refid"))
+                if include_file != None:
+                    a.set("href", include_file.target_url)
+                    a.text = include_file.full_name
+                else:
+                    a.text = inc.text
+                a.tail = ">"
         
-    inline = etree.Element("div", id="inline")
-    inline_ul = etree.Element("ul")
-    inline_ul.set("class", "inline-list")
-    if len(decls) > 1: 
-        overview_ol = etree.SubElement(overview, "ol")
-        overview_ol.set("class", "overview-list")
-        inline_ol = etree.SubElement(inline, "ol")
-        inline_ol.set("class", "details-list")
+        inline = etree.Element("div", id="inline")
+        inline_ul = etree.Element("ul")
+        inline_ul.set("class", "inline-list")
+        if len(decls) > 1: 
+            overview_ol = etree.SubElement(overview, "ol")
+            overview_ol.set("class", "overview-list")
+            inline_ol = etree.SubElement(inline, "ol")
+            inline_ol.set("class", "details-list")
         
-    n = 1
-    for decl in decls:
-        details_div = etree.Element("div")
-        if len(decls) > 1:
-            def_div = etree.SubElement(inline_ol, "li")
-        else: 
-            def_div = etree.SubElement(overview, "div")
+        n = 1
+        for decl, sections in zip(decls, page.sections):
+            if len(decls) > 1:
+                def_div = etree.SubElement(inline_ol, "li")
+            else: 
+                def_div = etree.SubElement(overview, "div")
     
-        if len(decls) > 1 and (decl.kind == "function" or decl.kind == "variable"):
-            li = etree.SubElement(overview_ol, "li")
-            li.set("class", "def")
-            a = etree.SubElement(li, "a", href="#details%d" % n)
-            if decl.kind == "function" or decl.kind == "variable":
-                func_var_decl(decl, a, nolinks=True, abbrev=True)
-                li.append(a)
+            if len(decls) > 1 and (decl.kind == "function" or decl.kind == "variable"):
+                li = etree.SubElement(overview_ol, "li")
+                li.set("class", "def")
+                a = etree.SubElement(li, "a", href="#details%d" % n)
+                if decl.kind == "function" or decl.kind == "variable":
+                    self.func_var_decl(decl, a, nolinks=True, abbrev=True)
+                    li.append(a)
             
-        if decl.kind == "function" or decl.kind == "variable":
-            p = etree.SubElement(def_div, "p")
-            etree.SubElement(p, "a", name="details%d" % n)
-            func_var_decl(decl, p)
-        elif decl.kind == "class" or decl.kind == "struct":
-            p = etree.SubElement(def_div, "p")
-            struct_decl(decl, p)
+            if decl.kind == "function" or decl.kind == "variable":
+                p = etree.SubElement(def_div, "p")
+                etree.SubElement(p, "a", name="details%d" % n)
+                self.func_var_decl(decl, p)
+            elif decl.kind == "class" or decl.kind == "struct":
+                p = etree.SubElement(def_div, "p")
+                self.struct_decl(decl, p)
                    
-        def_div.set("class", "def")
-        if decl.brief_description != None:
-            div = etree.SubElement(def_div, "div")
-            div.set("class", "brief")
-            to_html(decl.brief_description, div)
+            def_div.set("class", "def")
+            if decl.brief_description != None:
+                div = etree.SubElement(def_div, "div")
+                div.set("class", "brief")
+                self.fragment_html(decl.brief_description, div)
+            
+            if decl.kind == "enum":
+                div = etree.SubElement(def_div, "div")
+                etree.SubElement(div, "h4").text = "Enumeration values:"
+                par = etree.SubElement(div, "div")
+                par.set("class", "par")
+                table = etree.SubElement(par, "table")
+                table.set("class", "paramlist")
+                for val in decl.enum_values:
+                    tr = etree.SubElement(table, "tr")
+                    td = etree.SubElement(tr, "td")
+                    td.set("class", "paramname")
+                    xp = val.xpath("name")
+                    if len(xp) > 0: td.text = xp[0].text
+                    td = etree.SubElement(tr, "td")
+                    xp = val.xpath("briefdescription")
+                    if len(xp) > 0: self.fragment_html(xp[0], td)
+            
+            if decl.detailed_description != None:
+                div = etree.SubElement(def_div, "div")
+                div.set("class", "details")
+                self.fragment_html(decl.detailed_description, div)
             
-        if decl.kind == "enum":
-            div = etree.SubElement(def_div, "div")
-            etree.SubElement(div, "h4").text = "Enumeration values:"
-            par = etree.SubElement(div, "div")
-            par.set("class", "par")
-            table = etree.SubElement(par, "table")
-            table.set("class", "paramlist")
-            for val in decl.enum_values:
+            for heading, groups in sections:
+                div = etree.Element("div")
+                h3 = etree.SubElement(div, "h3")
+                h3.text = heading
+                table = etree.Element("table")
+                table.set("class", "decllist")
+                for group_name, e, href, link_text in groups:
+                    if group_name != "(destructor)" and e[0].inline_doc:
+                        for f in sorted(e, key=lambda x: x.name):
+                            anchor = f.target_url_anchor
+                            li = etree.SubElement(inline_ul, "li")
+                            li.set("class", "details def")
+                            decl_div = etree.SubElement(li, "div")
+                            etree.SubElement(decl_div, "a", name=anchor)
+                            if f.kind == "typedef":
+                                self.typedef_decl(f, etree.SubElement(decl_div, "p"))
+                            elif f.kind == "define":
+                                self.define_decl(f, etree.SubElement(decl_div, "p"))
+                            else:
+                                self.func_var_decl(f, etree.SubElement(decl_div, "p"))                                
+                            if f.brief_description != None:
+                                brief = etree.SubElement(li, "div")
+                                brief.set("class", "brief")
+                                self.fragment_html(f.brief_description, brief)
+                            if f.detailed_description != None:
+                                details = etree.SubElement(li, "div")
+                                details.set("class", "details")
+                                self.fragment_html(f.detailed_description, details)
+                    tr = etree.SubElement(table, "tr")
+                    if e[0].kind not in [ "group", "file", "page", "dir" ]:
+                        td = etree.SubElement(tr, "td", )
+                        td.set("class", "decltype")
+                        if e[0].kind == "variable": 
+                            self.fragment_html(e[0].data_type, td, abbrev=True)
+                        elif e[0].kind == "function": 
+                            if group_name == "(constructor)": td.text = "constructor"
+                            elif group_name == "(destructor)": td.text = "destructor"
+                            else: td.text = "function"
+                        elif e[0].kind == "define":
+                            td.text = "#define"
+                        else: td.text = e[0].kind
+                    td = etree.SubElement(tr, "td")              
+                    td.set("class", "declname")        
+                    a = etree.SubElement(td, "a", href = href)
+                    a.set("class", "name")
+                    a.text = link_text
+                    span = etree.SubElement(td, "span")           
+                    span.set("class", "init")
+                    if e[0].kind == "typedef": 
+                        self.fragment_html(e[0].data_type, span, abbrev=True)
+                        span.text = " = " + (span.text if span.text else "")
+                    
+                div.append(table)
+                overview.append(div)
+                    
+            n += 1
+            
+        if len(inline_ul) > 0: 
+            inline.append(inline_ul)
+        
+        if len(decls) > 1 or len(inline) > 0:
+            etree.SubElement(content, "h3").text = "Details"
+    
+        if len(specializations) > 0:
+            div = etree.SubElement(inline, "div")
+            h3 = etree.SubElement(div, "h3")
+            h3.text = "Template Specializations"
+            table = etree.SubElement(div, "table")
+            table.set("class", "decllist")
+            for s in specializations:
                 tr = etree.SubElement(table, "tr")
                 td = etree.SubElement(tr, "td")
-                td.set("class", "paramname")
-                xp = val.xpath("name")
-                if len(xp) > 0: td.text = xp[0].text
+                td.set("class", "decltype")
+                td.text = s.kind
                 td = etree.SubElement(tr, "td")
-                xp = val.xpath("briefdescription")
-                if len(xp) > 0: to_html(xp[0], td)
+                td.set("class", "declname")
+                a = etree.SubElement(td, "a", href=s.target_url)
+                a.set("class", "name")
+                a.text = s.name
+            
+        if len(decls) > 1 or len(inline) > 0:
+            content.append(inline)
+        with self.project.timer("navigation"):
+            if self.project.config["shared_nav"]: nav_html = self.render_shared_nav(page)
+            else: nav_html = self.render_nav(page.nav)
+        with self.project.timer("serialization"):
+            return html_document(page_title, nav_html, content, self.project.config["search"],
+                                 self.project.config["minify"])
+
+
+# Renders Pages like Renderer, but writes the HTML as strings instead of building an lxml tree
+# and serializing it. Both produce the same markup, except that the HTML written by this one is
+# never indented, like with the "minify" option. Each method returns the HTML its counterpart
+# in Renderer adds to "dest", the caller writes "dest" itself.
+class StringRenderer(Renderer):
+    def __init__(self, project):
+        super().__init__(project)
+
+        # The HTML of Project.global_nav, see render_nav()
+        self.global_nav_html = None
+
+    def reset(self):
+        super().reset()
+        self.global_nav_html = None
+
+
+    # Converts a Doxygen XML fragment like to_html() or, with "abbrev", like to_html_abbrev().
+    # The HTML is kept in "fragments" together with the links it looked up, see
+    # Renderer.fragment_html(). Strings need not be copied, so every fragment is kept.
+    # Returns the HTML and its length
+    def fragment_html(self, tree, nolinks=False, abbrev=False):
+        key = (tree, nolinks, abbrev)
+        fragment = self.fragments.get(key)
+        if fragment == None:
+            page_links = self.page_links
+            self.page_links = dict()
+            if abbrev: html, length = self.to_html_abbrev(tree, nolinks)
+            else: html, length = self.to_html(tree, nolinks)
+            fragment = (html, length, list(self.page_links))
+            self.fragments[key] = fragment
+            self.page_links = page_links
+
+        html, length, link_ids = fragment
+        for doxygen_id in link_ids: self.link_target(doxygen_id)
+        return html, length
+
+
+    # Returns the HTML and length like Renderer.to_html_abbrev()
+    def to_html_abbrev(self, tree, nolinks=False):
+        depth = 0
+        text, depth = collapse_templates(tree.text, depth)
+        out = [ html_text(text) ]
+        length = len(text) if text != None else 0
+        for e in tree.iterchildren(tag="ref"):
+            target = self.link_target(e.get("refid")) if not nolinks else None
+            if nolinks: out.append("<span>")
+            elif target != None: out.append('<a href="' + html_attribute(target.target_url) + '">')
+            else: out.append("<a>")
+            text, depth = collapse_templates(e.text, depth)
+            tail, depth = collapse_templates(e.tail, depth)
+            out += [ html_text(text), "</span>" if nolinks else "</a>", html_text(tail) ]
+            if text != None: length += len(text)
+            if tail != None: length += len(tail)
+        return "".join(out), length
+
+
+    # Returns the HTML and length like Renderer.to_html()
+    def to_html(self, tree, nolinks=False):
+        text, html, length = self.to_html_parts(tree, nolinks)
+        return text + html, length
+
+
+    # Converts a Doxygen XML fragment like Renderer.to_html()
+    # Returns the HTML of the text "dest" receives, the HTML of the elements after it, and
+    # the length like Renderer.to_html()
+    def to_html_parts(self, tree, nolinks=False):
+        out = []
+        length = len(tree.text) if tree.text != None else 0
+        for e in tree.iterchildren(tag=etree.Element):
+            if e.tag == "ref":
+                if not nolinks:
+                    target = self.link_target(e.get("refid"))
+                    if target != None and target.target_url != None:
+                        out.append('<a href="' + html_attribute(target.target_url) + '">')
+                    else: out.append("<a>")
+                    out += [ html_text(e.text), "</a>", html_text(e.tail) ]
+                else:
+                    out += [ "<span>", html_text(e.text), "</span>", html_text(e.tail) ]
+                if e.text != None: length += len(e.text)
+                if e.tail != None: length += len(e.tail)
+            elif e.tag == "para":
+                html, para_length = self.to_html(e, nolinks)
+                out += [ "<p>", html, "</p>", html_text(e.tail) ]
+                length += para_length
+            elif e.tag == "linebreak":
+                out += [ "<br>", html_text(e.tail) ]
+            elif e.tag == "simplesect":
+                if e.get("kind") != None and e.get("kind") == "return": heading = "Returns:"
+                elif e.get("kind") != None and e.get("kind") == "see": heading = "See also:"
+                else:
+                    xp = e.xpath("title")
+                    heading = xp[0].text if len(xp) > 0 else None
+                if heading != None: length += len(heading)
+                html, sect_length = self.to_html(e)
+                out += [ "<h4>", html_text(heading), '</h4><div class="par">', html, "</div>" ]
+                length += sect_length
+            elif e.tag == "programlisting":
+                # The text of every line goes before the first line break, like in to_html()
+                code_text = []
+                code_html = []
+                code_length = 0
+                for line in e.iterchildren(tag="codeline"):
+                    if len(code_text) > 0: code_html.append("<br>")
+                    text, html, line_length = self.to_html_parts(line)
+                    if line.text != None: 
+                        length += code_length
+                        code_length += len(line.text)
+                    code_text.append(text)
+                    code_html.append(html)
+                    length += line_length
+                out += [ '<div class="listing">' ] + code_text + code_html + [ "</div>" ]
+            elif e.tag == "computeroutput":
+                out += [ '<span class="tt">', self.to_html(e)[0], "</span>", html_text(e.tail) ]
+            elif e.tag == "highlight":
+                html, highlight_length = self.to_html(e)
+                out += [ '<span class="hl-', html_attribute(e.get("class")), '">', html, 
+                         "</span>", html_text(e.tail) ]
+                length += highlight_length
+            elif e.tag == "sp": 
+                out += [ "<span>\xa0</span>", html_text(e.tail) ]
+                length += 1
+            elif e.tag == "bold":
+                out += [ "<strong>", self.to_html(e)[0], "</strong>", html_text(e.tail) ]
+            elif e.tag == "italic":
+                out += [ "<em>", self.to_html(e)[0], "</em>", html_text(e.tail) ]
+            elif e.tag == "table":
+                out.append('<table class="paramlist">')
+                for row in e.iterchildren(tag="row"):
+                    out.append("<tr>")
+                    first = True
+                    for col in row.iterchildren(tag="entry"):
+                        tag = "thead" if col.get("thead") == "yes" else "td"
+                        html, col_length = self.to_html(col)
+                        out += [ "<", tag, ' class="', "paramname" if first else "paramdescr",
+                                 '">', html, "</", tag, ">" ]
+                        length += col_length
+                        if first: first = False      
+                    out.append("</tr>")
+                out += [ "</table>", html_text(e.tail) ]
+            elif e.tag == "parameterlist":
+                if e.get("kind") == "exception": heading = "Exceptions:"
+                elif e.get("kind") == "templateparam": heading = "Template parameters:"
+                else: heading = "Parameters:"
+                length += len(heading)
+                out += [ "<h4>", heading, '</h4><div class="par"><table class="paramlist">' ]
+                for item in e.iterchildren(tag="parameteritem"):
+                    out.append('<tr><td class="paramname">')
+                    xp = item.xpath("parameternamelist/parametername")
+                    if len(xp) > 0: 
+                        html, name_length = self.to_html(xp[0])
+                        out.append(html)
+                        length += name_length
+                    out.append('</td><td class="paramdescr">')
+                    xp = item.xpath("parameterdescription")
+                    if len(xp) > 0: 
+                        html, descr_length = self.to_html(xp[0])
+                        out.append(html)
+                        length += descr_length
+                    out.append("</td></tr>")
+                out.append("</table></div>")
+            elif e.tag == "variablelist":
+                out.append('<ul class="varlist">')
+                li = False
+                for item in e.iterchildren(tag=etree.Element):
+                    if item.tag == "varlistentry":
+                        if li: out.append("</li>")
+                        out.append("<li>")
+                        li = True
+                        for term in item.iterchildren(tag="term"):
+                            out += [ '<p class="head">', self.to_html(term)[0], "</p>" ]
+                    elif item.tag == "listitem" and li:
+                        out += [ "<p>", self.to_html(item)[0], "</p>" ]
+                if li: out.append("</li>")
+                out.append("</ul>")
+            
+        return html_text(tree.text), "".join(out), length
+
+    
+    # Returns the HTML of the template parameters of a declaration like Renderer.any_decl(),
+    # the caller sets the "decl" class
+    def any_decl(self, decl):
+        if decl.template_params == None: return ""
+        text = "template <"
+        # The [html, tail] of each parameter type and name, their tails change later on
+        spans = []
+        template_tail = None
+        comma = False
+        for param in decl.template_params.iterchildren(tag=etree.Element):
+            types = param.xpath("type")
+            if len(types) > 0: 
+                if comma: spans[-1][1] = ", "
+                else: comma = True; text += " "
+                spans.append([ self.fragment_html(types[0])[0], types[0].tail ])
+            names = param.xpath("declname")
+            if len(names) > 0:
+                template_tail = " "
+                spans.append([ html_text(names[0].text), names[0].tail ])
+        return ('<span class="template">' + html_text(text) 
+                + "".join("<span>" + html + "</span>" + html_text(tail) for html, tail in spans)
+                + "<span>&gt;</span></span>" + html_text(template_tail) + "<br>")
+    
+    
+    # Returns the HTML like Renderer.func_var_decl()
+    def func_var_decl(self, decl, nolinks=False, abbrev=False):
+        out = [ self.any_decl(decl) ]
+        specs = ""
+        if decl.is_explicit: specs += "explicit "
+        if decl.is_static: specs += "static "
+        if decl.is_virtual: specs += "virtual "
+        length = len(specs)
+        out.append('<span class="specs">' + specs + '</span><span class="type">')
+        if decl.kind != "define":
+            if decl.data_type is not None:
+                html, type_length = self.fragment_html(decl.data_type, nolinks, abbrev)
+                out.append(html)
+                length += type_length
+        else:
+            out.append("#define")
+            length += 7
+        out.append("</span> ")
+        if length > 20: out.append("<br>")
+        out.append('<span class="name">' + html_text(decl.name) + "</span>")
+        if decl.parameters != None: 
+            if not abbrev: parameters = decl.parameters
+            else: parameters = collapse_templates(decl.parameters, 0)[0]
+            out.append('<span class="arglist">' + html_text(parameters) + "</span>")
+        if decl.initializer != None and not abbrev:
+            out.append('<span class="init"> ' + self.fragment_html(decl.initializer, nolinks)[0] 
+                       + "</span>")
+        return "".join(out)
+    
+
+    # Returns the HTML like Renderer.typedef_decl()
+    def typedef_decl(self, decl):
+        html, length = self.fragment_html(decl.data_type)
+        return (self.any_decl(decl) + '<span class="specs">using </span><span class="name">' 
+                + html_text(decl.name) + "</span>" + ("<br>" if length + len(decl.name) > 30 else "") 
+                + '<span> = </span><span class="type">' + html + "</span>")
+    
+    
+    def define_decl(self, decl):
+        return self.func_var_decl(decl)
+    
+
+    # Returns the HTML like Renderer.struct_decl()
+    def struct_decl(self, decl):
+        out = [ self.any_decl(decl), '<span class="specs">', html_text(localize(decl.kind)),
+                ' </span><span class="name">', html_text(decl.name), "</span>" ]
+        comma = False
+        for base in decl.inherits_from:
+            text = "\xa0\xa0\xa0\xa0" + (", " if comma else ": ")
+            if not comma: comma = True
+            text += base.get("prot") + " "
+            if base.get("virt") == "virtual": text += "virtual "
+            out += [ "<br><span>", html_text(text), "</span>" ]
+            target = self.link_target(base.get("refid"))
+            if target != None:
+                out += [ '<a href="', html_attribute(target.target_url), '">', 
+                         html_text(base.text), "</a>" ]
+            else: out += [ "<span>", html_text(base.text), "</span>" ]
+        return "".join(out)
+        
+                    
+    # Returns the HTML like Renderer.render_nav()
+    def render_nav(self, nav):
+        up_link, sections = nav
+        out = [ '<div id="nav"><div id="nav-overlay"></div>' ]
+        if up_link != None:
+            out += [ '<h2><a class="nav-up" href="', html_attribute(up_link[1]), '">', 
+                     html_text(up_link[0]), "</a></h2>" ]
+        for heading, items in sections:
+            out += [ "<div><h3>", html_text(heading), "</h3><ul>" ]
+            for text, href in items:
+                out += [ '<li><a href="', html_attribute(href), '">', html_text(text), 
+                         "</a></li>" ]
+            out.append("</ul></div>")
+        if self.global_nav_html == None:
+            self.global_nav_html = "".join(etree.tostring(e, method="html", encoding="unicode") 
+                                           for e in self.project.global_nav)
+        out += [ self.global_nav_html, "</div>" ]
+        return "".join(out)
+
+
+    # Returns the HTML like Renderer.render_shared_nav()
+    def render_shared_nav(self, page):
+        return ('<div id="nav"><div id="nav-overlay"></div><script src="nav.js"></script>'
+                + '<script src="' + html_attribute(nav_file_name(page)) + '"></script></div>')
+
+
+    # Renders a page like Renderer.render_page()
+    #   page: The Page to render
+    # Returns the HTML file contents
+    def render_page(self, page):  
+        self.page_links.clear()
+        decls = page.decls
+        specializations = page.specializations
+        page_title = page.page_title
+        
+        content = [ '<div id="content"><h2><span class="page-caption">' ]
+        for i, (text, href, tail) in enumerate(page.parent_links):
+            if i == len(page.parent_links) - 1 and decls[0].kind != "file" \
+                    and decls[0].kind != "dir":        
+                tail = "::"
+            content += [ '<a href="', html_attribute(href), '">', html_text(text), "</a>", 
+                         html_text(tail) ]
+        content += [ "<span>", html_text(page_title), "</span></span> " ]
+        if decls[0].kind != "root" and decls[0].kind != "page":
+            content += [ '<span class="page-type">(', html_text(localize(decls[0].kind)),
+                         ")</span>" ]
+        content.append('</h2><div id="overview">')
+        
+        # Includes for any of the definitions in "decl"
+        include_dict = dict()
+        for decl in decls:
+            if decl.kind != "file":
+                for inc in decl.include_files:
+                    include_dict[inc.get("refid")] = inc
+            
+        if len(include_dict) > 0:
+            content.append('<p class="include">')
+            first = True
+            for inc in sorted(include_dict.values(), key = lambda x: x.text):     
+                if not first: content.append("<br>")
+                else: first = False
+                content.append("<span>#include &lt;")
+                include_file = self.link_target(inc.get("refid"))
+                if include_file != None:
+                    content += [ '<a href="', html_attribute(include_file.target_url), '">',
+                                 html_text(include_file.full_name), "</a>" ]
+                else:
+                    content += [ "<a>", html_text(inc.text), "</a>" ]
+                content.append("&gt;</span>")
+            content.append("</p>")
+        
+        # The overview list comes before the member tables of all declarations, their details
+        # go into the inline list after the overview
+        overview = []
+        overview_ol = []
+        inline_ol = []
+        inline_ul = []
+        
+        n = 1
+        for decl, sections in zip(decls, page.sections):
+            if len(decls) > 1:
+                def_div = inline_ol
+                def_div.append('<li class="def">')
+            else: 
+                def_div = overview
+                def_div.append('<div class="def">')
+    
+            if len(decls) > 1 and (decl.kind == "function" or decl.kind == "variable"):
+                overview_ol += [ '<li class="def"><a href="#details%d" class="decl">' % n,
+                                 self.func_var_decl(decl, nolinks=True, abbrev=True), 
+                                 "</a></li>" ]
+            
+            if decl.kind == "function" or decl.kind == "variable":
+                def_div += [ '<p class="decl"><a name="details%d"></a>' % n, 
+                             self.func_var_decl(decl), "</p>" ]
+            elif decl.kind == "class" or decl.kind == "struct":
+                def_div += [ '<p class="decl">', self.struct_decl(decl), "</p>" ]
+                   
+            if decl.brief_description != None:
+                def_div += [ '<div class="brief">', 
+                             self.fragment_html(decl.brief_description)[0], "</div>" ]
+            
+            if decl.kind == "enum":
+                def_div.append('<div><h4>Enumeration values:</h4><div class="par">'
+                               + '<table class="paramlist">')
+                for val in decl.enum_values:
+                    def_div.append('<tr><td class="paramname">')
+                    xp = val.xpath("name")
+                    if len(xp) > 0: def_div.append(html_text(xp[0].text))
+                    def_div.append("</td><td>")
+                    xp = val.xpath("briefdescription")
+                    if len(xp) > 0: def_div.append(self.fragment_html(xp[0])[0])
+                    def_div.append("</td></tr>")
+                def_div.append("</table></div></div>")
             
-        if decl.detailed_description != None:
-            div = etree.SubElement(def_div, "div")
-            div.set("class", "details")
-            to_html(decl.detailed_description, div)
+            if decl.detailed_description != None:
+                def_div += [ '<div class="details">', 
+                             self.fragment_html(decl.detailed_description)[0], "</div>" ]
+            def_div.append("</li>" if len(decls) > 1 else "</div>")
             
-        base_classes = base_names(decl)  
+            for heading, groups in sections:
+                overview += [ "<div><h3>", html_text(heading), '</h3><table class="decllist">' ]
+                for group_name, e, href, link_text in groups:
+                    if group_name != "(destructor)" and e[0].inline_doc:
+                        for f in sorted(e, key=lambda x: x.name):
+                            inline_ul += [ '<li class="details def"><div><a name="', 
+                                           html_attribute(f.target_url_anchor), 
+                                           '"></a><p class="decl">' ]
+                            if f.kind == "typedef": inline_ul.append(self.typedef_decl(f))
+                            elif f.kind == "define": inline_ul.append(self.define_decl(f))
+                            else: inline_ul.append(self.func_var_decl(f))
+                            inline_ul.append("</p></div>")
+                            if f.brief_description != None:
+                                inline_ul += [ '<div class="brief">', 
+                                               self.fragment_html(f.brief_description)[0], 
+                                               "</div>" ]
+                            if f.detailed_description != None:
+                                inline_ul += [ '<div class="details">', 
+                                               self.fragment_html(f.detailed_description)[0], 
+                                               "</div>" ]
+                            inline_ul.append("</li>")
+                    overview.append("<tr>")
+                    if e[0].kind not in [ "group", "file", "page", "dir" ]:
+                        overview.append('<td class="decltype">')
+                        if e[0].kind == "variable": 
+                            overview.append(self.fragment_html(e[0].data_type, abbrev=True)[0])
+                        elif e[0].kind == "function": 
+                            if group_name == "(constructor)": overview.append("constructor")
+                            elif group_name == "(destructor)": overview.append("destructor")
+                            else: overview.append("function")
+                        elif e[0].kind == "define":
+                            overview.append("#define")
+                        else: overview.append(html_text(e[0].kind))
+                        overview.append("</td>")
+                    overview += [ '<td class="declname"><a href="', html_attribute(href), 
+                                  '" class="name">', html_text(link_text), 
+                                  '</a><span class="init">' ]
+                    if e[0].kind == "typedef": 
+                        overview += [ " = ", self.fragment_html(e[0].data_type, abbrev=True)[0] ]
+                    overview.append("</span></td></tr>")
+                overview.append("</table></div>")
+                    
+            n += 1
+        
+        if len(decls) > 1:
+            content += [ '<ol class="overview-list">' ] + overview_ol + [ "</ol>" ]
+        content += overview
+        content.append("</div>")
+
+        inline = []
+        if len(decls) > 1: inline += [ '<ol class="details-list">' ] + inline_ol + [ "</ol>" ]
+        if len(inline_ul) > 0: inline += [ '<ul class="inline-list">' ] + inline_ul + [ "</ul>" ]
         
+        if len(decls) > 1 or len(inline) > 0:
+            content.append("<h3>Details</h3>")
+    
+        if len(specializations) > 0:
+            inline.append('<div><h3>Template Specializations</h3><table class="decllist">')
+            for s in specializations:
+                inline += [ '<tr><td class="decltype">', html_text(s.kind), 
+                            '</td><td class="declname"><a href="', html_attribute(s.target_url),
+                            '" class="name">', html_text(s.name), "</a></td></tr>" ]
+            inline.append("</table></div>")
+            
+        if len(decls) > 1 or len(inline) > 0:
+            content += [ '<div id="inline">' ] + inline + [ "</div>" ]
+        content.append("</div>")
+
+        with self.project.timer("navigation"):
+            if self.project.config["shared_nav"]: nav_html = self.render_shared_nav(page)
+            else: nav_html = self.render_nav(page.nav)
+        with self.project.timer("serialization"):
+            return html_document_string(page_title, nav_html, "".join(content), 
+                                        self.project.config["search"], 
+                                        self.project.config["minify"])
+
+
+# The HTML writers to choose from with the "html_writer" option, see StringRenderer
+html_writers = { "lxml": Renderer, "string": StringRenderer }
+
+
+# Checks the name of an HTML writer given on the command line
+# Returns the name
+def html_writer_name(name):
+    if name not in html_writers: raise ValueError("Unknown HTML writer '{}'".format(name))
+    return name
+
+
+# A set of Doxygen XML files to be turned into HTML documentation. Documentation is produced in
+# separate steps, which allows using DoxyC++ as a library:
+#
+#   project = doxycpp.Project("xml", jobs=4)
+#   project.load()              # Read all XML files into "declarations"
+#   project.resolve()           # Build the hierarchy and names of all declarations
+#   project.plan()              # Determine all pages to be written into "pages"
+#   project.write("html")       # Render and write all pages
+#   project.close()             # Remove temporary files, like the database of the store option
+#
+# Single pages can also be rendered to a string with render() after plan().
+class Project:
+    #   xml_dir: The directory to read .xml files from
+    #   options: Overrides for the default "config"
+    def __init__(self, xml_dir=".", **options):
+        for key in options:
+            if key not in config: 
+                raise TypeError("Unknown option '{}'".format(key))
+
+        # The directory to read .xml files from
+        self.xml_dir = xml_dir
+
+        # The configuration, see "config"
+        self.config = dict(config)
+        self.config.update(options)
+        if self.config["jobs"] <= 0: self.config["jobs"] = os.cpu_count() or 1
+
+        # Worker processes are forked, since they need to inherit the Project. This also lets
+        # page rendering workers inherit all declarations.
+        if self.config["jobs"] > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            print("Parallel processing is not supported on this platform, using a single process",
+                  file=sys.stderr)
+            self.config["jobs"] = 1
+
+        # Manifests are only valid for the DoxyC++ version, source and configuration they were
+        # created with, as summarized by this key
+        self.config_key = hashlib.md5(bytearray(version + repr(sorted((k, v) 
+            for k, v in self.config.items() if k not in runtime_config)) + source_digest, 
+            'utf-8')).hexdigest()
+
+        # Cache entries only depend on the options that change how files are parsed
+        self.parse_key = hashlib.md5(bytearray(version + repr(sorted((k, v) 
+            for k, v in self.config.items() if k in parse_config)) + source_digest, 
+            'utf-8')).hexdigest()
+
+        # Maps weird Doxygen IDs (like "classfn_1_1definition__array_4") to Declaration instances
+        self.declarations = dict()
+
+        # Maps fully scoped namespace names to their Declaration object.
+        # Needed to resolve nested namespace hierarchies, as they don't contain each other as
+        # members
+        self.namespaces = dict()
+
+        # Dummy node for the "Index" page
+        self.root = None
+
+        # Maps each Declaration to a list of the Declarations whose "parent" it is, see resolve()
+        self.children = dict()
+
+        # Maps scope Declarations to their grouped members, see member_groups()
+        self.groups = dict()
+
+        # Maps each Declaration deriving from documented classes to the set of all its direct and
+        # indirect base class Declarations, see build_inheritance()
+        self.ancestors = dict()
+
+        # The navigation sidebar sections shared by all pages, as XHTML elements
+        self.global_nav = []
+
+        # The pages to be written, see plan()
+        self.pages = []
+
+        # Hashes of Declarations, see decl_fingerprint()
+        self.fingerprints = dict()
+
+        # The Declarations read from each .xml file before merging and resolving them, only kept
+        # by update()
+        self.file_decls = dict()
+
+        # The (size, mtime, content hash) of each file in "file_decls"
+        self.file_stats = dict()
+
+        # Maps Doxygen IDs to the Declaration in "file_decls" that has been copied into
+        # "declarations" by update()
+        self.sources = dict()
+
+        # Hashes of the Declarations copied from "sources" as (source, include_files, names, hash)
+        # tuples, which remain valid across update() calls, see decl_fingerprint()
+        self.source_fingerprints = dict()
+
+        # The output directory and manifest of the last incremental write()
+        self.last_manifest = None
+
+        # The declaration cache, if enabled
+        self.cache = None
+        if self.config["cache_dir"] != None:
+            self.cache = DeclarationCache(self.config["cache_dir"], self.config["cache_size"],
+                                          self.parse_key)
+
+        if self.config["brotli"] and brotli == None:
+            print("The brotli module is not installed, not writing .br files", file=sys.stderr)
+            self.config["brotli"] = False
+
+        # The link map read with the "link_map" option, see export_links(), or None
+        self.link_map = None
+
+        # Maps Doxygen IDs to the [target_url, full_name, kind] of their link targets for IDs
+        # that may be missing from "declarations", and the Declarations created for them, see
+        # link_declaration(). Targets in other projects are added with the "external" option.
+        self.links = dict()
+        self.link_stubs = dict()
+
+        if self.config["link_map"] != None:
+            with open(self.config["link_map"], 'r') as file:
+                self.link_map = json.load(file)
+            self.links.update(self.link_map["links"])
+        for file_name, base_url in self.config["external"]:
+            for doxygen_id, link in read_external_links(file_name, base_url).items():
+                self.links.setdefault(doxygen_id, link)
+
+        # The names of the scopes whose pages are written with the "scope" or "shard" options,
+        # or None to write all pages. The first shard also writes the index page.
+        self.scopes = None
+        self.scope_index = False
+        if self.config["scope"] != None or self.config["shard"] != None:
+            self.scopes = set()
+            if self.config["scope"] != None: self.scopes.add(scope_name(self.config["scope"]))
+        if self.config["shard"] != None:
+            if self.link_map == None: raise ValueError("The shard option requires a link map")
+            number, count = self.config["shard"]
+            self.scopes.update(scope_name(scope) 
+                               for scope in self.link_map["scopes"][number - 1::count])
+            self.scope_index = number == 1
+
+        # The DeclarationStore keeping XML fragments out of memory with the "store" option
+        self.store = None
+        if self.config["store"] != None and sqlite3 == None:
+            print("The sqlite3 module is not installed, keeping all declarations in memory", 
+                  file=sys.stderr)
+            self.config["store"] = None
+        if self.config["store"] != None:
+            self.store = DeclarationStore(self.config["store"], self.config["store_cache"])
+
+        # The thread pool compressing output files while write() runs, see compressing()
+        self.compressor = None
+
+        # The worker process pool rendering pages while "compressor" runs, see compressing()
+        self.page_pool = None
+
+        # The compression tasks submitted to "compressor"
+        self.compression_tasks = []
+
+        # The Profile of this build with the "profile" or "cprofile" option, or None. With the
+        # "profile_allocations" option, allocations are traced from here on.
+        self.profile = None
+        if self.config["profile"] != None or self.config["cprofile"] != None:
+            self.profile = Profile()
+            if self.config["profile_allocations"] and not tracemalloc.is_tracing(): 
+                tracemalloc.start()
+            if self.config["cprofile"] != None: self.profile.profiler = cProfile.Profile()
+
+        if self.config["html_writer"] not in html_writers:
+            raise ValueError("Unknown HTML writer '{}'".format(self.config["html_writer"]))
+        self.renderer = html_writers[self.config["html_writer"]](self)
+
+
+    # Returns a context manager recording a phase in "profile", see Profile.phase()
+    def phase(self, name):
+        return self.profile.phase(name) if self.profile != None else no_profile()
+
+
+    # Returns a context manager recording a part of a phase in "profile", see Profile.timer()
+    def timer(self, name):
+        return self.profile.timer(name) if self.profile != None else no_profile()
+
+
+    # Writes the JSON report of "profile" with the "profile" option, and the statistics of the
+    # rendering phase with the "cprofile" option
+    def write_profile(self):
+        if self.config["profile"] != None:
+            with open(self.config["profile"], 'w') as file:
+                json.dump(self.profile.report(self.config), file, indent=4)
+        if self.config["cprofile"] != None:
+            self.profile.profiler.dump_stats(self.config["cprofile"])
+
+
+    # Removes the temporary files of this Project once it is no longer used. Declarations kept in
+    # the store of the "store" option cannot be rendered afterwards.
+    def close(self):
+        if self.store != None: self.store.close()
+
+
+    # Reads a single .xml file into a dictionary of its own and stores it in the cache, if enabled
+    #   file_name: The file to read
+    # Returns the Declarations read
+    def read_file(self, file_name):
+        decls = dict()
+        with self.timer("parsing"):
+            read_xml(file_name, decls, self.config["stream"])
+        if self.cache != None: self.cache.store(file_name, decls)
+        return decls
+
+
+    # Returns all .xml files in "xml_dir" in a fixed order, so that the output does not depend on
+    # the file system: Files of scopes (named after their Doxygen ID, like "namespacefoo.xml")
+    # come first, since members listed by files or groups as well should be read from their scope.
+    # Files are sorted by name otherwise.
+    def xml_files(self):
+        return [ os.path.join(self.xml_dir, file_name) 
+            for file_name in sorted(os.listdir(self.xml_dir), 
+                                    key=lambda x: (not x.startswith(scope_file_prefixes), x)) 
+            if len(file_name) > 3 and file_name[-4:] == ".xml" 
+            and os.path.isfile(os.path.join(self.xml_dir, file_name)) ]
+
+
+    # Reads .xml files, looking them up in the cache and using worker processes if configured
+    #   file_names: The files to read
+    # Yields the Declarations read from each file, in the order given
+    def read_files(self, file_names):
+        # Files found in the cache do not need to be parsed again
+        cached_files = dict()
+        if self.cache != None:
+            for file_name in file_names:
+                cached_files[file_name] = self.cache.load(file_name)
+        parse_files = [ file_name for file_name in file_names if cached_files.get(file_name) == None ]
+        if self.profile != None:
+            self.profile.count("files_parsed", len(parse_files))
+            self.profile.count("files_cached", len(file_names) - len(parse_files))
+
+        jobs = self.config["jobs"]
+        if jobs > 1 and len(parse_files) > 1:
+            with worker_pool(self) as pool:
+                chunk_size = max(1, len(parse_files) // (4 * jobs))
+                parsed_files = pool.imap(read_xml_file_isolated, parse_files, chunk_size)
+                for file_name in file_names:
+                    if cached_files.get(file_name) != None: 
+                        yield cached_files[file_name]
+                        continue
+                    decls, profile = next(parsed_files)
+                    if profile != None: self.profile.merge(profile)
+                    yield decls
+            # Entries stored by the workers are used in this run as well
+            if self.cache != None:
+                for file_name in parse_files: self.cache.used.add(self.cache.entry_name(file_name))
+        else:
+            for file_name in file_names:
+                if cached_files.get(file_name) != None: yield cached_files[file_name]
+                else: yield self.read_file(file_name)
+
+
+    # Parses all .xml files in "xml_dir", updating "declarations". With the "scope" or "shard"
+    # options, only the files needed for their scopes are parsed, see load_scope().
+    def load(self):
+        # Files are merged in order, so the first definition of a duplicate ID wins
+        with self.phase("ingestion"):
+            if self.scopes != None: 
+                self.load_scope()
+            else:
+                for decls in self.read_files(self.xml_files()):
+                    self.merge_file(decls)
+            if self.store != None: self.store.commit()
+
+            if self.cache != None:
+                self.cache.prune()
+        if self.profile != None: self.profile.counters["declarations"] = len(self.declarations)
+
+
+    # Parses the .xml files needed to document "scopes", see scope_compounds(), and then the
+    # files of their base classes, of the files in directories within the scopes, and of the
+    # compounds whose files load() would read a member from. Every other compound listed in
+    # index.xml is added as a stub, see add_index_stubs(), so that the hierarchy, names and URLs
+    # are the same as when reading all files. If there is no index.xml, all files are read.
+    def load_scope(self):
+        compounds = read_xml_index(os.path.join(self.xml_dir, "index.xml"))
+        if len(compounds) == 0:
+            print("index.xml lists no compounds, reading all files", file=sys.stderr)
+            for decls in self.read_files(self.xml_files()):
+                self.merge_file(decls)
+            return
+
+        # Compounds are merged in the order load() reads their files in
+        compounds.sort(key=lambda c: (not c[0].startswith(scope_file_prefixes), c[0] + ".xml"))
+        compound_ids = set(c[0] for c in compounds)
+        # Maps the Doxygen ID of every member to the first compound listing it
+        owners = dict()
+        for doxygen_id, kind, name, members in compounds:
+            for member_id, member_kind, member_name in members: 
+                owners.setdefault(member_id, doxygen_id)
+
+        file_decls = dict()
+        needed = self.scope_compounds(compounds)
+        # The index page documents global typedefs, variables and macros, which files declare
+        if self.scope_index:
+            kinds = dict((c[0], c[1]) for c in compounds)
+            needed |= set(owner for owner in owners.values() if kinds[owner] == "file")
+        while len(needed) > 0:
+            doxygen_ids = sorted(doxygen_id for doxygen_id in needed
+                if os.path.isfile(os.path.join(self.xml_dir, doxygen_id + ".xml")))
+            file_names = [ os.path.join(self.xml_dir, doxygen_id + ".xml") 
+                           for doxygen_id in doxygen_ids ]
+            needed = set()
+            for doxygen_id, decls in zip(doxygen_ids, self.read_files(file_names)):
+                file_decls[doxygen_id] = decls
+                for decl in decls.values():
+                    # Base classes are needed for the members they pass on
+                    for base in decl.inherits_from:
+                        if base.get("refid") in compound_ids: needed.add(base.get("refid"))
+                    if decl.kind == "dir" and any(decl.name == scope 
+                            or decl.name.startswith(scope + "/") for scope in self.scopes):
+                        needed |= decl.members & compound_ids
+                    if decl.doxygen_id in owners: needed.add(owners[decl.doxygen_id])
+            needed -= file_decls.keys()
+
+        for doxygen_id, kind, name, members in compounds:
+            if doxygen_id in file_decls: self.merge_file(file_decls[doxygen_id])
+        add_index_stubs(compounds, self.declarations)
+
+
+    # Returns the Doxygen IDs of the compounds to read for "scopes": Those named like a scope,
+    # nested in it, specializing it or declaring it as a member, the scopes enclosing them and
+    # the classes nested in enclosing classes, which all appear on the pages of the scopes. All
+    # groups, pages and directories are needed as well, for their titles and the file hierarchy.
+    #   compounds: The result of read_xml_index()
+    def scope_compounds(self, compounds):
+        needed = set()
+        enclosing = set()
+        for doxygen_id, kind, name, members in compounds:
+            if kind == "group" or kind == "page" or kind == "dir": needed.add(doxygen_id)
+            # Members with a page of their own, like functions, are documented by their compound.
+            # Those of files and groups are global unless a namespace or class declares them.
+            prefix = "" if kind == "file" or kind == "group" else name + "::"
+            outer = name
+            while outer != None and outer not in self.scopes \
+                    and ("<" not in outer or outer[0:outer.find("<")] not in self.scopes):
+                outer = enclosing_scope(outer)
+            if outer != None or any(prefix + member[2] in self.scopes for member in members):
+                needed.add(doxygen_id)
+                outer = enclosing_scope(name)
+                while outer != None:
+                    enclosing.add(outer)
+                    outer = enclosing_scope(outer)
+
+        enclosing_classes = set()
+        for doxygen_id, kind, name, members in compounds:
+            if name in enclosing:
+                needed.add(doxygen_id)
+                if kind != "namespace": enclosing_classes.add(name)
+        for doxygen_id, kind, name, members in compounds:
+            if enclosing_scope(name) in enclosing_classes: needed.add(doxygen_id)
+        return needed
+
+
+    # Merges the Declarations read from a file into "declarations", see merge_declarations().
+    # With the "store" option, the XML fragments of new Declarations are moved into the store.
+    def merge_file(self, decls):
+        merge_declarations(self.declarations, decls)
+        if self.store != None:
+            self.store.add([ decl for doxygen_id, decl in decls.items() 
+                             if self.declarations[doxygen_id] is decl ])
+
+
+    # Returns the (size, mtime) of every .xml file in "xml_dir"
+    def scan_files(self):
+        stats = dict()
+        for file_name in self.xml_files():
+            try:
+                stat = os.stat(file_name)
+            # The file has been removed in the meantime
+            except OSError:
+                continue
+            stats[file_name] = (stat.st_size, stat.st_mtime_ns)
+        return stats
+
+
+    # Reads the .xml files in "xml_dir" that have been added, changed or removed since the last
+    # call and rebuilds "declarations" from copies of the Declarations read from every file.
+    # Unchanged files are not read again. Replaces load(), resolve() and plan() must be called
+    # again afterwards.
+    #   stats: The result of scan_files(), if already known
+    # Returns whether any file changed
+    def update(self, stats=None):
+        if stats == None: stats = self.scan_files()
+        changed = []
+        for file_name, stat in stats.items():
+            old = self.file_stats.get(file_name)
+            if old != None and old[:2] == stat: continue
+            try:
+                content_hash = file_hash(file_name)
+            except OSError:
+                continue
+            # Files are often rewritten with the same content when Doxygen runs again
+            if old == None or old[2] != content_hash:
+                changed.append(file_name)
+            self.file_stats[file_name] = stat + (content_hash,)
+        removed = [ file_name for file_name in self.file_stats if file_name not in stats ]
+        if len(changed) == 0 and len(removed) == 0 and self.root != None:
+            return False
+
+        for file_name in removed:
+            del self.file_stats[file_name]
+            self.file_decls.pop(file_name, None)
+        for file_name, decls in zip(changed, self.read_files(changed)):
+            self.file_decls[file_name] = decls
+        if self.cache != None:
+            self.cache.prune()
+
+        # Resolving modifies Declarations, so the ones read from files are kept as they are
+        self.declarations = dict()
+        self.sources = dict()
+        for file_name in stats:
+            if file_name not in self.file_decls: continue
+            for doxygen_id, decl in self.file_decls[file_name].items():
+                if doxygen_id in self.declarations:
+                    self.declarations[doxygen_id].merge_members(decl)
+                else:
+                    self.declarations[doxygen_id] = decl.unresolved_copy()
+                    self.sources[doxygen_id] = decl
+        self.fingerprints = dict()
+        self.source_fingerprints = { doxygen_id: cached 
+            for doxygen_id, cached in self.source_fingerprints.items() 
+            if self.sources.get(doxygen_id) is cached[0] }
+        return True
+
+
+    # Builds the declaration hierarchy, generates all names and the global navigation.
+    # Must be called after load() or update().
+    def resolve(self):
+        with self.phase("hierarchy"):
+            self.namespaces = dict()
+            self.global_nav = []
+
+            # Try to build a hierarchy starting at every declaration not visited yet
+            traversed = set()
+            for doxygen_id, decl in self.declarations.items():
+                # Add parents where a hierarchy exists in the XML
+                self.build_hierarchy(decl, traversed)
+                # Namespaces don't contain each other, remember their full names to resolve them later
+                if decl.kind == "namespace":
+                    self.namespaces[decl.name] = doxygen_id
+
+            self.root = Declaration("root")
+            self.root.kind = "root"
+            self.root.name = ""
+
+            # Assign all orphaned nodes to "root" so they will appear on the index page.
+            # This applies for all global namespace members and preprocessor #defines.
+            for doxygen_id, decl in self.declarations.items(): 
+                if decl.parent == None:
+                    new_parent = self.root
+                    # Resolve nested namespaces by their scoped name
+                    if decl.kind == "namespace" and "::" in decl.name:
+                        try:
+                            container = self.namespaces[decl.name[0:decl.name.rfind("::")]]
+                            if container and container in self.declarations:
+                                new_parent = self.declarations[container]
+                        except KeyError:
+                            pass
+                    decl.parent = new_parent
+                    new_parent.add_member(doxygen_id, False)
+
+            self.children = dict()
+            for decl in self.declarations.values():
+                self.children.setdefault(decl.parent, []).append(decl)
+            self.build_inheritance()
+
+        # Generate name and full_name fields, then URLs
+        with self.phase("names"):
+            self.generate_urls(self.generate_names())
+
+        with self.phase("global_navigation"):
+            self.root.page_title = localize("index")
+            self.root.target_url = "index.html"
+
+            global_nav_dict = dict()
+            for glob in sorted(self.root.all_members):
+                if glob in self.declarations: 
+                    mb = self.declarations[glob]
+                    if not mb.kind in global_nav_dict: global_nav_dict[mb.kind] = []
+                    global_nav_dict[mb.kind].append(mb)
+
+            def add_nav_section(name, kinds):
+                ul = None
+                for kind in kinds:
+                    if kind in global_nav_dict:
+                        if ul == None:
+                            h3 = etree.Element("h3")
+                            h3.text = localize(name).title()
+                            self.global_nav.append(h3)
+                            ul = etree.Element("ul")
+                            self.global_nav.append(ul)
+                        for e in sorted(global_nav_dict[kind], key=lambda x: x.name):
+                            etree.SubElement(etree.SubElement(ul, "li"), "a", href = e.target_url).text = \
+                                e.page_title if e.page_title != None else e.name
+    
+            add_nav_section("groups", [ "group" ])
+            add_nav_section("special pages", [ "page" ])
+            add_nav_section("headers", [ "dir", "file" ])
+
+        if self.link_map != None: self.apply_link_map()
+
+    # Determines the page documenting "decls" without rendering it and appends it to "pages"
+    #   decls: The Declarations to be documented on the page
+    #   nav: The navigation sidebar, see Page.nav
+    #   nav_digest: A hash of "nav"
+    #   parent_links: The breadcrumb links, see Page.parent_links
+    #   pages: The list to append Pages to
+    # Returns the arguments to plan the child pages with, in order
+    def plan_page(self, decls, nav, nav_digest, parent_links, pages):
+        decls.sort(key=decl_order)
+      
+        # For specialized class templates, do not inline specializations; 
+        # rather add child_links to the specialization pages
+        if len(decls) > 1 and (decls[0].kind == "class" or decls[0].kind == "struct"):
+            specializations = copy.copy(decls)
+            min_decl = None
+            for decl in specializations:
+                if min_decl == None or len(decl.name) < len(min_decl.name):
+                    min_decl = decl
+            specializations.remove(min_decl)
+            decls = [ min_decl ]
+        else: specializations = []
+        full_name = decls[0].full_name
+
+        page = Page()
+        page.decls = decls
+        page.specializations = specializations
+        page.page_title = decls[0].page_title.title() if decls[0].page_title != None else decls[0].name
+        page.file_name = decls[0].target_url
+        page.parent_links = parent_links
+        page.nav = nav
+        page.nav_digest = nav_digest
+        pages.append(page)
+
+        links = [ list(link) for link in parent_links ]
+        if len(links) > 0 and decls[0].kind != "file" and decls[0].kind != "dir":        
+            links[len(links)-1][2] = "::"
+        child_links = [ list(link) for link in links ]
+        if full_name != "":
+            child_links.append([ decls[0].name, decls[0].target_url, None ])
+
+        child_nav_sections = []
         children = []
+        for decl in decls:
+            members = self.member_groups(decl)
+           
+            enabled_vis = [ "public" ]
+            if self.config["show_protected"]: enabled_vis.append("protected")
+            if self.config["show_private"]: enabled_vis.append("private")
+           
+            sections = []
+            for vis in enabled_vis:
+                for stat in [ "", " static" ]:
+                    member_kinds = [ "namespaces", "types", "functions", "variables", "defines" ]
+                    if decl.kind == "dir": member_kinds += [ "dirs", "files" ] 
+                    for dcat in member_kinds:
+                        key = vis + stat + " " + dcat
+                        if key not in members: continue
+                        if (dcat == "types" or dcat == "variables" or dcat == "functions") \
+                                and (decls[0].kind == "struct" or decls[0].kind == "class"):
+                            cat_title = localize(vis) + " "
+                            if stat != "": cat_title += localize("static") + " "
+                        else:
+                            cat_title = ""
+                        heading = (cat_title + localize(dcat)).title()
+                    
+                        groups = []
+                        nav_items = []
+                        for group_name, e in sorted(members[key].items()):
+                            # Doxygen lists all inherited constructors and destructors as members.
+                            if group_name == "(destructor)":
+                                dtors = []
+                                for f in e:
+                                    if f.name == "~" + decl.name: dtors.append(f)
+                                if len(dtors) > 0: 
+                                    children.append(dtors)
+                                    href = dtors[0].target_url
+                                else: continue
+                            elif not e[0].inline_doc:
+                                children.append(e)
+                                href = min(e, key=lambda x: x.name).target_url
+                            else: 
+                                href = sorted(e, key=lambda x: x.name)[-1].target_url
+                            if e[0].page_title != None: link_text = e[0].page_title
+                            elif group_name == "(constructor)": link_text = decl.name
+                            elif group_name == "(destructor)": link_text = "~" + decl.name
+                            else: link_text = group_name
+                            groups.append((group_name, e, href, link_text))
+                            nav_items.append((link_text, href))
+                        sections.append((heading, groups))
+                        child_nav_sections.append((heading, nav_items))
+            page.sections.append(sections)
+                        
+            for key in [ "public groups", "public pages", "public files", "public dirs" ]:     
+                if key in members:
+                    for group in members[key].values(): 
+                        for coll in group:
+                            children.append([coll])
+
+        for s in specializations:
+            children.append([s])
+
+        child_nav = ((page.page_title, decls[0].target_url), child_nav_sections)
+        child_nav_digest = hashlib.md5(bytearray(repr(child_nav), 'utf-8')).hexdigest()
+    
+        # Only members actually declared in one of "decls" get a child page here, inherited ones
+        # are documented on the pages of their base classes
+        parents = set(decls)
+        specialized = set(specializations)
+        child_pages = []
+        for all_decls in children:
+            child_decls = [ d for d in all_decls if d.parent in parents or d in specialized ]
+            if len(child_decls) > 0:
+                child_pages.append((child_decls, child_nav, child_nav_digest, child_links))
+        return child_pages
+
+    # Groups the members of a scope by category, e.g. "public static functions", and by name, so
+    # that overloads end up in the same group. This is computed once per scope and plan().
+    #   decl: The scope Declaration
+    # Returns a dict mapping categories to dicts mapping group names to lists of Declarations
+    def member_groups(self, decl):
+        if decl in self.groups: return self.groups[decl]
+        base_classes = self.base_names(decl)  
             
+        # Iterate in a fixed order, the order of a set depends on how it was built
         members = dict()
-        for doxygen_id in decl.all_members:
-            if doxygen_id not in declarations: continue
-            e = declarations[doxygen_id]
-            
+        for doxygen_id in sorted(decl.all_members):
+            if doxygen_id not in self.declarations: continue
+            e = self.declarations[doxygen_id]
+        
             if e.visibility == "private" or e.visibility == "protected": key = e.visibility
             else: key = "public"
             if e.is_static and (e.kind == "function" or e.kind == "variable"): 
@@ -872,160 +3008,854 @@ def tree(decls, nav=None, parent="", parent_links=etree.Element("span")):
             if key not in members:
                 members[key] = dict()                                
             cat = members[key]       
-            
+        
             if e.name in base_classes: group_name = "(constructor)"
             elif e.name[:1] == '~': group_name = "(destructor)"
             elif "<" in e.name: group_name = e.name[0 : e.name.find("<")].strip()
             else: group_name = e.name
-            
+        
             if group_name not in cat:
                 cat[group_name] = []
             cat[group_name].append(e)
-           
-        enabled_vis = [ "public" ]
-        if config["show_protected"]: enabled_vis.append("protected")
-        if config["show_private"]: enabled_vis.append("private")
-           
-        for vis in enabled_vis:
-            for stat in [ "", " static" ]:
-                member_kinds = [ "namespaces", "types", "functions", "variables", "defines" ]
-                if decl.kind == "dir": member_kinds += [ "dirs", "files" ] 
-                for dcat in member_kinds:
-                    key = vis + stat + " " + dcat
-                    if key not in members: continue
-                    div = etree.Element("div")
-                    if (dcat == "types" or dcat == "variables" or dcat == "functions") \
-                            and (decls[0].kind == "struct" or decls[0].kind == "class"):
-                        cat_title = localize(vis) + " "
-                        if stat != "": cat_title += localize("static") + " "
-                    else:
-                        cat_title = ""
-                    h3 = etree.SubElement(div, "h3")
-                    h3.text = (cat_title + localize(dcat)).title()
-                    
-                    nav_div = copy.deepcopy(div)
-                    nav_ul = etree.SubElement(nav_div, "ul")
-                    table = etree.Element("table")
-                    table.set("class", "decllist")
-                    for group_name, e in sorted(members[key].items()):
-                        # Doxygen lists all inherited constructors and destructors as members.
-                        if group_name == "(destructor)":
-                            dtors = []
-                            for f in e:
-                                if f.name == "~" + decl.name: dtors.append(f)
-                            if len(dtors) > 0: 
-                                children.append((dtors, full_name, child_links))
-                                href = dtors[0].target_url
-                            else: continue
-                        elif not e[0].inline_doc:
-                            children.append((e, full_name, child_links))
-                            href = min(e, key=lambda x: x.name).target_url
-                        else: 
-                            for f in sorted(e, key=lambda x: x.name):
-                                anchor = f.target_url_anchor
-                                href = f.target_url
-                                li = etree.SubElement(inline_ul, "li")
-                                li.set("class", "details def")
-                                decl_div = etree.SubElement(li, "div")
-                                etree.SubElement(decl_div, "a", name=anchor)
-                                if f.kind == "typedef":
-                                    typedef_decl(f, etree.SubElement(decl_div, "p"))
-                                elif f.kind == "define":
-                                    define_decl(f, etree.SubElement(decl_div, "p"))
-                                else:
-                                    func_var_decl(f, etree.SubElement(decl_div, "p"))                                
-                                if f.brief_description != None:
-                                    brief = etree.SubElement(li, "div")
-                                    brief.set("class", "brief")
-                                    to_html(f.brief_description, brief)
-                                if f.detailed_description != None:
-                                    details = etree.SubElement(li, "div")
-                                    details.set("class", "details")
-                                    to_html(f.detailed_description, details)
-                        tr = etree.SubElement(table, "tr")
-                        if e[0].kind not in [ "group", "file", "page", "dir" ]:
-                            td = etree.SubElement(tr, "td", )
-                            td.set("class", "decltype")
-                            if e[0].kind == "variable": 
-                                to_html_abbrev(e[0].data_type, td)
-                            elif e[0].kind == "function": 
-                                if group_name == "(constructor)": td.text = "constructor"
-                                elif group_name == "(destructor)": td.text = "destructor"
-                                else: td.text = "function"
-                            elif e[0].kind == "define":
-                                td.text = "#define"
-                            else: td.text = e[0].kind
-                        td = etree.SubElement(tr, "td")              
-                        td.set("class", "declname")        
-                        a = etree.SubElement(td, "a", href = href)
-                        a.set("class", "name")
-                        if e[0].page_title != None: a.text = e[0].page_title
-                        elif group_name == "(constructor)": a.text = decl.name
-                        elif group_name == "(destructor)": a.text = "~" + decl.name
-                        else: a.text = group_name
-                        span = etree.SubElement(td, "span")           
-                        span.set("class", "init")
-                        if e[0].kind == "typedef": 
-                            to_html_abbrev(e[0].data_type, span)
-                            span.text = " = " + (span.text if span.text else "")
-                        add_nav_item(nav_ul, a.text, href)
-                        
-                    div.append(table)
-                    overview.append(div)
-                    child_nav.append(nav_div)
-                    if  len(details_div) > 0:
-                        inline.append(details_div)
-                        
-        for key in [ "public groups", "public pages", "public files", "public dirs" ]:     
-            if key in members:
-                for group in members[key].values(): 
-                    for coll in group:
-                        children.append(([coll], full_name, child_links))
-                    
-        n += 1
-            
-    if len(inline_ul) > 0: 
-        inline.append(inline_ul)
-        
-    if len(decls) > 1 or len(inline) > 0:
-        etree.SubElement(page, "h3").text = "Details"
-    
-    if len(specializations) > 0:
-        div = etree.SubElement(inline, "div")
-        h3 = etree.SubElement(div, "h3")
-        h3.text = "Template Specializations"
-        nav_div = copy.deepcopy(div)
-        nav_ul = etree.SubElement(nav_div, "ul")
-        table = etree.SubElement(div, "table")
-        table.set("class", "decllist")
-        for s in specializations:
-            href = s.target_url
-            children.append(([s], parent, parent_links))
-            tr = etree.SubElement(table, "tr")
-            td = etree.SubElement(tr, "td")
-            td.set("class", "decltype")
-            td.text = s.kind
-            td = etree.SubElement(tr, "td")
-            td.set("class", "declname")
-            add_nav_item(nav_ul, s.name, s.target_url)
-            a = etree.SubElement(td, "a", href=s.target_url)
-            a.set("class", "name")
-            a.text = s.name
-            
-    for e in global_nav: child_nav.append(copy.deepcopy(e))
+        self.groups[decl] = members
+        return members
+
+
+    # Returns the names of a class and all its (indirect) base classes, see "ancestors"
+    def base_names(self, derived):
+        names = set([derived.name])
+        for base in self.ancestors.get(derived, ()):
+            names.add(base.name)
+        return names
+
+
+    # Computes the "ancestors" index from the <basecompoundref>s of all declarations. Bases that
+    # are not documented are ignored. Malformed XML can contain inheritance cycles, these are
+    # only followed once.
+    def build_inheritance(self):
+        self.ancestors = dict()
+        for decl in self.declarations.values():
+            if len(decl.inherits_from) == 0 or decl in self.ancestors: continue
+            ancestors = set()
+            stack = [ decl ]
+            while len(stack) > 0:
+                for base in stack.pop().inherits_from:
+                    base_decl = self.declarations.get(base.get("refid"))
+                    if base_decl == None or base_decl in ancestors: continue
+                    ancestors.add(base_decl)
+                    # Bases indexed before need not be traversed again
+                    if base_decl in self.ancestors: ancestors |= self.ancestors[base_decl]
+                    else: stack.append(base_decl)
+            self.ancestors[decl] = frozenset(ancestors)
     
-    if len(decls) > 1 or len(inline) > 0:
-        page.append(inline)
-    write_html(page_title, nav, page, output_dir + "/" + decls[0].target_url)
     
-    for all_decls, parent, parent_links in children:
-        child_decls = []
-        for d in all_decls: 
-            for e in decls: 
-                if d.parent == e or d in specializations:
-                    child_decls.append(d)
-        if len(child_decls) > 0:
-            tree(child_decls, copy.deepcopy(child_nav), parent, child_links)
-    
-tree([root])
-
+    # Traverses the "declarations" dictionary starting at parent_decl and updates the "parent" 
+    # field of each declaration reached to point to the containing node. This is a depth-first
+    # traversal using an explicit stack, so arbitrarily deep hierarchies are supported.
+    #   parent_decl: The Declaration to start at
+    #   traversed: The Declarations whose members have already been visited, these are skipped
+    def build_hierarchy(self, parent_decl, traversed):
+        if parent_decl in traversed: return
+        traversed.add(parent_decl)
+        # Declarations whose members are being visited, and an iterator over the remaining ones.
+        # Members are visited in a fixed order, since a Declaration listed as a member of several
+        # others becomes a member of the one visited first.
+        def members_of(decl):
+            return iter(sorted(decl.members) if not decl.is_collection else ())
+        stack = [ (parent_decl, members_of(parent_decl)) ]
+        while len(stack) > 0:
+            parent_decl, members = stack[-1]
+            for doxygen_id in members:
+                member = self.declarations.get(doxygen_id)
+                # One node will usually be visited multiple times, only update "parent" once
+                if member != None and member.parent == None:
+                    member.parent = parent_decl
+                    traversed.add(member)
+                    stack.append((member, members_of(member)))
+                    break
+            else:
+                stack.pop()
+                # Member functions are usually available by including their classes header.
+                # This is only done once all members of "parent_decl" have been visited.
+                if len(stack) > 0 and parent_decl.include_files == []:
+                    parent_decl.include_files = stack[-1][0].include_files
+
+    # Postprocesses all "name" and "full_name" fields of every declaration.
+    # In the XML, some names include scope while others don't (I guess nobody checked the XML output
+    # for consistency). This function ensures "name" is scope-less while adding full scope prefixes
+    # to full_name based on the members/parent hierarchy built above.
+    # Declarations are visited top-down from "root" using "children" and an explicit stack, so
+    # every parent is named before its members, regardless of how deep they are nested.
+    # Returns the Declarations in the order they were visited
+    def generate_names(self):
+        named = []
+        stack = [ self.root ]
+        while len(stack) > 0:
+            decl = stack.pop()
+            self.generate_name(decl)
+            named.append(decl)
+            stack.extend(reversed(self.children.get(decl, [])))
+        return named
+
+
+    # Sets the "name" and "full_name" fields of a single Declaration, see generate_names()
+    def generate_name(self, decl):
+        # Rename anonymous enums
+        if len(decl.name) > 0 and decl.name[0] == '@':
+            decl.name = "(anonymous)"
+
+        if "::" in decl.name:
+            # Find the last, not template-parameter-enclosed occurrence of "::"
+            start = 0; level = 0; i=0
+            for c in decl.name:
+                if c == '<': level += 1
+                elif c == '>': level -= 1
+                elif c == ':' and level == 0: start = i+1
+                i += 1
+            decl.name = decl.name[start:]
+
+        # Directory names should end in "/"
+        if decl.kind == "dir": decl.name += "/"
+
+        # Add scope prefixes for identifiers
+        if decl.parent != None and decl.kind != "file" and decl.parent.full_name != "": 
+            decl.full_name = decl.parent.full_name + "::" + decl.name
+        # And simply concatenate directory names as they already end in "/"
+        elif decl.parent != None: 
+            decl.full_name = decl.parent.full_name + decl.name
+
+
+    # Sets the "target_url" and "target_url_anchor" fields after generate_names(). URLs are only
+    # created once all names are known, so that collisions can be resolved, see unique_urls().
+    #   named: The Declarations in the order generate_names() visited them, i.e. parents first
+    def generate_urls(self, named):
+        urls = unique_urls(set((decl.kind, decl.full_name) for decl in named 
+                               if decl.full_name != ""))
+        for decl in named:
+            url = urls[(decl.kind, decl.full_name)] if decl.full_name != "" else "index"
+            # Non-inline (i.e. integrated in their parent's page) declarations have an own url,
+            # inline docs are identified by an <a>nchor inside their parent
+            if not decl.inline_doc:
+                decl.target_url = url + ".html"
+            elif decl.parent.target_url != None: 
+                decl.target_url_anchor = url
+                decl.target_url = decl.parent.target_url + "#" + decl.target_url_anchor
+
+    # Returns a hash of everything a Declaration contributes to the pages it is rendered on
+    def decl_fingerprint(self, decl):
+        if decl.doxygen_id not in self.fingerprints:
+            # Declarations copied by update() only change if their file is read again or if
+            # resolve() sets different names or include files, so their hash can be reused
+            source = self.sources.get(decl.doxygen_id)
+            resolved = (decl.name, decl.full_name, decl.target_url, decl.target_url_anchor)
+            cached = self.source_fingerprints.get(decl.doxygen_id)
+            if source != None and cached != None and cached[0] is source \
+                    and cached[1] is decl.include_files and cached[2] == resolved:
+                self.fingerprints[decl.doxygen_id] = cached[3]
+                return cached[3]
+
+            data = []
+            for key in sorted(Declaration.__slots__):
+                # The hierarchy is already part of the page plan
+                if key == "parent" or key == "members" or key == "all_members": continue
+                value = getattr(decl, key)
+                data.append(bytearray(key, 'utf-8'))
+                for v in (value if isinstance(value, list) else [ value ]):
+                    if etree.iselement(v): data.append(etree.tostring(v, with_tail=False))
+                    else: data.append(bytearray(repr(v), 'utf-8'))
+            self.fingerprints[decl.doxygen_id] = hashlib.md5(b"\0".join(data)).hexdigest()
+            if source != None:
+                self.source_fingerprints[decl.doxygen_id] = (source, decl.include_files, resolved,
+                                                             self.fingerprints[decl.doxygen_id])
+        return self.fingerprints[decl.doxygen_id]
+
+
+    # Returns the (plan, content) hashes of a page. The plan hash covers the page structure and
+    # navigation, the content hash all Declarations whose documentation appears on the page.
+    def page_digests(self, page):
+        content_decls = page.decls + page.specializations
+        structure = [ page.file_name, page.page_title, page.parent_links, page.nav_digest, 
+                      [ d.doxygen_id for d in page.decls ], 
+                      [ d.doxygen_id for d in page.specializations ] ]
+        for sections in page.sections:
+            for heading, groups in sections:
+                structure.append(heading)
+                for group_name, e, href, link_text in groups:
+                    structure.append((group_name, [ d.doxygen_id for d in e ], href, link_text))
+                    content_decls += e if group_name != "(destructor)" and e[0].inline_doc else e[:1]
+        content = [ self.decl_fingerprint(d) for d in content_decls ]
+        return (hashlib.md5(bytearray(repr(structure), 'utf-8')).hexdigest(), 
+                hashlib.md5(bytearray(repr(content), 'utf-8')).hexdigest())
+
+    # Determines all pages to be written into "pages". Must be called after resolve().
+    # A file name can be planned more than once, the last page planned for it wins.
+    def plan(self):
+        self.renderer.reset()
+        with self.phase("planning"):
+            self.plan_pages()
+        if self.profile != None: self.profile.counters["pages"] = len(self.pages)
+
+
+    # Implements plan(). With the "scope" or "shard" options, only the pages of Declarations
+    # named like one of "scopes" and the pages below them are kept.
+    def plan_pages(self):
+        if self.scopes != None:
+            scope_names = self.scopes | set(scope + "/" for scope in self.scopes)
+
+        # Pages are planned depth-first, using an explicit stack to support any nesting depth
+        self.groups = dict()
+        pages = []
+        scope_pages = set()
+        stack = [ ([ self.root ], (None, []), "", [], self.scopes == None) ]
+        while len(stack) > 0:
+            decls, nav, nav_digest, parent_links, in_scope = stack.pop()
+            if not in_scope: in_scope = any(decl.full_name in scope_names for decl in decls)
+            child_pages = self.plan_page(decls, nav, nav_digest, parent_links, pages)
+            if in_scope or (decls[0] is self.root and self.scope_index): 
+                scope_pages.add(pages[-1])
+            stack.extend(reversed([ child + (in_scope,) for child in child_pages ]))
+        page_index = dict()
+        for page in pages: page_index[page.file_name] = page
+        self.pages = [ page for page in pages 
+                       if page_index[page.file_name] == page and page in scope_pages ]
+        if len(self.pages) == 0 and self.config["scope"] != None:
+            print("Nothing to document in scope '{}'".format(self.config["scope"]), 
+                  file=sys.stderr)
+
+
+    # Returns the top-level scopes, i.e. the full names of the Declarations documented on the
+    # pages linked from the index page, in the order shards are assigned them. Must be called
+    # after resolve().
+    def top_level_scopes(self):
+        self.groups = dict()
+        child_pages = self.plan_page([ self.root ], (None, []), "", [], [])
+        return [ min(decl.full_name for decl in decls) for decls, nav, nav_digest, parent_links 
+                 in child_pages ]
+
+
+    # Writes the link map of all Declarations to a JSON file, from which shard builds take the
+    # URLs and names of all link targets, the global navigation and the top-level scopes, see
+    # the "link_map" and "shard" options. Must be called after resolve().
+    #   file_name: The file to write
+    def export_links(self, file_name):
+        links = dict((doxygen_id, [ decl.target_url, decl.full_name, decl.kind ]) 
+                     for doxygen_id, decl in self.declarations.items())
+        link_map = { "version": version, "links": links, "scopes": self.top_level_scopes(),
+                     "global_nav": [ etree.tostring(e, encoding="unicode") 
+                                     for e in self.global_nav ] }
+        with open(file_name, 'w') as file:
+            json.dump(link_map, file, separators=(",", ":"), sort_keys=True)
+
+
+    # Replaces the URLs and names of all Declarations in the link map and the global navigation
+    # by those of the build that exported it, so that pages link to the same files no matter
+    # which of them have been read
+    def apply_link_map(self):
+        for doxygen_id, (target_url, full_name, kind) in self.link_map["links"].items():
+            decl = self.declarations.get(doxygen_id)
+            if decl == None: continue
+            decl.target_url = target_url
+            decl.full_name = full_name
+            if decl.inline_doc: decl.target_url_anchor = target_url[target_url.find("#")+1:]
+        self.link_stubs = dict()
+        self.global_nav = [ etree.fromstring(e) for e in self.link_map["global_nav"] ]
+
+
+    # Returns the Declaration a link to a Doxygen ID points to, or None. Targets missing from
+    # "declarations" are created from "links", knowing only their URL, name and kind.
+    def link_declaration(self, doxygen_id):
+        decl = self.declarations.get(doxygen_id)
+        if decl != None or doxygen_id not in self.links: return decl
+        if doxygen_id not in self.link_stubs:
+            decl = Declaration(doxygen_id)
+            decl.target_url, decl.full_name, decl.kind = self.links[doxygen_id]
+            decl.name = decl.full_name
+            self.link_stubs[doxygen_id] = decl
+        return self.link_stubs[doxygen_id]
+
+
+    # Returns what a link to a Doxygen ID resolves to, as recorded in Renderer.page_links
+    def link_info(self, doxygen_id):
+        target = self.link_declaration(doxygen_id)
+        return [ target.target_url, target.full_name ] if target != None else None
+
+
+    # Renders a single page
+    #   page: A Page from "pages"
+    # Returns the HTML file contents
+    def render(self, page):
+        # Fragments reused across pages would keep the XML parsed from the store in memory
+        if self.store != None: self.renderer.fragments.clear()
+        return self.renderer.render_page(page)
+
+
+    # Renders a page like render(), and records it in "profile" with the "profile" option
+    def render_profiled(self, page):
+        start = time.perf_counter()
+        html = self.render(page)
+        if self.profile != None: 
+            self.profile.add_page(page.file_name, len(html), time.perf_counter() - start)
+        return html
+
+
+    # Renders a page and writes it to output_dir, unless the file is up to date already
+    #   page: A Page from "pages"
+    #   output_dir: The directory to write to
+    # Returns the links looked up while rendering, see Renderer.page_links, and whether the file
+    # changed
+    def write_page(self, page, output_dir):
+        html = self.render_profiled(page)
+        with self.timer("writing"):
+            changed = self.write_output(output_dir + "/" + page.file_name, html)
+        if changed and self.profile != None: 
+            self.profile.count("pages_written")
+            self.profile.count("page_bytes_written", len(html))
+        return dict(self.renderer.page_links), changed
+
+
+    # Renders and writes the pages with the given indices in "pages", using worker processes if
+    # configured. Pages are independent of each other once planned, so they can be rendered in
+    # any order. With the "cprofile" option, all pages are rendered by this process.
+    # Returns a dictionary mapping each index to the links looked up while rendering the page, and
+    # the number of files that changed
+    def write_pages(self, indices, output_dir):
+        page_links_by_index = dict()
+        changed_count = 0
+        jobs = self.config["jobs"] if self.config["cprofile"] == None else 1
+        if jobs > 1 and len(indices) > 1:
+            with self.page_workers() as pool:
+                chunk_size = max(1, min(16, len(indices) // (4 * jobs)))
+                tasks = [ (index, output_dir) for index in indices ]
+                for index, links, changed, profile in pool.imap_unordered(write_page_isolated, 
+                                                                          tasks, chunk_size):
+                    page_links_by_index[index] = links
+                    changed_count += changed
+                    if profile != None: self.profile.merge(profile)
+        else:
+            if self.config["cprofile"] != None: self.profile.profiler.enable()
+            for index in indices:
+                links, changed = self.write_page(self.pages[index], output_dir)
+                page_links_by_index[index] = links
+                changed_count += changed
+            if self.config["cprofile"] != None: self.profile.profiler.disable()
+        if self.profile != None: self.profile.count("pages_changed", changed_count)
+        return page_links_by_index, changed_count
+
+
+    # Renders the pages with the given indices in "pages" without writing them, using worker
+    # processes if configured like write_pages()
+    # Yields the index and HTML of each page, in the order given
+    def render_pages(self, indices):
+        jobs = self.config["jobs"] if self.config["cprofile"] == None else 1
+        if jobs > 1 and len(indices) > 1:
+            with self.page_workers() as pool:
+                chunk_size = max(1, min(16, len(indices) // (4 * jobs)))
+                for index, html, profile in pool.imap(render_page_isolated, indices, chunk_size):
+                    if profile != None: self.profile.merge(profile)
+                    yield index, html
+        else:
+            for index in indices:
+                if self.config["cprofile"] != None: self.profile.profiler.enable()
+                html = self.render_profiled(self.pages[index])
+                if self.config["cprofile"] != None: self.profile.profiler.disable()
+                yield index, html
+
+
+    # Context manager returning the process pool for rendering pages: "page_pool" while
+    # compressing(), or a new pool otherwise
+    @contextlib.contextmanager
+    def page_workers(self):
+        if self.page_pool != None:
+            yield self.page_pool
+        else:
+            with worker_pool(self) as pool:
+                yield pool
+
+
+    # Context manager running a thread pool for compressing output files with the "gzip" or
+    # "brotli" options. As zlib and brotli release the GIL, pages are compressed in parallel
+    # while the next ones are rendered. Forking a process with running threads is unsafe, so
+    # with the "jobs" option, the worker processes rendering pages are started first.
+    @contextlib.contextmanager
+    def compressing(self):
+        if not self.config["gzip"] and not self.config["brotli"]:
+            yield
+            return
+        jobs = self.config["jobs"] if self.config["cprofile"] == None else 1
+        with contextlib.ExitStack() as stack:
+            if jobs > 1: self.page_pool = stack.enter_context(worker_pool(self))
+            self.compressor = stack.enter_context(
+                concurrent.futures.ThreadPoolExecutor(os.cpu_count() or 1))
+            try:
+                yield
+            finally:
+                self.page_pool = None
+                self.compressor = None
+        tasks = self.compression_tasks
+        self.compression_tasks = []
+        # Report errors
+        for task in tasks: task.result()
+
+
+    # Writes an output file unless it is up to date already, see write_if_changed(). With the 
+    # "gzip" or "brotli" options, compressed variants of text files, see compressible_extensions,
+    # are written as well if the file changed or they are missing. Otherwise, compressed variants
+    # of a changed file are removed, as are those left over from other files.
+    #   file_name: The file to write
+    #   contents: The file contents as bytes
+    # Returns whether the file changed
+    def write_output(self, file_name, contents):
+        changed = write_if_changed(file_name, contents)
+        for extension, key, compress in compressions:
+            if self.config[key] and file_name.endswith(compressible_extensions):
+                if changed or not os.path.isfile(file_name + extension):
+                    if self.compressor != None:
+                        self.compression_tasks.append(self.compressor.submit(write_compressed, 
+                            file_name + extension, compress, contents))
+                    else:
+                        write_compressed(file_name + extension, compress, contents)
+            elif (changed or self.config[key]) and os.path.isfile(file_name + extension):
+                os.remove(file_name + extension)
+        return changed
+
+
+    # Returns whether an output file and all compressed variants written by write_output() exist
+    def output_exists(self, file_name):
+        return os.path.isfile(file_name) and all(os.path.isfile(file_name + extension)
+            for extension, key, compress in compressions 
+            if self.config[key] and file_name.endswith(compressible_extensions))
+
+
+    # Removes an output file and its compressed variants, if they exist
+    def remove_output(self, file_name):
+        for extension in [ "" ] + [ extension for extension, key, compress in compressions ]:
+            if os.path.isfile(file_name + extension): os.remove(file_name + extension)
+
+
+    # Generates the scripts building the navigation of all pages with the "shared_nav" option:
+    # nav.js, and a file for every distinct navigation, see nav_file_name()
+    # Yields the name and contents of each file
+    def nav_files(self):
+        global_nav_html = "".join(etree.tostring(e, method="html", encoding="unicode") 
+                                  for e in self.global_nav)
+        yield "nav.js", bytearray(nav_script + "var doxycppGlobalNav = " 
+                                  + json.dumps(global_nav_html) + ";\n", 'utf-8')
+
+        file_names = set()
+        for page in self.pages:
+            file_name = nav_file_name(page)
+            if file_name in file_names: continue
+            file_names.add(file_name)
+            yield file_name, bytearray("doxycppNav(" + json.dumps(page.nav) + ");\n", 'utf-8')
+
+
+    # Generates the search index used by search_script: search.js, and one shard per key, see
+    # search_shard_key(). Every Declaration with a URL gets an entry, overloads and
+    # specializations sharing a URL are listed once under the name of their overload group.
+    # Yields the name and contents of each file
+    def search_index_files(self):
+        shards = dict()
+        for decl in self.declarations.values():
+            if decl.target_url == "" or decl.full_name == "": continue
+            name = decl.name
+            if "<" in name: name = name[0 : name.find("<")].strip()
+            if decl.page_title != None: 
+                name = decl.page_title
+                full_name = decl.page_title
+            else: 
+                full_name = decl.full_name
+                if "<" in decl.name: full_name = full_name[0 : len(full_name) - len(decl.name)] + name
+            key = name.lower()
+            shards.setdefault(search_shard_key(key), set()).add((key, full_name, decl.kind, 
+                                                                 decl.target_url))
+
+        yield "search.js", bytearray(search_script, 'utf-8')
+        for shard_key in sorted(shards):
+            yield "search-" + shard_key + ".js", bytearray("doxycppSearchShard(" 
+                + json.dumps(shard_key) + ", " 
+                + json.dumps(sorted(shards[shard_key]), separators=(",", ":")) + ");\n", 'utf-8')
+
+
+    # Generates the files in "static_dir" with the "static_dir" option, like style sheets
+    # Yields the path of each file relative to "static_dir", and its contents
+    def static_files(self):
+        static_dir = self.config["static_dir"]
+        for dir_name, dir_names, file_names in os.walk(static_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                path = os.path.join(dir_name, file_name)
+                with open(path, 'rb') as file:
+                    yield os.path.relpath(path, static_dir).replace(os.sep, "/"), file.read()
+
+
+    # Generates all files other than pages, depending on the configuration
+    # Yields the name and contents of each file
+    def assets(self):
+        if self.config["static_dir"] != None: yield from self.static_files()
+        if self.config["shared_nav"]: yield from self.nav_files()
+        if self.config["search"]: yield from self.search_index_files()
+
+
+    # Writes all files other than pages to output_dir, see assets()
+    # Returns the names of all files
+    def write_assets(self, output_dir):
+        file_names = set()
+        for file_name, contents in self.assets():
+            if "/" in file_name: 
+                os.makedirs(os.path.dirname(output_dir + "/" + file_name), exist_ok=True)
+            self.write_output(output_dir + "/" + file_name, contents)
+            file_names.add(file_name)
+        return file_names
+
+
+    # Writes all pages and other files into an archive. The archive is always written in full.
+    # With the "gzip" or "brotli" options, compressed variants of text files are added as well.
+    #   archive_name: The archive to write, see archive_formats
+    # Returns the number of pages written
+    def write_archive(self, archive_name):
+        with Archive(archive_name) as archive:
+            # Compressed files are added in the order they were submitted, once more than
+            # "archive_compression_window" are in progress. Their position only depends on the
+            # number of files, not on when compression finishes or on the number of CPUs, so the
+            # archive is reproducible. The window limits memory usage.
+            pending = collections.deque()
+            def add(file_name, contents):
+                archive.add(file_name, contents)
+                for extension, key, compress in compressions:
+                    if self.config[key] and file_name.endswith(compressible_extensions):
+                        pending.append((file_name + extension, 
+                                        self.compressor.submit(compress, contents)))
+                while len(pending) > archive_compression_window:
+                    name, task = pending.popleft()
+                    archive.add(name, task.result())
+
+            for file_name, contents in self.assets(): add(file_name, contents)
+            for index, html in self.render_pages(range(len(self.pages))):
+                with self.timer("writing"):
+                    add(self.pages[index].file_name, html)
+                if self.profile != None: 
+                    self.profile.count("pages_written")
+                    self.profile.count("page_bytes_written", len(html))
+            for name, task in pending: archive.add(name, task.result())
+        return len(self.pages)
+
+
+    # Writes all pages to output_dir. Must be called after plan(). Files whose contents did not
+    # change are left untouched. With the "incremental" option, only pages whose inputs changed
+    # since the last run are rendered.
+    #   output_dir: The directory to write to. If it is not a directory but named like an archive,
+    #               see archive_formats, all files are written into that archive instead.
+    # Returns the number of pages whose files changed
+    def write(self, output_dir):
+        with self.phase("writing"), self.compressing():
+            if archive_format(output_dir) != None and not os.path.isdir(output_dir):
+                return self.write_archive(output_dir)
+            return self.write_files(output_dir)
+
+
+    # Implements write()
+    def write_files(self, output_dir):
+        if not self.config["incremental"]:
+            self.write_assets(output_dir)
+            return self.write_pages(range(len(self.pages)), output_dir)[1]
+
+        # The manifest records the inputs of every page written by an incremental build.
+        # All pages depend on the configuration and the global navigation.
+        manifest_name = output_dir + "/.doxycpp-manifest.json"
+        manifest_key = hashlib.md5(bytearray(self.config_key, 'utf-8') 
+            + b"".join(etree.tostring(e) for e in self.global_nav)).hexdigest()
+        # When writing to the same directory again, the manifest does not need to be read
+        if self.last_manifest != None and self.last_manifest[0] == output_dir:
+            manifest = self.last_manifest[1]
+        else:
+            try:
+                with open(manifest_name, 'r') as file:
+                    manifest = json.load(file)
+            except (OSError, ValueError):
+                manifest = { "key": None, "pages": dict() }
+
+        # A page is rendered again if its plan or content changed, or if any link target it looked
+        # up has been renamed or removed
+        new_manifest = { "key": manifest_key, "pages": dict(), 
+                         "assets": sorted(self.write_assets(output_dir)) }
+        stale = []
+        for index, page in enumerate(self.pages):
+            plan_digest, content_digest = self.page_digests(page)
+            old = manifest["pages"].get(page.file_name)
+            if old == None or manifest["key"] != manifest_key or old["plan"] != plan_digest \
+                    or old["content"] != content_digest \
+                    or not self.output_exists(output_dir + "/" + page.file_name) \
+                    or any(self.link_info(doxygen_id) != target 
+                           for doxygen_id, target in old["links"].items()):
+                stale.append(index)
+                links = None
+            else:
+                links = old["links"]
+            new_manifest["pages"][page.file_name] = { "plan": plan_digest, 
+                                                      "content": content_digest, "links": links }
+
+        page_links_by_index, changed_count = self.write_pages(stale, output_dir)
+        for index, links in page_links_by_index.items():
+            new_manifest["pages"][self.pages[index].file_name]["links"] = links
+
+        # A build limited to scopes keeps all other files. If the configuration changed, their
+        # pages need to be written again by the next build.
+        if self.scopes != None:
+            for file_name, old in manifest["pages"].items():
+                if manifest["key"] != manifest_key: old = dict(old, plan=None)
+                new_manifest["pages"].setdefault(file_name, old)
+            new_manifest["assets"] = sorted(set(new_manifest["assets"]) 
+                                            | set(manifest.get("assets", [])))
+
+        # Remove pages that are no longer generated
+        for file_name in manifest["pages"]:
+            if file_name not in new_manifest["pages"]: 
+                self.remove_output(output_dir + "/" + file_name)
+        for file_name in manifest.get("assets", []):
+            if file_name not in new_manifest["assets"]: 
+                self.remove_output(output_dir + "/" + file_name)
+
+        with open(manifest_name, 'w') as file:
+            file.write(json.dumps(new_manifest))
+        self.last_manifest = (output_dir, new_manifest)
+        return changed_count
+
+
+    # Keeps the documentation in output_dir up to date with the .xml files in "xml_dir" until
+    # interrupted. The directory is polled for changes, which are applied using update(), and
+    # only the affected pages are written again.
+    #   output_dir: The directory to write to
+    #   interval: The polling interval in seconds
+    def watch(self, output_dir, interval=0.2):
+        self.config["incremental"] = True
+        stats = self.scan_files()
+        while True:
+            if self.update(stats):
+                self.resolve()
+                self.plan()
+                changed = self.write(output_dir)
+                if self.profile != None: self.write_profile()
+                print("{} of {} pages changed".format(changed, len(self.pages)), file=sys.stderr)
+
+            # Wait until the files stop changing, since Doxygen may still be writing them
+            while True:
+                time.sleep(interval)
+                new_stats = self.scan_files()
+                if new_stats == stats: break
+                stats = new_stats
+
+
+# Reads the files in the output directories of shard builds. Files written by several shards,
+# like the search index, must be the same in all of them.
+#   shard_dirs: The output directories of all shards
+# Yields the path of each file relative to its directory, and its contents
+def shard_files(shard_dirs):
+    digests = dict()
+    for shard_dir in shard_dirs:
+        for dir_name, dir_names, file_names in os.walk(shard_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                path = os.path.join(dir_name, file_name)
+                name = os.path.relpath(path, shard_dir).replace(os.sep, "/")
+                if name == ".doxycpp-manifest.json": continue
+                with open(path, 'rb') as file:
+                    contents = file.read()
+                digest = hashlib.md5(contents).hexdigest()
+                if name not in digests:
+                    digests[name] = (digest, shard_dir)
+                    yield name, contents
+                elif digests[name][0] != digest:
+                    print("Shards {} and {} disagree on {}, using the first".format(
+                          digests[name][1], shard_dir, name), file=sys.stderr)
+
+
+# Combines the output directories of shard builds into one site, see the "shard" option
+#   shard_dirs: The output directories of all shards
+#   output_dir: The directory to write to, or an archive, see Project.write()
+# Returns the number of files written and the number of files whose contents changed
+def merge_shards(shard_dirs, output_dir):
+    count = 0
+    changed = 0
+    if archive_format(output_dir) != None and not os.path.isdir(output_dir):
+        with Archive(output_dir) as archive:
+            for name, contents in shard_files(shard_dirs):
+                archive.add(name, contents)
+                count += 1
+        return count, count
+    for name, contents in shard_files(shard_dirs):
+        path = os.path.join(output_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if write_if_changed(path, contents): changed += 1
+        count += 1
+    return count, changed
+
+
+# Command line options taking a value, mapped to their "config" key and value type. The
+# "export_links" and "merge" keys are not part of "config", but handled by main().
+value_options = { "--jobs": ("jobs", int), "--cache": ("cache_dir", str), 
+                  "--static": ("static_dir", str), 
+                  "--cache-size": ("cache_size", int), "--profile": ("profile", str),
+                  "--cprofile": ("cprofile", str), "--html-writer": ("html_writer", html_writer_name),
+                  "--scope": ("scope", str), "--link-map": ("link_map", str), 
+                  "--shard": ("shard", shard_spec), "--export-links": ("export_links", str),
+                  "--merge": ("merge", lambda value: value.split(os.pathsep)),
+                  "--external": ("external", external_spec), "--store": ("store", str),
+                  "--store-cache": ("store_cache", int) }
+
+# Command line options without a value, mapped to the "config" key they enable
+flag_options = { "--stream": "stream", "--incremental": "incremental", "--watch": "watch",
+                 "--shared-nav": "shared_nav", "--search": "search", 
+                 "--profile-allocations": "profile_allocations", "--minify": "minify", 
+                 "--gzip": "gzip", "--brotli": "brotli" }
+
+
+# Builds the documentation of a Project on the command line, see main()
+#   project: The Project
+#   output_dir: The directory or archive to write to, or None to only export links
+#   export_file: The file to export links to with --export-links, or None
+def build(project, output_dir, export_file):
+    if project.config["watch"] and output_dir != None:
+        try:
+            project.watch(output_dir)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    project.load()
+    project.resolve()
+    if export_file != None:
+        project.export_links(export_file)
+        print("Exported {} links".format(len(project.declarations)), file=sys.stderr)
+        if output_dir == None: return
+    project.plan()
+    changed = project.write(output_dir)
+    if project.profile != None: project.write_profile()
+    print("{} of {} pages changed".format(changed, len(project.pages)), file=sys.stderr)
+
+
+# Command line entry point: Reads XML files from the current directory and writes HTML
+# documentation to the output directory given
+def main():
+    options = dict()
+    output_dir = None
+
+    args = sys.argv[1:]
+    while len(args) > 0:
+        arg = args.pop(0)
+        if arg == "--version":
+            print("DoxyC++ Doxygen XML to HTML postprocessor version " + version + "\n"
+                + "(C) 2014, Fabian Knorr <https://github.com/fknorr/doxycpp>\n\n"
+                + "DoxyC++ is free software: you can redistribute it and/or modify it under\n"
+                + "the terms of the GNU General Public License as published by the Free Software\n"
+                + "Foundation, either version 3 of the License, or (at your option) any later\n"
+                + "version.", file=sys.stderr)
+            sys.exit(1)
+        elif arg == "--help":
+            output_dir = None
+            break
+        elif arg in flag_options:
+            options[flag_options[arg]] = True
+        elif arg.split("=")[0] in value_options:
+            key, value_type = value_options[arg.split("=")[0]]
+            if "=" in arg: value = arg[arg.find("=")+1:]
+            elif len(args) > 0: value = args.pop(0)
+            else: value = None
+            try:
+                value = value_type(value)
+            except (TypeError, ValueError):
+                print("Invalid value for option " + arg.split("=")[0], file=sys.stderr)
+                sys.exit(1)
+            # Options with a list of values, like --external, can be given more than once
+            if isinstance(value, list): options[key] = options.get(key, []) + value
+            else: options[key] = value
+        else:
+            output_dir = arg
+
+    export_file = options.pop("export_links", None)
+    merge_dirs = options.pop("merge", None)
+    if output_dir == None and (export_file == None or merge_dirs != None):
+        print("Syntax: " + sys.argv[0] + " [options] <output directory>\n"
+            + "        " + sys.argv[0] + " [options] --export-links FILE [<output directory>]\n"
+            + "        " + sys.argv[0] + " --merge DIRS <output directory>\n"
+            + "        " + sys.argv[0] + " --help     Display this help\n"
+            + "        " + sys.argv[0] + " --version  Display version information\n\n"
+            + "Options:\n"
+            + "        --jobs N        Read XML files and render pages using N worker processes\n"
+            + "                        (0: one per CPU)\n"
+            + "        --stream        Read XML files incrementally, keeping only the parts needed\n"
+            + "                        for documentation in memory\n"
+            + "        --cache DIR     Keep the declarations read from each XML file in DIR and\n"
+            + "                        only re-read files that changed since the last run\n"
+            + "        --cache-size N  Limit the cache to N megabytes (default: 256)\n"
+            + "        --scope NAME    Only write the pages of the namespace, class, group, page or\n"
+            + "                        directory NAME and the pages below it. Only the files\n"
+            + "                        needed for them are read, as listed by index.xml.\n"
+            + "        --export-links FILE\n"
+            + "                        Write the URLs and names of all declarations, the global\n"
+            + "                        navigation and the top-level scopes to FILE as JSON, for\n"
+            + "                        use with --link-map. Only writes pages if an output\n"
+            + "                        directory is given.\n"
+            + "        --link-map FILE Take the URLs and names of all declarations and the global\n"
+            + "                        navigation from FILE, and link to declarations that have not\n"
+            + "                        been read\n"
+            + "        --shard K/N     Only write the pages of every N-th top-level scope listed by\n"
+            + "                        the link map, starting with the K-th, like --scope. The\n"
+            + "                        first shard also writes the index page.\n"
+            + "        --external FILE=URL\n"
+            + "                        Link to the declarations of another project listed by FILE,\n"
+            + "                        a Doxygen tag file or a link map written by --export-links,\n"
+            + "                        whose documentation is at URL. Can be given more than once.\n"
+            + "        --merge DIRS    Combine the output directories of all shards, separated by\n"
+            + "                        '" + os.pathsep + "', into one site in the output directory\n"
+            + "        --store DIR     Keep the descriptions and types of all declarations in a\n"
+            + "                        temporary SQLite database in DIR instead of in memory,\n"
+            + "                        and read them again when a page needs them\n"
+            + "        --store-cache N Keep those of the N most recently used declarations in\n"
+            + "                        memory (default: 1024)\n"
+            + "        --incremental   Only write pages whose declarations, navigation or link\n"
+            + "                        targets changed since the last run\n"
+            + "        --watch         Keep running, and update the output whenever XML files are\n"
+            + "                        added, changed or removed\n"
+            + "        --shared-nav    Write each navigation sidebar to a script file shared by\n"
+            + "                        all pages using it, instead of into every page\n"
+            + "        --search        Add a search box and write a search index for it\n"
+            + "        --minify        Write HTML without indentation\n"
+            + "        --gzip          Also write a gzip compressed .gz file next to each HTML,\n"
+            + "                        CSS, JavaScript, JSON and SVG file\n"
+            + "        --brotli        Likewise, write a brotli compressed .br file (requires the\n"
+            + "                        brotli module)\n"
+            + "        --html-writer NAME\n"
+            + "                        Build pages as lxml trees (lxml, the default) or write\n"
+            + "                        them as strings directly (string), which is faster.\n"
+            + "                        The string writer never indents HTML.\n"
+            + "        --static DIR    Copy the files in DIR, like style sheets, to the output\n"
+            + "        --profile FILE  Write the time and peak memory of each phase, counters and\n"
+            + "                        the largest and slowest pages to FILE as JSON\n"
+            + "        --profile-allocations\n"
+            + "                        Also record the peak memory allocated during each phase.\n"
+            + "                        Tracing allocations slows down the build considerably.\n"
+            + "        --cprofile FILE Render all pages in this process and write cProfile\n"
+            + "                        statistics of rendering to FILE\n\n"
+            + "DoxyC++ will read XML files from the current directory. If the output directory\n"
+            + "does not exist and ends in .zip, .tar, .tar.gz, .tgz, .tar.bz2 or .tar.xz, all\n"
+            + "files are written into an archive of that name instead.", file=sys.stderr)
+        sys.exit(1)
+
+    if merge_dirs != None:
+        count, changed = merge_shards(merge_dirs, output_dir)
+        print("{} of {} files changed".format(changed, count), file=sys.stderr)
+        return
+
+    try:
+        project = Project(".", **options)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+    try:
+        build(project, output_dir, export_file)
+    finally:
+        project.close()
+
+
+if __name__ == "__main__":
+    main()
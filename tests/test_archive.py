@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Checks that archives written by DoxyC++ are reproducible: Building the same corpus twice must
+# yield byte-identical archives, also when compressed variants of all files are added.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+class ArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        generate.generate(self.xml_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Builds the documentation into an archive
+    # Returns the archive contents
+    def build(self, archive_name, **options):
+        project = doxycpp.Project(self.xml_dir, **options)
+        project.load()
+        project.resolve()
+        project.plan()
+        archive_name = os.path.join(self.temp_dir.name, archive_name)
+        project.write(archive_name)
+        with open(archive_name, 'rb') as file:
+            return file.read()
+
+    def test_reproducible(self):
+        for extension in [ ".tar", ".zip", ".tar.gz" ]:
+            for options in [ dict(), dict(gzip=True) ]:
+                with self.subTest(extension=extension, options=options):
+                    first = self.build("first" + extension, **options)
+                    second = self.build("second" + extension, **options)
+                    self.assertEqual(first, second)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# Checks that the declaration cache survives touched XML files and options that only affect the
+# pages written.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import glob, os, sys, tempfile, unittest
+from unittest import mock
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+        generate.generate(self.xml_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Loads the XML files, using the cache
+    # Returns the number of XML files parsed and the number of XML files hashed
+    def load(self, **options):
+        hashed = []
+        def counting_hash(file_name):
+            hashed.append(file_name)
+            return file_hash(file_name)
+        file_hash = doxycpp.file_hash
+        with mock.patch.object(doxycpp, "file_hash", counting_hash):
+            project = doxycpp.Project(self.xml_dir, cache_dir=self.cache_dir,
+                                      profile=os.path.join(self.temp_dir.name, "profile.json"),
+                                      **options)
+            project.load()
+        return project.profile.counters.get("files_parsed", 0), len(hashed)
+
+    def test_touched_files(self):
+        self.load()
+        for file_name in glob.glob(os.path.join(self.xml_dir, "*.xml")):
+            stat = os.stat(file_name)
+            os.utime(file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        parsed, hashed = self.load()
+        self.assertEqual(parsed, 0)
+        self.assertGreater(hashed, 0)
+        # The new mtimes were stored, so the files need not be hashed again
+        self.assertEqual(self.load(), (0, 0))
+
+    def test_output_options(self):
+        self.load()
+        self.assertEqual(self.load(minify=True, html_writer="string", search=True), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+# Checks that the string HTML writer produces the same pages as the lxml writer when HTML is
+# minified, which the lxml writer otherwise indents.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+class HtmlWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        generate.generate(self.xml_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Renders all pages
+    # Returns a dictionary mapping the file name of every page to its contents
+    def render(self, **options):
+        project = doxycpp.Project(self.xml_dir, **options)
+        project.load()
+        project.resolve()
+        project.plan()
+        return dict((page.file_name, project.render(page)) for page in project.pages)
+
+    def test_minified(self):
+        for options in [ dict(), dict(shared_nav=True), dict(search=True) ]:
+            with self.subTest(options=options):
+                expected = self.render(minify=True, html_writer="lxml", **options)
+                pages = self.render(minify=True, html_writer="string", **options)
+                self.assertEqual(sorted(pages), sorted(expected))
+                for file_name in expected:
+                    self.assertEqual(pages[file_name], expected[file_name], file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# Checks that incremental builds write the same files as a fresh build of the same XML files, after
+# declarations were changed, renamed or removed.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+# Returns a dictionary mapping the names of all files in a directory to their contents, except
+# for the manifest of incremental builds
+def read_dir(dir_name):
+    files = dict()
+    for file_name in os.listdir(dir_name):
+        if file_name == ".doxycpp-manifest.json": continue
+        with open(os.path.join(dir_name, file_name), 'rb') as file:
+            files[file_name] = file.read()
+    return files
+
+
+class IncrementalTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        generate.generate(self.xml_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Builds the documentation into a directory, which is created if necessary
+    # Returns the number of pages changed
+    def build(self, dir_name, **options):
+        output_dir = os.path.join(self.temp_dir.name, dir_name)
+        os.makedirs(output_dir, exist_ok=True)
+        project = doxycpp.Project(self.xml_dir, **options)
+        project.load()
+        project.resolve()
+        project.plan()
+        return project.write(output_dir)
+
+    # Replaces text in an XML file
+    def edit(self, file_name, old, new):
+        file_name = os.path.join(self.xml_dir, file_name)
+        with open(file_name, 'r') as file:
+            contents = file.read()
+        self.assertIn(old, contents)
+        with open(file_name, 'w') as file:
+            file.write(contents.replace(old, new))
+
+    # Checks that an incremental build into "incremental" matches a fresh build into dir_name
+    def check_rebuild(self, dir_name, **options):
+        self.build("incremental", incremental=True, **options)
+        self.build(dir_name, **options)
+        self.assertEqual(read_dir(os.path.join(self.temp_dir.name, "incremental")),
+                         read_dir(os.path.join(self.temp_dir.name, dir_name)))
+
+    def test_unchanged(self):
+        self.build("incremental", incremental=True)
+        self.assertEqual(self.build("incremental", incremental=True), 0)
+
+    # Changes, renames and removes declarations, checking every incremental build
+    def check_edits(self, **options):
+        self.check_rebuild("fresh0", **options)
+        # A changed description
+        self.edit("classns1_1_1class0.xml", "frobnicates", "mutates")
+        self.check_rebuild("fresh1", **options)
+        # A renamed class, whose URL and the links to it change
+        self.edit("classns1_1_1class1.xml", "ns1::class1", "ns1::renamed")
+        self.check_rebuild("fresh2", **options)
+        # A removed class
+        os.remove(os.path.join(self.xml_dir, "classns0_1_1class3.xml"))
+        self.check_rebuild("fresh3", **options)
+
+    def test_edits(self):
+        self.check_edits()
+
+    def test_edits_with_assets(self):
+        self.check_edits(shared_nav=True, search=True, gzip=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
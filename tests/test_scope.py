@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# Checks that builds limited to a scope write the same files as a full build.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+# Returns a dictionary mapping the names of all files in a directory to their contents
+def read_dir(dir_name):
+    files = dict()
+    for file_name in os.listdir(dir_name):
+        with open(os.path.join(dir_name, file_name), 'rb') as file:
+            files[file_name] = file.read()
+    return files
+
+
+class ScopeTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        generate.generate(self.xml_dir)
+        self.full = read_dir(self.build("full"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Builds the documentation into a new directory
+    # Returns the directory
+    def build(self, dir_name, **options):
+        output_dir = os.path.join(self.temp_dir.name, dir_name)
+        os.mkdir(output_dir)
+        project = doxycpp.Project(self.xml_dir, **options)
+        project.load()
+        project.resolve()
+        project.plan()
+        project.write(output_dir)
+        return output_dir
+
+    def test_scope(self):
+        for scope in [ "ns1", "ns0::detail", "ns0::class2", "core", "intro" ]:
+            with self.subTest(scope=scope):
+                files = read_dir(self.build(scope.replace(":", "-"), scope=scope))
+                self.assertGreater(len(files), 0)
+                self.assertLess(len(files), len(self.full))
+                for file_name, contents in files.items():
+                    self.assertEqual(contents, self.full.get(file_name), file_name)
+
+
+if __name__ == "__main__":
+    unittest.main()
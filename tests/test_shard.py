@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+# Checks that the shards of a build merged into one site are the same as a full build.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+# Returns a dictionary mapping the names of all files in a directory to their contents
+def read_dir(dir_name):
+    files = dict()
+    for file_name in os.listdir(dir_name):
+        with open(os.path.join(dir_name, file_name), 'rb') as file:
+            files[file_name] = file.read()
+    return files
+
+
+class ShardTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        generate.generate(self.xml_dir)
+        self.full = read_dir(self.build("full"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Builds the documentation into a new directory
+    # Returns the directory
+    def build(self, dir_name, **options):
+        output_dir = os.path.join(self.temp_dir.name, dir_name)
+        os.mkdir(output_dir)
+        project = doxycpp.Project(self.xml_dir, **options)
+        project.load()
+        project.resolve()
+        project.plan()
+        project.write(output_dir)
+        return output_dir
+
+    def test_shards(self):
+        link_map = os.path.join(self.temp_dir.name, "links.json")
+        project = doxycpp.Project(self.xml_dir)
+        project.load()
+        project.resolve()
+        project.export_links(link_map)
+        for count in [ 1, 3 ]:
+            with self.subTest(count=count):
+                shard_dirs = [ self.build("shard{}-{}".format(number, count), link_map=link_map,
+                                          shard=(number, count)) 
+                               for number in range(1, count + 1) ]
+                if count > 1:
+                    for shard_dir in shard_dirs:
+                        self.assertLess(len(os.listdir(shard_dir)), len(self.full))
+                merged_dir = os.path.join(self.temp_dir.name, "merged{}".format(count))
+                os.mkdir(merged_dir)
+                doxycpp.merge_shards(shard_dirs, merged_dir)
+                self.assertEqual(read_dir(merged_dir), self.full)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+# Checks that keeping declarations in the SQLite store of the "store" option does not change the
+# output, and that the store's database is removed afterwards.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, tempfile, unittest
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root_dir)
+sys.path.insert(0, os.path.join(root_dir, "bench"))
+
+import doxycpp, generate
+
+
+# Returns a dictionary mapping the names of all files in a directory to their contents
+def read_dir(dir_name):
+    files = dict()
+    for file_name in os.listdir(dir_name):
+        with open(os.path.join(dir_name, file_name), 'rb') as file:
+            files[file_name] = file.read()
+    return files
+
+
+@unittest.skipIf(doxycpp.sqlite3 == None, "requires the sqlite3 module")
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.xml_dir = os.path.join(self.temp_dir.name, "xml")
+        self.store_dir = os.path.join(self.temp_dir.name, "store")
+        generate.generate(self.xml_dir)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Builds the documentation into a new directory
+    # Returns the files written, see read_dir()
+    def build(self, dir_name, **options):
+        output_dir = os.path.join(self.temp_dir.name, dir_name)
+        os.mkdir(output_dir)
+        project = doxycpp.Project(self.xml_dir, **options)
+        try:
+            project.load()
+            project.resolve()
+            project.plan()
+            project.write(output_dir)
+        finally:
+            project.close()
+        return read_dir(output_dir)
+
+    def test_output(self):
+        # A small cache makes pages read most fragments from the database again
+        for number, options in enumerate([ dict(), dict(store_cache=4), 
+                                           dict(jobs=2, search=True) ]):
+            with self.subTest(options=options):
+                expected = self.build("default{}".format(number), **options)
+                files = self.build("store{}".format(number), store=self.store_dir, **options)
+                self.assertEqual(files, expected)
+
+    def test_removed(self):
+        os.mkdir(self.store_dir)
+        with open(os.path.join(self.store_dir, "other.sqlite"), 'w') as file:
+            file.write("not a store")
+        self.build("html", store=self.store_dir)
+        self.assertEqual(os.listdir(self.store_dir), [ "other.sqlite" ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+# Checks that unique_urls() assigns distinct URLs even if the complete hashes of names collide.
+# Run with "python3 -m unittest discover tests".
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+import os, sys, unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import doxycpp
+
+
+class UniqueUrlsTest(unittest.TestCase):
+    def test_distinct_names(self):
+        names = { ("class", "a::b"), ("class", "a_b"), ("function", "a::b") }
+        urls = doxycpp.unique_urls(names)
+        self.assertEqual(len(set(urls.values())), len(names))
+
+    def test_complete_hash_collision(self):
+        # Pretend every name converts to the same string, whatever the length of its hash
+        with mock.patch.object(doxycpp, "urlify_string", lambda string, length=4: "x" * length):
+            urls = doxycpp.unique_urls({ ("class", "a"), ("class", "b"), ("class", "c"),
+                                         ("function", "d") })
+        self.assertEqual(urls[("class", "a")], "class-" + "x" * 32)
+        self.assertEqual(urls[("class", "b")], "class-" + "x" * 32 + "-2")
+        self.assertEqual(urls[("class", "c")], "class-" + "x" * 32 + "-3")
+        self.assertEqual(urls[("function", "d")], "function-xxxx")
+
+
+if __name__ == "__main__":
+    unittest.main()